@@ -1,18 +1,442 @@
 import streamlit as st
-from PIL import Image
-from io import BytesIO
+import hashlib
 import json
-from utils.aws_lambda import invoke_lambda
-from utils.dynamo_db import get_labels
-from utils.image_processing import encode_image, decode_image
+import threading
+from io import BytesIO
+from utils.aws_lambda import invoke_lambda, LambdaInvocationError, resilience_counters
+from utils.dynamo_db import get_labels, label_catalog
+from utils.result_cache import invoke_outpaint
+from utils.outpaint import (
+    build_outpaint_payload, parse_number_list, build_sweep_cells, run_sweep, MAX_IMAGES_PER_CALL
+)
+from utils.jobs import submit_job, get_job, PENDING, SUCCEEDED, FAILED, FINISHED_STATUSES
+from utils.image_processing import preprocess_image, preprocess_mask, format_bytes_saved, decode_image
+from utils.canvas import ANCHORS, build_canvas, apply_canvas
+from utils.tiling import run_tiled
+from utils.preview import draft_dimension, draft_outpaint_payload, draft_image_payload
+from utils.render_cache import decode_output, render_image, THUMBNAIL_WIDTH
+from utils.prompt_stream import stream_optimized_prompt
 from utils.session_state import initialize_session_state
-from constants.dimensions import DIMENSIONS_OPTIONS
+from constants.dimensions import DIMENSION_LABELS, DIMENSIONS_BY_LABEL
+from utils.prompt_index import get_prompt_index, prompt_id_for
+from utils.tracing import tracing
+from utils.rerun_cost import start_rerun, finish_rerun, measured, rerun_cost_rows
+from config import (
+    JOB_POLL_SECONDS, TAG_BROWSER_PAGE_SIZE, TOP_PROMPTS_COUNT, SIMILAR_PROMPTS_COUNT, SAVE_QUEUE_MAX_AGE_SECONDS,
+    TRACING_ENABLED, TILED_MAX_SIDE, DRAFT_STEPS
+)
+
+# Number of columns in the sweep result grid
+SWEEP_GRID_COLUMNS = 4
+
+def use_candidate(image_bytes, image_digest, seed, dimension_label):
+    """Promote a sweep or job result to the generated image so it can be rated, tagged and saved."""
+    st.session_state['image_bytes'] = image_bytes
+    st.session_state['image_digest'] = image_digest
+    st.session_state['image_generated'] = True
+    if seed is not None:
+        st.session_state['seed'] = seed
+    if dimension_label is not None:
+        st.session_state['selected_dimension_label'] = dimension_label
+
+def render_sweep_cell(index, cell):
+    """Render one sweep cell: its images, parameters and per-cell timing."""
+    caption = f"seed {cell['seed']} · cfg {cell['cfg_scale']} · {cell['dimension_label'].split(' (')[0]} · {cell['elapsed']:.1f} s"
+    if cell['error']:
+        st.error(f"{caption}: {cell['error']}")
+        return
+    for image_index, (image_bytes, image_digest) in enumerate(cell['images']):
+        st.image(render_image(image_bytes, image_digest, THUMBNAIL_WIDTH), caption=caption)
+        st.button(
+            "Use this candidate",
+            key=f"use_sweep_{index}_{image_index}",
+            on_click=use_candidate,
+            args=(image_bytes, image_digest, cell['seed'], cell['dimension_label'])
+        )
+
+def discard_draft():
+    """Drop the session's preview draft without rendering it at full size."""
+    st.session_state['draft'] = None
+
+def discard_source_draft():
+    """Drop the session's source image draft without rendering it with full steps."""
+    st.session_state['source_draft'] = None
+
+def track_jobs_in_url():
+    """Mirror the session's job ids into the URL so a browser refresh can pick them up again."""
+    st.query_params["jobs"] = ",".join(st.session_state['jobs'])
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+@measured("jobs")
+def render_jobs_panel():
+    """Poll unfinished background jobs and show their results without rerunning the whole app."""
+    jobs = st.session_state['jobs']
+    if not jobs:
+        return
+    st.subheader("Background Jobs")
+    for job_id, job in list(jobs.items()):
+        if job['status'] not in FINISHED_STATUSES:
+            try:
+                job['status'], result, job['message'] = get_job(job_id)
+                if result:
+                    job['image'] = decode_output(result.get('image_data'))
+            except Exception as e:
+                job['message'] = f"Error checking job status: {str(e)}"
+
+        label_column, status_column, action_column = st.columns([3, 1, 1])
+        label_column.write(job['label'])
+        status_column.write(job['status'])
+        if job['status'] == SUCCEEDED and job.get('image'):
+            label_column.image(render_image(*job['image'], THUMBNAIL_WIDTH), width=160)
+            if action_column.button("Use", key=f"use_job_{job_id}"):
+                # Widgets outside this fragment can only be updated before they are drawn, so rerun the app
+                st.session_state['promoted_candidate'] = (*job['image'], job['seed'], job['dimension_label'])
+                st.rerun()
+        elif job['status'] == FAILED or job.get('message'):
+            label_column.error(job['message'])
+        if action_column.button("Dismiss", key=f"dismiss_job_{job_id}"):
+            del jobs[job_id]
+            track_jobs_in_url()
+            st.rerun(scope="fragment")
+
+def load_tag_page(label_id, start_key=None):
+    """Fetch one page of prompts for a tag from the tag index and append it to the browser state."""
+    browser = st.session_state['tag_browser']
+    if browser['label_id'] != label_id:
+        browser.update(label_id=label_id, prompts=[], next_key=None)
+    payload = {"label_id": label_id, "limit": TAG_BROWSER_PAGE_SIZE}
+    if start_key:
+        payload["start_key"] = start_key
+    result = invoke_lambda("query_prompts_by_tag", payload)
+    if result and result.get('statusCode') == 200:
+        browser['prompts'].extend(result['prompts'])
+        browser['next_key'] = result.get('next_key')
+    elif result:
+        st.error(result.get("message", "Unknown error"))
+
+@st.fragment
+@measured("tag_browser")
+def render_tag_browser():
+    """Browse saved prompts by tag, newest first, one page per query."""
+    st.subheader("Browse Prompts by Tag")
+    labels = get_labels()
+    if not labels:
+        st.caption("No tags yet.")
+        return
+    label_ids = sorted(labels, key=labels.get)
+    label_id = st.selectbox("Tag:", label_ids, format_func=labels.get, key='tag_browser_label')
+    browser = st.session_state['tag_browser']
+    if browser['label_id'] != label_id:
+        load_tag_page(label_id)
+    if not browser['prompts']:
+        st.caption("No prompts saved with this tag.")
+    for index, item in enumerate(browser['prompts']):
+        st.write(item['prompt'])
+        rating_text = f"{item['rating']:.1f} ({item['rating_count']})" if item['rating'] is not None else "n/a"
+        st.caption(f"seed {item['seed']} · rating {rating_text} · {item['created_at'][:10]}")
+        if st.button("Use this prompt", key=f"use_tagged_prompt_{index}"):
+            # The prompt and seed widgets were already drawn, so apply the choice on a full rerun
+            st.session_state['promoted_prompt'] = (item['prompt'], item['seed'])
+            st.rerun()
+    if browser['next_key'] and st.button("Load more", key='tag_browser_more'):
+        load_tag_page(label_id, browser['next_key'])
+        st.rerun(scope="fragment")
+
+@st.fragment
+@measured("top_prompts")
+def render_top_prompts():
+    """Offer the best-rated prompts, overall or for one tag, as a starting point for a new session."""
+    st.subheader("Start from a Top Prompt")
+    labels = get_labels()
+    label_id = st.selectbox(
+        "Best rated in:",
+        [""] + sorted(labels, key=labels.get),
+        format_func=lambda option: labels.get(option, "All tags"),
+        key='top_prompts_label'
+    )
+    # Leaderboards are fetched once per tag per session; Refresh picks up new ratings
+    top_prompts = st.session_state['top_prompts']
+    refresh = st.button("Refresh", key='top_prompts_refresh')
+    if refresh or label_id not in top_prompts:
+        result = invoke_lambda("top_prompts", {"label_id": label_id, "limit": TOP_PROMPTS_COUNT})
+        if result and result.get('statusCode') == 200:
+            top_prompts[label_id] = result['prompts']
+        elif result:
+            st.error(result.get("message", "Unknown error"))
+    prompts = top_prompts.get(label_id, [])
+    if not prompts:
+        st.caption("No rated prompts yet.")
+        return
+    choice = st.selectbox(
+        "Prompt:",
+        range(len(prompts)),
+        format_func=lambda index: f"{prompts[index]['score']:g} · {prompts[index]['prompt'][:60]}",
+        key='top_prompts_choice'
+    )
+    st.caption(prompts[choice]['prompt'])
+    if st.button("Start from this prompt", key='top_prompts_use'):
+        st.session_state['promoted_prompt'] = (prompts[choice]['prompt'], prompts[choice]['seed'])
+        st.rerun()
+
+def update_prompt_index(prompt, **metadata):
+    """Make a saved prompt searchable right away in this process."""
+    try:
+        get_prompt_index().add(prompt_id_for(prompt), prompt, **metadata)
+        # The saved prompt may now be among the suggestions for the current prompt
+        st.session_state['similar_prompts'] = None
+    except Exception as e:
+        st.caption(f"Similar-prompt index not updated: {str(e)}")
+
+def flush_save_queue(queue):
+    """Send queued saves and apply the results to the views that show saved prompts."""
+    saved = queue.flush()
+    if queue.send_error:
+        st.error(f"Some queued saves could not be sent and will be retried: {queue.send_error}")
+    if not saved:
+        return
+    # Reload the tag browser and leaderboards so the saved prompts show up
+    st.session_state['tag_browser']['label_id'] = None
+    st.session_state['top_prompts'] = {}
+    for entry, result in saved:
+        stats = result.get('stats')
+        if stats:
+            request = entry['request']
+            update_prompt_index(request['prompt'], seed=request['seed'], rating=stats['mean'], rating_count=stats['count'])
+    entry, result = saved[-1]
+    st.session_state['last_save_stats'] = result.get('stats')
+
+@st.fragment(run_every=SAVE_QUEUE_MAX_AGE_SECONDS)
+@measured("save_queue")
+def render_save_queue():
+    """Flush queued saves when due and show what is still waiting or has failed."""
+    queue = st.session_state['save_queue']
+    if queue.is_due():
+        flush_save_queue(queue)
+    if queue.pending:
+        st.caption(f"{len(queue.pending)} save(s) waiting to sync.")
+        if st.button("Sync now", key='save_queue_flush'):
+            flush_save_queue(queue)
+            st.rerun(scope="fragment")
+    stats = st.session_state.get('last_save_stats')
+    if stats:
+        st.caption(
+            f"Last synced prompt rated {stats['count']} time(s): mean {stats['mean']:.2f} ± {stats['stddev']:.2f}, "
+            f"range {stats['min']}–{stats['max']}"
+        )
+    for entry in queue.failed:
+        st.error(f"Save of \"{entry['request']['prompt'][:60]}\" failed: {entry['message']}")
+    if queue.failed and st.button("Retry failed saves", key='save_queue_retry'):
+        queue.retry_failed()
+        st.rerun(scope="fragment")
+
+def remember_trace(trace):
+    """Keep the spans of the session's latest traced request for the diagnostics panel."""
+    if trace is not None:
+        st.session_state['last_trace'] = {"request_id": trace.request_id, "spans": trace.spans}
+
+@st.fragment
+@measured("diagnostics")
+def render_diagnostics():
+    """
+    Show the latest request's spans, this session's rerun costs, retry counters and rolling
+    latency percentiles per operation.
+    """
+    with st.expander("Diagnostics"):
+        last_trace = st.session_state.get('last_trace')
+        if last_trace:
+            st.caption(f"Last request {last_trace['request_id']}")
+            st.dataframe(last_trace['spans'], hide_index=True)
+        rerun_costs = rerun_cost_rows()
+        if rerun_costs:
+            st.caption("Script runs this session (\"app\" is a full rerun and includes the fragments it draws)")
+            st.dataframe(rerun_costs, hide_index=True)
+        counters = resilience_counters()
+        if counters:
+            st.caption("Retries, throttles and shed requests per Lambda function")
+            st.dataframe([{"function": name, **row} for name, row in counters.items()], hide_index=True)
+        summary = tracing.stats.summary()
+        if not summary:
+            st.caption("No traced operations yet.")
+            return
+        st.caption("Rolling latency (ms) across all sessions of this process")
+        st.dataframe(
+            [{"operation": operation, **{key: round(value, 1) for key, value in row.items()}}
+             for operation, row in summary.items()],
+            hide_index=True
+        )
+        if st.button("Reset statistics", key='reset_trace_stats'):
+            tracing.stats.reset()
+            st.rerun(scope="fragment")
+
+@st.fragment
+@measured("feedback")
+def render_feedback_panel():
+    """
+    Rate, tag and give feedback on the generated image. Runs as a fragment so these widgets only
+    rerun this panel, and the feedback boxes sit in a form so typing does not rerun anything.
+    """
+    # Rate and Tag Outpainted Image
+    st.subheader("Rate and Tag the Outpainted Image")
+    rating = st.slider(
+        "Rate the outpainted image (1-10):",
+        1,
+        10,
+        st.session_state.get('rating', 5)
+    )
+    st.session_state['rating'] = rating
+
+    existing_labels = get_labels()
+    selected_labels = st.multiselect(
+        "Choose tags for this image:",
+        options=list(existing_labels.values()),
+        default=st.session_state.get('selected_labels', [])
+    )
+    st.session_state['selected_labels'] = selected_labels
+
+    # Add new label
+    new_label = st.text_input("Add a new tag (optional):")
+    if st.button("Add Tag") and new_label:
+        add_label_result = invoke_lambda("add_label", {"label_name": new_label})
+        if add_label_result and add_label_result.get('statusCode') in (200, 409):
+            label_data = json.loads(add_label_result['body'])
+            label_catalog.add(label_data['label_id'], label_data['label_name'])
+            if label_data['label_name'] not in selected_labels:
+                selected_labels.append(label_data['label_name'])
+            st.session_state['selected_labels'] = selected_labels
+            st.success(f"Tag '{new_label}' {'added' if add_label_result['statusCode'] == 200 else 'already exists and was selected'}.")
+        elif add_label_result:
+            st.error(json.loads(add_label_result['body']).get("message", "Unknown error"))
+
+    # Import a whole taxonomy in one call
+    with st.expander("Import tags in bulk"):
+        with st.form("bulk_labels_form", border=False):
+            bulk_labels = st.text_area("One tag per line:", key='bulk_labels')
+            import_tags = st.form_submit_button("Import Tags")
+        if import_tags:
+            label_names = [name.strip() for name in bulk_labels.splitlines() if name.strip()]
+            import_result = invoke_lambda("add_label", {"label_names": label_names}) if label_names else None
+            if import_result and import_result.get('statusCode') == 200:
+                import_data = json.loads(import_result['body'])
+                for item in import_data['results']:
+                    if item['status'] != "failed":
+                        label_catalog.add(item['label_id'], item['label_name'])
+                st.success(f"{import_data['created']} tag(s) created, {import_data['existing']} already existed.")
+                if import_data['failed']:
+                    failed_names = [item['label_name'] for item in import_data['results'] if item['status'] == "failed"]
+                    st.error(f"{import_data['failed']} tag(s) could not be written: {', '.join(failed_names)}")
+            elif import_result:
+                st.error(json.loads(import_result['body']).get("message", "Unknown error"))
+
+    # Convert selected labels to IDs
+    selected_label_ids = label_catalog.ids_for(selected_labels)
+
+    # Provide Feedback to Optimize Outpainting Prompt (sent together when the form is submitted)
+    st.subheader("Provide Feedback to Optimize Outpainting Prompt")
+    with st.form("feedback_form", border=False):
+        feedback_composition = st.text_area(
+            "Describe improvements in composition (e.g., layout, balance):",
+            value=st.session_state.get('feedback_composition', '')
+        )
+        feedback_lighting = st.text_area(
+            "Describe improvements in lighting (e.g., brightness, shadows):",
+            value=st.session_state.get('feedback_lighting', '')
+        )
+        feedback_style = st.text_area(
+            "Describe preferred style adjustments (e.g., realism, abstract):",
+            value=st.session_state.get('feedback_style', '')
+        )
+        feedback_details = st.text_area(
+            "Describe key features the outpainted image should have:",
+            value=st.session_state.get('feedback_details', '')
+        )
+        feedback_adjustments = st.text_area(
+            "Any other specific adjustments:",
+            value=st.session_state.get('feedback_adjustments', '')
+        )
+        # Identical feedback reuses the cached prompt unless forced
+        force_regenerate = st.checkbox("Force regenerate", help="Ignore the cached prompt for this feedback and generate a new one.")
+        optimize = st.form_submit_button("Optimize Outpainting Prompt")
+
+    # Store feedback in session state
+    st.session_state['feedback_composition'] = feedback_composition
+    st.session_state['feedback_lighting'] = feedback_lighting
+    st.session_state['feedback_style'] = feedback_style
+    st.session_state['feedback_details'] = feedback_details
+    st.session_state['feedback_adjustments'] = feedback_adjustments
+
+    # Optimize Outpainting Prompt
+    if optimize:
+        suggestion = (
+            f"Composition: {feedback_composition}\n"
+            f"Lighting: {feedback_lighting}\n"
+            f"Style: {feedback_style}\n"
+            f"Details: {feedback_details}\n"
+            f"Adjustments: {feedback_adjustments}"
+        )
+        # Clicking Stop sets the cancel event, which stops reading and closes the model request even if
+        # the rerun has not yet interrupted the stream
+        cancel_event = threading.Event()
+        st.button("Stop generating", key='stop_optimizing', on_click=cancel_event.set)
+        st.subheader("Optimized Outpainting Prompt")
+        try:
+            with tracing.traced() as trace:
+                optimized_prompt = st.write_stream(
+                    stream_optimized_prompt(
+                        st.session_state.get('outpaint_prompt', ''), suggestion,
+                        cancel_event=cancel_event, force_regenerate=force_regenerate
+                    )
+                ).strip()
+            remember_trace(trace)
+            if cancel_event.is_set():
+                # A cancelled stream ends early; its partial prompt is not kept
+                st.info("Prompt optimization cancelled.")
+            else:
+                st.session_state['optimized_prompt'] = optimized_prompt
+                st.success("Optimized prompt generated based on your feedback!")
+        except LambdaInvocationError as e:
+            st.error(str(e))
+    elif st.session_state.get('stop_optimizing'):
+        st.info("Prompt optimization cancelled.")
+
+    # Save Optimized Prompt
+    if st.session_state.get('optimized_prompt') or st.session_state.get('outpaint_prompt'):
+        prompt_to_save = st.session_state.get('optimized_prompt') or st.session_state.get('outpaint_prompt')
+        if st.button("Save Outpainting Prompt"):
+            # Saves are queued and sent in batches; the queue panel reports the outcome
+            seed = st.session_state['seed']
+            st.session_state['save_queue'].enqueue(prompt_to_save, rating, seed, selected_label_ids)
+            update_prompt_index(prompt_to_save, seed=seed, rating=rating, rating_count=None)
+            st.success("Outpainting prompt saved! It will be synced with the next batch.")
+
+# Measure what this run costs; fragment reruns are counted separately
+rerun_started = start_rerun()
 
 # Initialize session state
 initialize_session_state()
 
+# Restore background jobs tracked in the URL (e.g. after a browser refresh)
+for restored_job_id in filter(None, st.query_params.get("jobs", "").split(",")):
+    st.session_state['jobs'].setdefault(restored_job_id, {
+        "label": f"Job {restored_job_id[:8]}", "seed": None, "dimension_label": None,
+        "status": PENDING, "message": None, "image": None
+    })
+
+# Apply a result promoted from the jobs panel before any widget is drawn
+if st.session_state.get('promoted_candidate'):
+    use_candidate(*st.session_state.pop('promoted_candidate'))
+if st.session_state.get('promoted_prompt'):
+    st.session_state['outpaint_prompt'], promoted_seed = st.session_state.pop('promoted_prompt')
+    if promoted_seed is not None:
+        st.session_state['seed'] = promoted_seed
+
 # --- Streamlit UI Components ---
 
+with st.sidebar:
+    render_top_prompts()
+    render_tag_browser()
+    if TRACING_ENABLED:
+        render_diagnostics()
+
 st.title("Outpainting Prompt Engineer")
 
 # Outpainting Options
@@ -24,13 +448,6 @@ uploaded_image = st.file_uploader(
     type=["png", "jpg", "jpeg"],
     key='main_image'
 )
-if uploaded_image is not None:
-    st.session_state['input_image_data'] = encode_image(uploaded_image)
-    st.session_state['uploaded_image_name'] = uploaded_image.name
-elif st.session_state['input_image_data'] is not None:
-    st.info(f"Using previously uploaded image: {st.session_state['uploaded_image_name']}")
-else:
-    st.warning("Please upload a source image for outpainting.")
 
 # Prompt
 outpaint_prompt = st.text_input(
@@ -39,36 +456,103 @@ outpaint_prompt = st.text_input(
 )
 st.session_state['outpaint_prompt'] = outpaint_prompt
 
+# Suggest close matches from the saved prompt library, searching again only when the prompt changes
+if outpaint_prompt.strip():
+    cached_search = st.session_state['similar_prompts']
+    if cached_search is not None and cached_search[0] == outpaint_prompt:
+        similar_prompts = cached_search[1]
+    else:
+        try:
+            similar_prompts = [
+                (score, entry) for score, entry in get_prompt_index().search(outpaint_prompt, SIMILAR_PROMPTS_COUNT + 1)
+                if entry['prompt'] != outpaint_prompt
+            ][:SIMILAR_PROMPTS_COUNT]
+            st.session_state['similar_prompts'] = (outpaint_prompt, similar_prompts)
+        except Exception as e:
+            st.caption(f"Similar prompts unavailable: {str(e)}")
+            similar_prompts = []
+    if similar_prompts:
+        with st.expander(f"Similar saved prompts ({len(similar_prompts)})"):
+            for index, (score, entry) in enumerate(similar_prompts):
+                st.write(entry['prompt'])
+                rating_text = f"{entry['rating']:.1f}" if entry.get('rating') is not None else "n/a"
+                if entry.get('rating_count'):
+                    rating_text += f" ({entry['rating_count']})"
+                st.caption(f"similarity {score:.2f} · rating {rating_text} · seed {entry.get('seed')}")
+                if st.button("Use this prompt", key=f"use_similar_prompt_{index}"):
+                    st.session_state['promoted_prompt'] = (entry['prompt'], entry.get('seed'))
+                    st.rerun()
+
 # Seed
-seed = st.number_input("Enter seed value (optional):", value=42, min_value=0)
+seed = st.number_input("Enter seed value (optional):", min_value=0, key='seed')
 
 # Dimension Selection
-dimension_labels = [option['label'] for option in DIMENSIONS_OPTIONS]
-if st.session_state['selected_dimension_label'] not in dimension_labels:
-    st.session_state['selected_dimension_label'] = dimension_labels[0]
+if st.session_state['selected_dimension_label'] not in DIMENSIONS_BY_LABEL:
+    st.session_state['selected_dimension_label'] = DIMENSION_LABELS[0]
 
 selected_dimension_label = st.selectbox(
     "Select Image Dimensions:",
-    dimension_labels,
-    index=dimension_labels.index(st.session_state['selected_dimension_label'])
+    DIMENSION_LABELS,
+    index=DIMENSION_LABELS.index(st.session_state['selected_dimension_label'])
 )
 st.session_state['selected_dimension_label'] = selected_dimension_label
 
 # Find the selected dimensions
-selected_dimension = next(
-    (item for item in DIMENSIONS_OPTIONS if item["label"] == selected_dimension_label),
-    None
-)
-if selected_dimension:
-    outpaint_width = selected_dimension['width']
-    outpaint_height = selected_dimension['height']
+selected_dimension = DIMENSIONS_BY_LABEL[selected_dimension_label]
+outpaint_width = selected_dimension['width']
+outpaint_height = selected_dimension['height']
+
+# Preprocess the upload once per (file, target size) rather than on every rerun
+if uploaded_image is not None:
+    input_image_key = (uploaded_image.file_id, outpaint_width, outpaint_height)
+    if st.session_state['input_image_key'] != input_image_key:
+        processed = preprocess_image(uploaded_image, outpaint_width, outpaint_height)
+        st.session_state['input_image_data'] = processed['image_data']
+        st.session_state['input_image_size'] = (processed['width'], processed['height'])
+        st.session_state['input_image_savings'] = format_bytes_saved(processed)
+        st.session_state['input_image_key'] = input_image_key
+    st.session_state['uploaded_image_name'] = uploaded_image.name
+    st.caption(f"Source image optimized: {st.session_state['input_image_savings']}")
+elif st.session_state['input_image_data'] is not None:
+    st.info(f"Using previously uploaded image: {st.session_state['uploaded_image_name']}")
 else:
-    # Default dimensions
-    outpaint_width = 512
-    outpaint_height = 512
+    st.warning("Please upload a source image for outpainting.")
+    # Without an upload a source can be generated: a reduced-step draft first, full steps once accepted
+    with st.expander("Or generate a source image from a prompt"):
+        source_prompt = st.text_input("Source image prompt", key='source_prompt')
+        if st.button("Generate Source Draft", disabled=not source_prompt):
+            source_payload = {"prompt": source_prompt, "seed": seed}
+            result = invoke_lambda("image_processing", draft_image_payload(source_payload))
+            if result and result.get("statusCode") == 200:
+                st.session_state['source_draft'] = {"image_data": result["image_data"], "payload": source_payload}
+            elif result:
+                st.error(result.get("message", "Unknown error"))
+        source_draft = st.session_state['source_draft']
+        if source_draft:
+            st.image(decode_image(source_draft['image_data']), width=THUMBNAIL_WIDTH,
+                     caption=f"Draft ({DRAFT_STEPS} steps) · seed {source_draft['payload']['seed']}")
+            discard_column, accept_column = st.columns(2)
+            discard_column.button("Discard Source Draft", on_click=discard_source_draft)
+            if accept_column.button("Accept Draft and Render Full Steps"):
+                # Same prompt and seed, at the handler's full step count
+                result = invoke_lambda("image_processing", source_draft['payload'])
+                if result and result.get("statusCode") == 200:
+                    image_bytes = decode_image(result["image_data"])
+                    processed = preprocess_image(BytesIO(image_bytes), outpaint_width, outpaint_height)
+                    st.session_state['input_image_data'] = processed['image_data']
+                    st.session_state['input_image_size'] = (processed['width'], processed['height'])
+                    st.session_state['input_image_savings'] = format_bytes_saved(processed)
+                    st.session_state['input_image_key'] = (
+                        hashlib.sha256(image_bytes).hexdigest(), outpaint_width, outpaint_height
+                    )
+                    st.session_state['uploaded_image_name'] = f"generated from '{source_draft['payload']['prompt'][:40]}'"
+                    st.session_state['source_draft'] = None
+                    st.rerun()
+                elif result:
+                    st.error(result.get("message", "Unknown error"))
 
 # Mask Option Selection
-mask_option = st.selectbox("Select Mask Option:", ["Use Mask Prompt", "Use Mask Image"])
+mask_option = st.selectbox("Select Mask Option:", ["Use Mask Prompt", "Use Mask Image", "Extend Canvas"])
 if mask_option == "Use Mask Prompt":
     mask_prompt = st.text_input(
         "Enter Mask Prompt (required)",
@@ -76,164 +560,241 @@ if mask_option == "Use Mask Prompt":
     )
     st.session_state["mask_prompt"] = mask_prompt
     st.session_state["mask_image_data"] = None  # Clear mask image data
+    st.session_state["mask_image_key"] = None
 elif mask_option == "Use Mask Image":
     uploaded_mask = st.file_uploader(
         "Upload Mask Image (optional)",
         type=["png", "jpg", "jpeg"],
         key='mask_image'
     )
-    if uploaded_mask is not None:
-        st.session_state['mask_image_data'] = encode_image(uploaded_mask)
+    if uploaded_mask is not None and st.session_state['input_image_size'] is not None:
+        # The mask must match the preprocessed source image, so it is repacked whenever that changes
+        mask_image_key = (uploaded_mask.file_id, st.session_state['input_image_size'])
+        if st.session_state['mask_image_key'] != mask_image_key:
+            processed = preprocess_mask(uploaded_mask, *st.session_state['input_image_size'])
+            st.session_state['mask_image_data'] = processed['image_data']
+            st.session_state['mask_image_savings'] = format_bytes_saved(processed)
+            st.session_state['mask_image_key'] = mask_image_key
         st.session_state['uploaded_mask_name'] = uploaded_mask.name
         st.session_state['mask_prompt'] = None  # Clear mask prompt
+        st.caption(f"Mask image packed: {st.session_state['mask_image_savings']}")
+    elif uploaded_mask is not None:
+        st.warning("Please upload the source image before the mask image.")
     elif st.session_state['mask_image_data'] is not None:
         st.info(f"Using previously uploaded mask image: {st.session_state['uploaded_mask_name']}")
     else:
         st.warning("Please upload a mask image.")
+elif mask_option == "Extend Canvas":
+    # Place the source on the target canvas and build the mask here instead of having Titan segment it
+    canvas_anchor = st.selectbox("Place the source image at:", list(ANCHORS), key='canvas_anchor')
+    canvas_feather = st.slider("Feather the mask edge (pixels):", 0, 64, key='canvas_feather')
+    if st.session_state['input_image_data'] is not None:
+        canvas_key = (st.session_state['input_image_key'], outpaint_width, outpaint_height, canvas_anchor, canvas_feather)
+        if st.session_state['canvas_key'] != canvas_key:
+            st.session_state['canvas'] = build_canvas(
+                decode_image(st.session_state['input_image_data']),
+                outpaint_width, outpaint_height, canvas_anchor, canvas_feather
+            )
+            st.session_state['canvas_key'] = canvas_key
+        left, top, right, bottom = st.session_state['canvas']['box']
+        st.caption(f"Source placed at {left},{top} as {right - left} x {bottom - top}; the rest of the canvas is generated.")
 
 # Check conditions and invoke Lambda function
+extend_canvas = mask_option == "Extend Canvas"
 if st.session_state['input_image_data'] and (
-    st.session_state['mask_image_data'] or st.session_state['mask_prompt']
+    extend_canvas or st.session_state['mask_image_data'] or st.session_state['mask_prompt']
 ):
-    if st.button("Generate Outpainting"):
-        # Prepare the payload to match the Lambda function expectations
-        payload = {
-            "prompt": st.session_state["outpaint_prompt"],
-            "input_image_data": st.session_state["input_image_data"],
-            "height": int(outpaint_height),
-            "width": int(outpaint_width),
-            "outPaintingMode": "DEFAULT",
-            "seed": seed
-        }
-
-        # Add the selected mask option to the payload
-        if st.session_state.get("mask_image_data"):
-            payload["mask_image_data"] = st.session_state["mask_image_data"]
-        elif st.session_state.get("mask_prompt"):
-            payload["mask_prompt"] = st.session_state["mask_prompt"]
-
-        # Invoke Lambda function
-        result = invoke_lambda("outpaint", payload)
+    # Prepare the payload to match the Lambda function expectations
+    payload = build_outpaint_payload(
+        st.session_state["outpaint_prompt"],
+        st.session_state['canvas']['image_data'] if extend_canvas else st.session_state["input_image_data"],
+        outpaint_width,
+        outpaint_height,
+        seed,
+        mask_image_data=st.session_state['canvas']['mask_image_data'] if extend_canvas else st.session_state.get("mask_image_data"),
+        mask_prompt=st.session_state.get("mask_prompt")
+    )
+
+    # Sweep mode explores several seeds, cfgScale values and dimensions in parallel
+    sweep_mode = st.checkbox("Sweep mode (multiple seeds, cfgScale values and dimensions)")
+    if sweep_mode:
+        sweep_seeds = st.text_input("Seeds (comma-separated):", value=", ".join(str(seed + i) for i in range(4)))
+        sweep_cfg_scales = st.text_input("cfgScale values (comma-separated):", value="8.0")
+        sweep_dimension_labels = st.multiselect(
+            "Dimensions:",
+            DIMENSION_LABELS,
+            default=[selected_dimension_label]
+        )
+        images_per_call = st.number_input(
+            "Images per seed (generated in one call):", min_value=1, max_value=MAX_IMAGES_PER_CALL, value=1
+        )
+
+    if sweep_mode and st.button("Generate Sweep"):
+        try:
+            cells = build_sweep_cells(
+                payload,
+                parse_number_list(sweep_seeds, int),
+                parse_number_list(sweep_cfg_scales, float),
+                [DIMENSIONS_BY_LABEL[label] for label in sweep_dimension_labels],
+                images_per_call=int(images_per_call)
+            )
+        except ValueError:
+            st.error("Seeds must be integers and cfgScale values must be numbers.")
+            cells = []
+        if extend_canvas and cells:
+            # Each dimension needs its own canvas and mask
+            canvas_source = decode_image(st.session_state['input_image_data'])
+            for cell in cells:
+                cell['payload'] = apply_canvas(
+                    cell['payload'], canvas_source, st.session_state['canvas_anchor'], st.session_state['canvas_feather']
+                )
+
+        # Stream results into the grid as each call completes
+        grid_columns = st.columns(SWEEP_GRID_COLUMNS)
+        placeholders = [grid_columns[i % SWEEP_GRID_COLUMNS].empty() for i in range(len(cells))]
+        sweep_results = [None] * len(cells)
+        for index, outcome in run_sweep(cells):
+            cell = {key: value for key, value in cells[index].items() if key != "payload"}
+            cell.update(outcome)
+            # Decode each output once; reruns render from the raw bytes through the render cache
+            cell['images'] = [decode_output(image_data) for image_data in outcome['images']]
+            sweep_results[index] = cell
+            with placeholders[index].container():
+                render_sweep_cell(index, cell)
+        st.session_state['sweep_results'] = sweep_results
+    elif sweep_mode and st.session_state['sweep_results']:
+        grid_columns = st.columns(SWEEP_GRID_COLUMNS)
+        for index, cell in enumerate(st.session_state['sweep_results']):
+            with grid_columns[index % SWEEP_GRID_COLUMNS]:
+                render_sweep_cell(index, cell)
+
+    # Tiled mode extends the source onto a canvas beyond the model's sizes, a tile per call
+    tiled_mode = extend_canvas and not sweep_mode and st.checkbox("Tiled mode (canvas larger than the model sizes)")
+    if tiled_mode:
+        tiled_columns = st.columns(2)
+        tiled_width = tiled_columns[0].number_input(
+            "Canvas width:", min_value=outpaint_width, max_value=TILED_MAX_SIDE,
+            value=min(TILED_MAX_SIDE, 3 * outpaint_width), step=64
+        )
+        tiled_height = tiled_columns[1].number_input(
+            "Canvas height:", min_value=outpaint_height, max_value=TILED_MAX_SIDE, value=outpaint_height, step=64
+        )
+        if st.button("Generate Tiled"):
+            progress = st.progress(0.0, text="Generating tiles")
+            try:
+                # The source keeps its size and the canvas around it is generated
+                tiled = run_tiled(
+                    decode_image(st.session_state['input_image_data']), int(tiled_width), int(tiled_height),
+                    st.session_state["outpaint_prompt"], seed, anchor=st.session_state['canvas_anchor'], fit=False,
+                    on_tile=lambda done, total: progress.progress(done / total, text=f"{done} of {total} tiles")
+                )
+            except (LambdaInvocationError, ValueError) as e:
+                st.error(str(e))
+            else:
+                use_candidate(tiled['image_bytes'], hashlib.sha256(tiled['image_bytes']).hexdigest(), seed, None)
+                st.success(f"Generated {tiled['width']} x {tiled['height']} from {tiled['tiles']} tiles "
+                           f"in {tiled['waves']} waves ({tiled['seconds']:.1f} s).")
+
+    # Preview mode renders a cheap draft first; the full size is rendered only for an accepted draft
+    # A dimension that is already its own draft size gains nothing from a draft
+    draft_size = draft_dimension(outpaint_width, outpaint_height)
+    draft_needed = (draft_size['width'], draft_size['height']) != (outpaint_width, outpaint_height)
+    preview_mode = (not sweep_mode and not tiled_mode and draft_needed
+                    and st.checkbox("Preview mode (fast low-resolution draft first)"))
+    if preview_mode and st.button("Generate Draft"):
+        draft_payload = draft_outpaint_payload(payload)
+        if extend_canvas:
+            # The draft canvas and mask are built at the draft size like any other dimension
+            draft_payload = apply_canvas(
+                draft_payload, decode_image(st.session_state['input_image_data']),
+                st.session_state['canvas_anchor'], st.session_state['canvas_feather']
+            )
+        try:
+            result = invoke_outpaint(draft_payload)
+        except LambdaInvocationError as e:
+            st.error(str(e))
+            result = None
+        if result and result.get("statusCode") == 200:
+            image_bytes, image_digest = decode_output(result.get("image_data"))
+            # The full payload is kept so accepting renders exactly these parameters and seed
+            st.session_state['draft'] = {
+                "image_bytes": image_bytes, "image_digest": image_digest, "payload": payload,
+                "seed": seed, "dimension_label": selected_dimension_label,
+                "size": f"{draft_payload['width']} x {draft_payload['height']}"
+            }
+        elif result:
+            st.error(result.get("message", "Unknown error"))
+    if preview_mode and st.session_state['draft']:
+        draft = st.session_state['draft']
+        st.image(render_image(draft['image_bytes'], draft['image_digest'], THUMBNAIL_WIDTH),
+                 caption=f"Draft {draft['size']} · seed {draft['seed']} · full size {draft['dimension_label'].split(' (')[0]}")
+        accept_column, discard_column = st.columns(2)
+        discard_column.button("Discard Draft", on_click=discard_draft)
+        if accept_column.button("Accept Draft and Render Full Size"):
+            with tracing.traced() as trace:
+                try:
+                    result = invoke_outpaint(draft['payload'])
+                except LambdaInvocationError as e:
+                    st.error(str(e))
+                    result = None
+                if result and result.get("statusCode") == 200:
+                    image = decode_output(result.get("image_data"))
+                    render_image(*image)
+            remember_trace(trace)
+            if result and result.get("statusCode") == 200:
+                st.session_state['draft'] = None
+                # The seed and dimension widgets are already drawn, so promote the image on a fresh run as for jobs
+                st.session_state['promoted_candidate'] = (*image, draft['seed'], draft['dimension_label'])
+                st.rerun()
+            elif result:
+                st.error(result.get("message", "Unknown error"))
+
+    if not sweep_mode and not tiled_mode and not preview_mode and st.button("Generate in Background"):
+        try:
+            job_id = submit_job("outpaint", payload)
+            st.session_state['jobs'][job_id] = {
+                "label": f"seed {seed} · {selected_dimension_label.split(' (')[0]} · {outpaint_prompt[:40]}",
+                "seed": seed, "dimension_label": selected_dimension_label,
+                "status": PENDING, "message": None, "image": None
+            }
+            track_jobs_in_url()
+            st.success("Outpainting job submitted. Results appear under Background Jobs when ready.")
+        except LambdaInvocationError as e:
+            st.error(str(e))
+
+    if not sweep_mode and not tiled_mode and not preview_mode and st.button("Generate Outpainting"):
+        # One request id covers the invoke, the handler's spans, decoding and the first render
+        with tracing.traced() as trace:
+            # Invoke Lambda function (identical requests are served from the result cache)
+            try:
+                result = invoke_outpaint(payload)
+            except LambdaInvocationError as e:
+                st.error(str(e))
+                result = None
+            if result and result.get("statusCode") == 200:
+                # Hold the output once as raw bytes; reruns render it through the render cache
+                st.session_state['image_bytes'], st.session_state['image_digest'] = decode_output(result.get("image_data"))
+                st.session_state['image_generated'] = True
+                render_image(st.session_state['image_bytes'], st.session_state['image_digest'])
+        remember_trace(trace)
         if result and result.get("statusCode") == 200:
             st.success("Outpainted image generated successfully!")
-            image_data = result.get("image_data")
-            st.session_state['image_data'] = image_data
-            st.session_state['image_generated'] = True
-        else:
+        elif result:
             st.error(result.get("message", "Unknown error"))
 else:
     # Display a warning if requirements are not met
     st.warning("Please upload the main image and provide either a mask prompt or a mask image.")
 
+# Poll background jobs in their own fragment so other widgets stay responsive
+render_jobs_panel()
+
 # Display the generated image if available
-if st.session_state.get('image_generated', False) and st.session_state.get('image_data'):
+if st.session_state.get('image_generated', False) and st.session_state.get('image_bytes'):
     st.subheader("Generated Outpainted Image")
-    image_bytes = decode_image(st.session_state['image_data'])
-    st.image(Image.open(BytesIO(image_bytes)))
+    st.image(render_image(st.session_state['image_bytes'], st.session_state['image_digest']))
+    render_feedback_panel()
 
-    # Rate and Tag Outpainted Image
-    st.subheader("Rate and Tag the Outpainted Image")
-    rating = st.slider(
-        "Rate the outpainted image (1-10):",
-        1,
-        10,
-        st.session_state.get('rating', 5)
-    )
-    st.session_state['rating'] = rating
+# Sync queued saves in their own fragment so a burst of ratings goes out in a few calls
+render_save_queue()
 
-    existing_labels = get_labels()
-    selected_labels = st.multiselect(
-        "Choose tags for this image:",
-        options=list(existing_labels.values()),
-        default=st.session_state.get('selected_labels', [])
-    )
-    st.session_state['selected_labels'] = selected_labels
-
-    # Add new label
-    new_label = st.text_input("Add a new tag (optional):")
-    if st.button("Add Tag") and new_label:
-        add_label_result = invoke_lambda("add_label", {"label_name": new_label})
-        if add_label_result and add_label_result.get('statusCode') == 200:
-            label_data = json.loads(add_label_result['body'])
-            existing_labels[label_data['label_id']] = label_data['label_name']
-            selected_labels.append(label_data['label_name'])
-            st.session_state['selected_labels'] = selected_labels
-            st.success(f"Tag '{new_label}' added.")
-        else:
-            st.error(add_label_result.get("message", "Unknown error"))
-
-    # Convert selected labels to IDs
-    selected_label_ids = [
-        label_id for label_id, label_name in existing_labels.items()
-        if label_name in selected_labels
-    ]
-
-    # Provide Feedback to Optimize Outpainting Prompt
-    st.subheader("Provide Feedback to Optimize Outpainting Prompt")
-    feedback_composition = st.text_area(
-        "Describe improvements in composition (e.g., layout, balance):",
-        value=st.session_state.get('feedback_composition', '')
-    )
-    feedback_lighting = st.text_area(
-        "Describe improvements in lighting (e.g., brightness, shadows):",
-        value=st.session_state.get('feedback_lighting', '')
-    )
-    feedback_style = st.text_area(
-        "Describe preferred style adjustments (e.g., realism, abstract):",
-        value=st.session_state.get('feedback_style', '')
-    )
-    feedback_details = st.text_area(
-        "Describe key features the outpainted image should have:",
-        value=st.session_state.get('feedback_details', '')
-    )
-    feedback_adjustments = st.text_area(
-        "Any other specific adjustments:",
-        value=st.session_state.get('feedback_adjustments', '')
-    )
-
-    # Store feedback in session state
-    st.session_state['feedback_composition'] = feedback_composition
-    st.session_state['feedback_lighting'] = feedback_lighting
-    st.session_state['feedback_style'] = feedback_style
-    st.session_state['feedback_details'] = feedback_details
-    st.session_state['feedback_adjustments'] = feedback_adjustments
-
-    # Optimize Outpainting Prompt
-    if st.button("Optimize Outpainting Prompt"):
-        feedback_payload = {
-            "prompt": st.session_state.get('outpaint_prompt', ''),
-            "seed": seed,
-            "style": "photographic",
-            "suggestion": (
-                f"Composition: {feedback_composition}\n"
-                f"Lighting: {feedback_lighting}\n"
-                f"Style: {feedback_style}\n"
-                f"Details: {feedback_details}\n"
-                f"Adjustments: {feedback_adjustments}"
-            )
-        }
-        result = invoke_lambda("optimize_prompt", feedback_payload)
-        if result and result.get('statusCode') == 200:
-            st.success("Optimized prompt generated based on your feedback!")
-            optimized_prompt = result.get('optimized_prompt')
-            st.session_state['optimized_prompt'] = optimized_prompt
-            st.subheader("Optimized Outpainting Prompt")
-            st.write(optimized_prompt)
-        else:
-            st.error(result.get("message", "Unknown error"))
-
-    # Save Optimized Prompt
-    if st.session_state.get('optimized_prompt') or st.session_state.get('outpaint_prompt'):
-        prompt_to_save = st.session_state.get('optimized_prompt') or st.session_state.get('outpaint_prompt')
-        if st.button("Save Outpainting Prompt"):
-            save_payload = {
-                "prompt": prompt_to_save,
-                "rating": rating,
-                "seed": seed,
-                "LabelsIndex": selected_label_ids
-            }
-            result = invoke_lambda("save_prompt", save_payload)
-            if result and result.get('statusCode') == 200:
-                st.success("Outpainting prompt saved successfully!")
-            else:
-                st.error(result.get("message", "Unknown error"))
+finish_rerun("app", rerun_started)
@@ -0,0 +1,242 @@
+"""
+Headless batch outpainting from a manifest file.
+
+Each manifest row names an input image, a prompt, either a mask prompt or a mask image, a dimension
+and a seed. Rows are JSON objects (one per line, .jsonl) or CSV rows with a header, using the fields:
+
+    image        path of the source image (relative paths are resolved against the manifest)
+    prompt       outpainting prompt
+    mask_prompt  text describing the area to keep, or
+    mask         path of a mask image, or
+    anchor       where to place the source on the target canvas (center, left, top-right, ...) to have
+                 the mask built locally; feather optionally softens its edge by that many pixels
+    dimension    a label from DIMENSIONS_OPTIONS, or just its size, e.g. "1024 x 1024"
+    seed         optional, defaults to --seed
+    id           optional name for the outputs; defaults to a digest of the row
+
+Payloads are built exactly as the app builds them and run on a bounded thread pool. Generated
+images are written to the output directory as each item finishes and every finished item is
+appended to checkpoint.jsonl there, so running the same command again after an interruption
+only does the items that have not succeeded yet.
+
+Backends are those of the app (see INVOCATION_BACKEND): "lambda" invokes the deployed function,
+"direct" runs the handler in this process against Bedrock and "http" posts to lambda_server.py.
+For a dry run without AWS, benchmarks/bench_batch_outpaint.py runs run_batch against the local
+Bedrock stand-in.
+
+Usage: python batch_outpaint.py MANIFEST --output-dir batch_output [--backend lambda|direct|http]
+           [--workers 8] [--seed 42]
+"""
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import SWEEP_MAX_WORKERS, INVOCATION_BACKEND
+from constants.dimensions import DIMENSIONS_OPTIONS
+from utils.backends import BACKENDS, set_default_backend
+from utils.canvas import ANCHORS, build_canvas
+from utils.image_processing import preprocess_image, preprocess_mask
+from utils.outpaint import build_outpaint_payload
+from utils.payload_transport import offload_large_fields, resolve_result_images
+
+# Name of the resume log inside the output directory
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+# Manifest fields that decide what an item generates, and so its default id
+ITEM_FIELDS = ("image", "prompt", "mask_prompt", "mask", "anchor", "feather", "dimension", "seed")
+
+def find_dimension(label):
+    """Return the DIMENSIONS_OPTIONS entry for a full label or its size part ("768 x 1152", "768x1152")."""
+    wanted = label.strip().lower().replace(" ", "")
+    for option in DIMENSIONS_OPTIONS:
+        size = option["label"].split(" (")[0].lower().replace(" ", "")
+        if wanted in (option["label"].lower().replace(" ", ""), size):
+            return option
+    raise ValueError(f"Unknown dimension '{label}'")
+
+def read_manifest(path):
+    """Return the manifest rows as dicts, from JSON Lines or (for .csv files) CSV with a header."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            return [{key: value for key, value in row.items() if value not in (None, "")} for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+def item_id(row):
+    """The row's own id, or a digest of the fields that decide its output so reruns find it again."""
+    if row.get("id"):
+        return str(row["id"])
+    fields = {field: str(row[field]) for field in ITEM_FIELDS if row.get(field) not in (None, "")}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def load_items(manifest_path, default_seed):
+    """Validate the manifest and return its items; raises ValueError naming the first bad row."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    resolve = lambda path: path if os.path.isabs(path) else os.path.join(base_dir, path)
+    items, seen = [], set()
+    for line, row in enumerate(read_manifest(manifest_path), start=1):
+        try:
+            if not row.get("image") or not row.get("prompt"):
+                raise ValueError("image and prompt are required")
+            if not (row.get("mask") or row.get("mask_prompt") or row.get("anchor")):
+                raise ValueError("one of mask, mask_prompt or anchor is required")
+            if row.get("anchor") and row["anchor"] not in ANCHORS:
+                raise ValueError(f"anchor must be one of {', '.join(ANCHORS)}")
+            dimension = find_dimension(row.get("dimension", DIMENSIONS_OPTIONS[0]["label"]))
+            item = {
+                "id": item_id(row),
+                "image": resolve(row["image"]),
+                "mask": resolve(row["mask"]) if row.get("mask") else None,
+                "prompt": row["prompt"],
+                "mask_prompt": row.get("mask_prompt"),
+                "anchor": row.get("anchor"),
+                "feather": int(row.get("feather", 0)),
+                "width": dimension["width"],
+                "height": dimension["height"],
+                "seed": int(row.get("seed", default_seed))
+            }
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Manifest row {line}: {e}") from e
+        if item["id"] in seen:
+            raise ValueError(f"Manifest row {line}: duplicate id '{item['id']}'")
+        seen.add(item["id"])
+        items.append(item)
+    return items
+
+def read_checkpoint(path):
+    """Return the ids of items that already succeeded. A line cut short by a crash is ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+    return done
+
+def build_payload(item):
+    """Preprocess the item's image (and mask) as the app does and build the outpaint payload."""
+    if item["anchor"] and not (item["mask"] or item["mask_prompt"]):
+        with open(item["image"], "rb") as f:
+            canvas = build_canvas(f.read(), item["width"], item["height"], item["anchor"], item["feather"])
+        return build_outpaint_payload(
+            item["prompt"], canvas["image_data"], item["width"], item["height"], item["seed"],
+            mask_image_data=canvas["mask_image_data"]
+        )
+    with open(item["image"], "rb") as f:
+        image = preprocess_image(f, item["width"], item["height"])
+    mask_image_data = None
+    if item["mask"]:
+        with open(item["mask"], "rb") as f:
+            mask_image_data = preprocess_mask(f, image["width"], image["height"])["image_data"]
+    return build_outpaint_payload(
+        item["prompt"], image["image_data"], item["width"], item["height"], item["seed"],
+        mask_image_data=mask_image_data, mask_prompt=item["mask_prompt"]
+    )
+
+def make_invoke(backend):
+    """Return invoke(function_name, payload) for a backend; every backend returns the handler's result dict."""
+    set_default_backend(backend)
+    from utils.aws_lambda import call_lambda
+    return call_lambda
+
+def run_item(item, invoke):
+    """Generate one item and return (images as base64, seconds); raises RuntimeError on a failed call."""
+    start = time.perf_counter()
+    result = resolve_result_images(invoke("outpaint", offload_large_fields(build_payload(item))))
+    if not result or result.get("statusCode") != 200:
+        raise RuntimeError((result or {}).get("message", "Unknown error"))
+    return result.get("images") or [result["image_data"]], time.perf_counter() - start
+
+def write_images(output_dir, item_id, images):
+    """Write the item's images atomically and return their file names."""
+    names = []
+    for index, image_data in enumerate(images):
+        name = f"{item_id}.png" if len(images) == 1 else f"{item_id}_{index}.png"
+        path = os.path.join(output_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(base64.b64decode(image_data))
+        os.replace(path + ".tmp", path)
+        names.append(name)
+    return names
+
+def run_batch(items, output_dir, invoke, workers=SWEEP_MAX_WORKERS):
+    """
+    Run the items not yet in the checkpoint on a pool of workers threads, writing results as
+    they finish. At most twice as many items as workers are in flight, so large manifests do
+    not hold every encoded image in memory. Returns (succeeded, failed, skipped) counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    done = read_checkpoint(checkpoint_path)
+    pending = [item for item in items if item["id"] not in done]
+    skipped, succeeded, failed = len(items) - len(pending), 0, 0
+    if skipped:
+        print(f"Resuming: {skipped} of {len(items)} items already done")
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    queue, in_flight = iter(pending), {}
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            while True:
+                for item in queue:
+                    in_flight[executor.submit(run_item, item, invoke)] = item
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    item = in_flight.pop(future)
+                    entry = {"id": item["id"], "seed": item["seed"], "width": item["width"], "height": item["height"]}
+                    try:
+                        images, elapsed = future.result()
+                        entry.update(status="ok", files=write_images(output_dir, item["id"], images),
+                                     seconds=round(elapsed, 3))
+                        succeeded += 1
+                    except Exception as e:
+                        entry.update(status="failed", message=str(e))
+                        failed += 1
+                    # Images are on disk before the item is checkpointed, so "ok" always means complete
+                    checkpoint.write(json.dumps(entry) + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                    count = skipped + succeeded + failed
+                    print(f"[{count}/{len(items)}] {item['id']} {entry['status']}"
+                          f"{' ' + entry['message'] if entry['status'] == 'failed' else ''}")
+    finally:
+        # Ctrl+C stops here: queued items are dropped and will run on the next invocation
+        executor.shutdown(wait=False, cancel_futures=True)
+    return succeeded, failed, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="JSON Lines (.jsonl) or CSV (.csv) manifest")
+    parser.add_argument("--output-dir", default="batch_output", help="where images and the checkpoint are written")
+    parser.add_argument("--backend", choices=tuple(BACKENDS), default=INVOCATION_BACKEND)
+    parser.add_argument("--workers", type=int, default=SWEEP_MAX_WORKERS, help="concurrent outpaint calls")
+    parser.add_argument("--seed", type=int, default=42, help="seed for rows that do not set one")
+    args = parser.parse_args()
+
+    # Handler INFO logs would drown the progress lines when handlers run in-process
+    logging.disable(logging.INFO)
+    try:
+        items = load_items(args.manifest, args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    succeeded, failed, skipped = run_batch(items, args.output_dir, make_invoke(args.backend),
+                                           workers=args.workers)
+    print(f"Done: {succeeded} succeeded, {failed} failed, {skipped} skipped. Results in {args.output_dir}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare what each invocation backend adds on top of the handler itself, against stubbed Bedrock and DynamoDB.
+
+The "direct" backend calls the handlers in-process; the "http" backend posts to lambda_server.py,
+started here on a background thread. For each handler scenario it reports the median invoke time
+through the backend and the median handler time, whose difference is the transport cost
+(serialization, the HTTP hop and base64 payloads on the wire). Retries and rate limits of
+call_lambda are left out. The remote Lambda backend is not included as it needs a deployment;
+its overhead shows as <function>.lambda_overhead with tracing on.
+
+Usage: python benchmarks/bench_backends.py [--iterations 50] [--port 3101] [--bytes-per-pixel 1.5]
+"""
+import argparse
+import base64
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ["TRACING_ENABLED"] = "true"
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from stubs import StubBedrockClient, stub_client_factory, synthetic_png
+
+def scenarios(args):
+    """Yield (name, function name, payload)."""
+    image = base64.b64encode(synthetic_png(1024, 1024, args.bytes_per_pixel)).decode("utf-8")
+    yield ("outpaint 1024x1024", "outpaint", {"prompt": "Expand the scene", "input_image_data": image,
+                                               "mask_prompt": "the house", "width": 1024, "height": 1024, "seed": 1})
+    yield ("add_label", "add_label", {"label_name": "harbor"})
+    yield ("optimize_prompt", "optimize_prompt", {"prompt": "Expand the scene", "suggestion": "Lighting: warmer"})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per scenario and backend")
+    parser.add_argument("--port", type=int, default=3101, help="port for the local handler server")
+    parser.add_argument("--bytes-per-pixel", type=float, default=1.5, help="encoded size of input and generated images")
+    args = parser.parse_args()
+
+    # The app modules read their configuration on import
+    os.environ["INVOCATION_HTTP_URL"] = f"http://127.0.0.1:{args.port}"
+    import lambda_server
+    from utils.backends import get_backend
+    from utils.lambda_modules import load_handler_module
+    from utils.tracing import tracing
+
+    logging.disable(logging.INFO)
+    load_handler_module("handlerRuntime").set_client_factory(stub_client_factory(
+        bedrock=StubBedrockClient(bytes_per_pixel=args.bytes_per_pixel)
+    ))
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), lambda_server.InvokeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{'scenario':<22} {'backend':<8} {'invoke ms':>9} {'handler ms':>11} {'transport ms':>13}")
+    try:
+        for name, function_name, payload in scenarios(args):
+            # The trace id makes the handler report its own duration
+            payload = dict(payload, **{tracing.TRACE_ID_FIELD: "bench"})
+            for backend in ("direct", "http"):
+                backend = get_backend(backend)
+                backend.invoke(function_name, payload)  # Warm up imports, clients and connections
+                calls, handlers = [], []
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    result, _ = backend.invoke(function_name, payload)
+                    calls.append((time.perf_counter() - start) * 1000)
+                    handlers.append(result[tracing.TRACE_RESPONSE_FIELD]["handler_ms"])
+                call_ms, handler_ms = statistics.median(calls), statistics.median(handlers)
+                print(f"{name:<22} {backend.name:<8} {call_ms:>9.3f} {handler_ms:>11.3f} {call_ms - handler_ms:>13.3f}")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Dry-run batch outpainting against the local Bedrock stand-in, without AWS.
+
+A manifest of --items rows is written to a temporary directory and run_batch from batch_outpaint.py
+generates it in-process, once with a single worker and once with the given number of workers.
+Each stub model call sleeps --model-ms. It reports the wall time and items per second for each
+worker count, then runs the parallel batch again to check that the checkpoint skips every item.
+
+Usage: python benchmarks/bench_batch_outpaint.py [--items 32] [--workers 8] [--model-ms 200]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from PIL import Image
+from stubs import StubBedrockClient, stub_client_factory
+
+def write_manifest(directory, count):
+    """Write a source image and a JSON Lines manifest of count rows that differ by seed."""
+    Image.new("RGB", (768, 512), (90, 140, 200)).save(os.path.join(directory, "source.png"))
+    path = os.path.join(directory, "manifest.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for seed in range(count):
+            f.write(json.dumps({
+                "image": "source.png", "prompt": "Extend the scene", "mask_prompt": "the subject",
+                "dimension": "1024 x 1024", "seed": seed
+            }) + "\n")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=32, help="manifest rows")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent outpaint calls in the parallel run")
+    parser.add_argument("--model-ms", type=float, default=200.0, help="simulated latency of one model call")
+    args = parser.parse_args()
+
+    from batch_outpaint import load_items, run_batch
+    from utils.backends import get_backend
+    from utils.lambda_modules import load_handler_module
+
+    logging.disable(logging.INFO)
+    load_handler_module("handlerRuntime").set_client_factory(stub_client_factory(
+        bedrock=StubBedrockClient(latency=args.model_ms / 1000, bytes_per_pixel=1.5)
+    ))
+    # Straight to the handler: the app's rate limit is sized for Bedrock, not the stand-in
+    direct = get_backend("direct")
+    invoke = lambda function_name, payload: direct.invoke(function_name, payload)[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        items = load_items(write_manifest(directory, args.items), 42)
+        rows = []
+        for workers in (1, args.workers):
+            output_dir = os.path.join(directory, f"output_{workers}")
+            start = time.perf_counter()
+            succeeded, failed, _ = run_batch(items, output_dir, invoke, workers=workers)
+            rows.append((workers, time.perf_counter() - start, succeeded, failed))
+        _, _, skipped = run_batch(items, output_dir, invoke, workers=args.workers)
+
+    print(f"\n{'workers':>7} {'seconds':>8} {'items/s':>8} {'ok':>4} {'failed':>6}")
+    for workers, seconds, succeeded, failed in rows:
+        print(f"{workers:>7} {seconds:>8.2f} {args.items / seconds:>8.1f} {succeeded:>4} {failed:>6}")
+    print(f"speedup {rows[0][1] / rows[1][1]:.1f}x; "
+          f"resume {'ok' if skipped == args.items else 'FAILED'} ({skipped} of {args.items} skipped)")
+
+if __name__ == "__main__":
+    main()
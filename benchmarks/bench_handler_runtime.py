@@ -0,0 +1,76 @@
+"""
+Cold-start versus warm-call benchmark for the shared handler runtime.
+
+Runs every Lambda handler against stubbed clients. "cold" discards the container's clients
+before each call, which is what every invocation paid before clients were module-scoped;
+"warm" reuses them as a warm Lambda container does.
+
+Usage: python benchmarks/bench_handler_runtime.py [--iterations 50] [--setup-ms 60]
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(ROOT_DIR, "lambda_function")
+sys.path.insert(0, LAMBDA_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import handlerRuntime
+from stubs import stub_client_factory
+
+HANDLER_EVENTS = {
+    "outpaintImage": {"prompt": "Expand the scene", "input_image_data": "aW1hZ2U=", "mask_prompt": "sky",
+                      "height": 512, "width": 512},
+    # force_regenerate skips the prompt memo cache, which would otherwise answer every call after the first
+    "optimizePrompt": {"prompt": "Expand the scene", "suggestion": "Lighting: warmer", "force_regenerate": True},
+    "imageProcessing": {"prompt": "Expand the scene", "seed": 42},
+    "savePrompt": {"prompt": "Expand the scene", "rating": 7, "seed": 42},
+    "addLabel": {"label_name": "landscape"},
+}
+
+def measure(handler, event, iterations, cold):
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            handlerRuntime.reset_clients()
+        start = time.perf_counter()
+        handler(dict(event), None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def import_time_ms(module_name):
+    """Time a fresh interpreter importing a handler module (the Lambda init phase)."""
+    code = (
+        "import sys, time; sys.path.insert(0, %r); t = time.perf_counter(); "
+        "import %s; print((time.perf_counter() - t) * 1000)" % (LAMBDA_DIR, module_name)
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(output.stdout) if output.returncode == 0 else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--setup-ms", type=float, default=60.0,
+                        help="simulated cost of building one client (credentials, endpoint, TLS)")
+    args = parser.parse_args()
+
+    # Handler INFO logs would dominate both the output and the timings
+    logging.disable(logging.INFO)
+    handlerRuntime.set_client_factory(stub_client_factory(setup_latency=args.setup_ms / 1000))
+
+    print(f"{'handler':<16} {'import ms':>10} {'cold p50':>10} {'warm p50':>10} {'cold p95':>10} {'warm p95':>10}")
+    for module_name, event in HANDLER_EVENTS.items():
+        handler = __import__(module_name).lambda_handler
+        cold = measure(handler, event, args.iterations, cold=True)
+        warm = measure(handler, event, args.iterations, cold=False)
+        p95 = lambda values: statistics.quantiles(values, n=20)[-1]
+        print(f"{module_name:<16} {import_time_ms(module_name):>10.2f} {statistics.median(cold):>10.2f} "
+              f"{statistics.median(warm):>10.2f} {p95(cold):>10.2f} {p95(warm):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Offline benchmark of every Lambda handler against stubbed Bedrock and DynamoDB.
+
+For each handler scenario (outpainting once per entry in DIMENSIONS_OPTIONS) it measures warm
+per-call latency percentiles, the peak memory one call allocates (tracemalloc), the event and
+response sizes on the wire, and what JSON and base64 (de)serialization of those payloads costs
+on either side of the invocation. Results are written as JSON; pass --compare with an earlier
+results file to print p50 and peak-memory changes per scenario.
+
+Usage: python benchmarks/bench_handlers.py [--iterations 30] [--model-ms 0] [--dynamo-ms 0]
+           [--bytes-per-pixel 1.5] [--output handler_benchmarks.json] [--compare baseline.json]
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "lambda_function"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import handlerRuntime
+from constants.dimensions import DIMENSIONS_OPTIONS
+from stubs import StubBedrockClient, StubDynamoResource, stub_client_factory, synthetic_png
+
+# Largest synchronous Lambda request or response payload
+SYNC_PAYLOAD_LIMIT = 6 * 1024 * 1024
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def latency_summary(timings):
+    return {
+        "p50": statistics.median(timings),
+        "p95": percentile(timings, 0.95),
+        "p99": percentile(timings, 0.99),
+        "mean": statistics.fmean(timings),
+        "max": max(timings)
+    }
+
+def time_ms(function, iterations):
+    """Median time of a call in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def outpaint_event_factory(width, height, args):
+    """Outpainting events as the app sends them: a full-size input image and mask, fresh seed per call."""
+    input_image = synthetic_png(width, height, args.bytes_per_pixel)
+    mask_image = synthetic_png(width, height, args.mask_bytes_per_pixel)
+    encoded = {
+        "input_image_data": base64.b64encode(input_image).decode("utf-8"),
+        "mask_image_data": base64.b64encode(mask_image).decode("utf-8")
+    }
+
+    def make_event(i):
+        return {"prompt": "Expand the scene", **encoded, "height": height, "width": width,
+                "seed": i, "numberOfImages": args.images}
+    return make_event, input_image
+
+def scenarios(args):
+    """Yield (name, module name, dimension, event factory, raw input image or None)."""
+    for option in DIMENSIONS_OPTIONS:
+        make_event, input_image = outpaint_event_factory(option["width"], option["height"], args)
+        yield (f"outpaintImage {option['width']}x{option['height']}", "outpaintImage",
+               {"width": option["width"], "height": option["height"]}, make_event, input_image)
+    yield ("imageProcessing", "imageProcessing", None,
+           lambda i: {"prompt": "A harbor at dawn", "seed": i, "style": "photographic"}, None)
+    yield ("optimizePrompt miss", "optimizePrompt", None,
+           lambda i: {"prompt": f"Expand the scene {i}", "suggestion": "Lighting: warmer"}, None)
+    yield ("optimizePrompt hit", "optimizePrompt", None,
+           lambda i: {"prompt": "Expand the scene", "suggestion": "Lighting: warmer"}, None)
+    yield ("savePrompt", "savePrompt", None,
+           lambda i: {"prompt": f"Expand the scene {i % 10}", "rating": i % 10 + 1, "seed": i,
+                      "labels": ["label-a", "label-b"]}, None)
+    yield ("addLabel", "addLabel", None, lambda i: {"label_name": f"label {i}"}, None)
+    yield (f"addLabel bulk {args.bulk_labels}", "addLabel", None,
+           lambda i: {"label_names": [f"bulk {i} {n}" for n in range(args.bulk_labels)]}, None)
+
+def codec_costs(event, response, input_image, iterations):
+    """Median cost of each (de)serialization step the payloads go through, in milliseconds."""
+    event_json = json.dumps(event)
+    response_json = json.dumps(response)
+    costs = {
+        "event_json_encode_ms": time_ms(lambda: json.dumps(event), iterations),
+        "event_json_decode_ms": time_ms(lambda: json.loads(event_json), iterations),
+        "response_json_encode_ms": time_ms(lambda: json.dumps(response), iterations),
+        "response_json_decode_ms": time_ms(lambda: json.loads(response_json), iterations)
+    }
+    if input_image is not None:
+        costs["input_base64_encode_ms"] = time_ms(lambda: base64.b64encode(input_image), iterations)
+    image_data = response.get("image_data")
+    if image_data:
+        costs["output_base64_decode_ms"] = time_ms(lambda: base64.b64decode(image_data), iterations)
+    return costs
+
+def run_scenario(handler, make_event, input_image, args):
+    handler(make_event(-1), None)  # Warm up: clients, caches and imports are in place before timing
+
+    timings, response = [], None
+    for i in range(args.iterations):
+        event = make_event(i)
+        start = time.perf_counter()
+        response = handler(event, None)
+        timings.append((time.perf_counter() - start) * 1000)
+    if response.get("statusCode") != 200:
+        raise RuntimeError(f"Handler returned {response.get('statusCode')}: {response}")
+
+    # Peak memory is measured in separate calls since tracemalloc slows every allocation down
+    peaks = []
+    tracemalloc.start()
+    for i in range(args.memory_iterations):
+        event = make_event(args.iterations + i)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        handler(event, None)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    event = make_event(0)
+    event_bytes = len(json.dumps(event).encode("utf-8"))
+    response_bytes = len(json.dumps(response).encode("utf-8"))
+    return {
+        "latency_ms": latency_summary(timings),
+        "peak_memory_bytes": max(peaks),
+        "event_bytes": event_bytes,
+        "response_bytes": response_bytes,
+        "over_sync_payload_limit": event_bytes > SYNC_PAYLOAD_LIMIT or response_bytes > SYNC_PAYLOAD_LIMIT,
+        "codec": codec_costs(event, response, input_image, args.codec_iterations)
+    }
+
+def compare(results, baseline_path):
+    """Print the p50 latency and peak memory change of each scenario against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {entry["name"]: entry for entry in json.load(f)["results"]}
+    print(f"\n{'scenario':<32} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'peak MB before':>15} {'after':>8}")
+    for entry in results:
+        before = baseline.get(entry["name"])
+        if before is None:
+            continue
+        old, new = before["latency_ms"]["p50"], entry["latency_ms"]["p50"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{entry['name']:<32} {old:>11.2f} {new:>10.2f} {change:>+7.1f}% "
+              f"{before['peak_memory_bytes'] / 1e6:>15.2f} {entry['peak_memory_bytes'] / 1e6:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=30, help="timed calls per scenario")
+    parser.add_argument("--memory-iterations", type=int, default=3, help="calls traced for peak memory")
+    parser.add_argument("--codec-iterations", type=int, default=10, help="repetitions per codec measurement")
+    parser.add_argument("--model-ms", type=float, default=0.0, help="simulated Bedrock latency per call")
+    parser.add_argument("--dynamo-ms", type=float, default=0.0, help="simulated DynamoDB latency per call")
+    parser.add_argument("--bytes-per-pixel", type=float, default=1.5,
+                        help="encoded size of input and generated images (PNG photos are typically 1-2)")
+    parser.add_argument("--mask-bytes-per-pixel", type=float, default=0.05,
+                        help="encoded size of mask images, which compress far better")
+    parser.add_argument("--images", type=int, default=1, help="numberOfImages per outpainting request")
+    parser.add_argument("--bulk-labels", type=int, default=500, help="names per bulk label import")
+    parser.add_argument("--trace", action="store_true", help="send a trace_id so handlers record spans")
+    parser.add_argument("--only", help="run only scenarios whose name contains this text")
+    parser.add_argument("--output", default="handler_benchmarks.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    # Handler INFO logs would dominate both the output and the timings
+    logging.disable(logging.INFO)
+    bedrock = StubBedrockClient(latency=args.model_ms / 1000, bytes_per_pixel=args.bytes_per_pixel)
+    handlerRuntime.set_client_factory(stub_client_factory(
+        bedrock=bedrock, dynamodb=StubDynamoResource(latency=args.dynamo_ms / 1000)
+    ))
+
+    results = []
+    print(f"{'scenario':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8} {'event KB':>9} {'resp KB':>9}")
+    for name, module_name, dimension, make_event, input_image in scenarios(args):
+        if args.only and args.only not in name:
+            continue
+        handler = __import__(module_name).lambda_handler
+        if args.trace:
+            make_event = (lambda make: lambda i: dict(make(i), trace_id=f"bench-{i}"))(make_event)
+        entry = {"name": name, "handler": module_name, "dimension": dimension,
+                 **run_scenario(handler, make_event, input_image, args)}
+        results.append(entry)
+        latency = entry["latency_ms"]
+        print(f"{name:<32} {latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} "
+              f"{entry['peak_memory_bytes'] / 1e6:>8.2f} {entry['event_bytes'] / 1024:>9.1f} "
+              f"{entry['response_bytes'] / 1024:>9.1f}{'  (over 6 MB)' if entry['over_sync_payload_limit'] else ''}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
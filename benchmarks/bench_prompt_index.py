@@ -0,0 +1,85 @@
+"""
+Similar-prompt index benchmark.
+
+Builds a PromptIndex over synthetic prompts on disk, then measures how long the app takes to
+load it (memory-mapped) and how long single and batched top-k queries take.
+
+Usage: python benchmarks/bench_prompt_index.py [--prompts 100000] [--queries 200] [--batch 16]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from utils.prompt_index import PromptIndex
+
+SUBJECTS = ["beach", "mountain", "forest", "city skyline", "desert", "harbor", "meadow", "castle",
+            "waterfall", "village", "canyon", "lake", "glacier", "market", "garden", "bridge"]
+MODIFIERS = ["at sunset", "at night", "in fog", "under snow", "in spring", "after rain", "at golden hour",
+             "in winter", "under stars", "at dawn", "in autumn", "in a storm"]
+STYLES = ["cinematic", "watercolor", "photorealistic", "oil painting", "minimalist", "wide angle",
+          "pastel tones", "high contrast", "soft light", "dramatic clouds", "film grain", "aerial view"]
+
+def synthetic_prompt(rng):
+    return (f"Expand the {rng.choice(SUBJECTS)} {rng.choice(MODIFIERS)}, "
+            f"{rng.choice(STYLES)}, {rng.choice(STYLES)}, detail {rng.randint(0, 9999)}")
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100)
+    return statistics.median(values), cuts[94], cuts[98]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prompts = [synthetic_prompt(rng) for _ in range(args.prompts)]
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        index = PromptIndex(directory)
+        for offset in range(0, len(prompts), 5000):
+            index.add_many([
+                {"prompt_id": str(offset + i), "prompt": prompt, "rating": rng.randint(1, 10)}
+                for i, prompt in enumerate(prompts[offset:offset + 5000])
+            ])
+        print(f"build: {len(index)} prompts in {time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        index = PromptIndex(directory)
+        print(f"load (memory-mapped): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        index.add("new", "Expand the lighthouse at dusk, cinematic")
+        print(f"incremental add: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        queries = [synthetic_prompt(rng) for _ in range(args.queries)]
+        index.search(queries[0], args.k)  # Page the vectors in before timing
+        single = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            single.append((time.perf_counter() - start) * 1000)
+        batched = []
+        for offset in range(0, len(queries), args.batch):
+            batch = queries[offset:offset + args.batch]
+            start = time.perf_counter()
+            index.search_many(batch, args.k)
+            batched.append((time.perf_counter() - start) * 1000 / len(batch))
+
+    print(f"{'query':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, values in (("single", single), (f"batched x{args.batch} (per query)", batched)):
+        p50, p95, p99 = percentiles(values)
+        print(f"{name:<24} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+
+if __name__ == "__main__":
+    main()
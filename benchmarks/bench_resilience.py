@@ -0,0 +1,83 @@
+"""
+Burst benchmark for the resilience layer against a Bedrock stub that enforces a quota.
+
+Fires a burst of concurrent outpainting requests at the handler while the stub throttles calls
+above --quota requests per second (plus --throttle-rate random throttles), and compares:
+  no-retry   one attempt, as before the resilience layer
+  retry      throttle-aware jittered backoff and the circuit breaker
+  limited    the same plus a token bucket sized to the quota, so the burst queues instead
+For each it reports served/throttled/failed responses, retry and shed counters and latency.
+
+Usage: python benchmarks/bench_resilience.py [--requests 60] [--concurrency 16] [--quota 10] [--model-ms 50]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "lambda_function"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import handlerRuntime
+import outpaintImage
+import resilience
+from stubs import StubBedrockClient, stub_client_factory
+
+MODEL_ID = "amazon.titan-image-generator-v1"
+
+def policies(args):
+    yield "no-retry", resilience.Resilience(MODEL_ID, max_attempts=1)
+    yield "retry", resilience.Resilience(MODEL_ID, max_attempts=args.attempts, breaker=resilience.CircuitBreaker())
+    yield "limited", resilience.Resilience(
+        MODEL_ID, max_attempts=args.attempts, breaker=resilience.CircuitBreaker(),
+        limiter=resilience.TokenBucket(args.quota), max_wait=args.max_wait
+    )
+
+def run_burst(args):
+    def request(i):
+        start = time.perf_counter()
+        response = outpaintImage.lambda_handler({
+            "prompt": "Expand the scene", "input_image_data": "aW1hZ2U=", "mask_prompt": "sky", "seed": i
+        }, None)
+        return response["statusCode"], (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        return list(executor.map(request, range(args.requests)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--quota", type=float, default=10.0, help="model requests per second before throttling")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls throttled at random")
+    parser.add_argument("--model-ms", type=float, default=50.0)
+    parser.add_argument("--attempts", type=int, default=resilience.BEDROCK_MAX_ATTEMPTS)
+    parser.add_argument("--max-wait", type=float, default=resilience.RATE_LIMIT_MAX_WAIT_SECONDS)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'policy':<10} {'200':>5} {'429':>5} {'503':>5} {'500':>5} {'retries':>8} {'throttles':>10} "
+          f"{'shed':>5} {'p50 ms':>8} {'p95 ms':>8} {'wall s':>7}")
+    for name, policy in policies(args):
+        # Fresh stub per policy so each burst starts with a full quota
+        bedrock = StubBedrockClient(latency=args.model_ms / 1000, requests_per_second=args.quota,
+                                    throttle_rate=args.throttle_rate)
+        handlerRuntime.set_client_factory(stub_client_factory(bedrock=bedrock))
+        resilience.set_model_policy(MODEL_ID, policy)
+        start = time.perf_counter()
+        outcomes = run_burst(args)
+        wall = time.perf_counter() - start
+        statuses = [status for status, _ in outcomes]
+        latencies = sorted(latency for _, latency in outcomes)
+        counters = policy.snapshot()
+        print(f"{name:<10} {statuses.count(200):>5} {statuses.count(429):>5} {statuses.count(503):>5} "
+              f"{statuses.count(500):>5} {counters['retries']:>8} {counters['throttles']:>10} {counters['shed']:>5} "
+              f"{statistics.median(latencies):>8.0f} {latencies[int(0.95 * (len(latencies) - 1))]:>8.0f} {wall:>7.2f}")
+    resilience.set_model_policy(MODEL_ID, None)
+
+if __name__ == "__main__":
+    main()
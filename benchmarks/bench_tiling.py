@@ -0,0 +1,74 @@
+"""
+Measure tiled outpainting of canvases beyond the model's sizes against a stub tile generator.
+
+A source image is placed on a large canvas and run_tiled generates the rest as overlapping tiles,
+once with a single worker and once with the given number of workers. Each stub call sleeps
+--model-ms, standing in for a Bedrock call. For each canvas it reports the tiles, dependency waves,
+wall time per worker count and the speedup, and checks that the result has the canvas size and
+that the source pixels came through unchanged.
+
+Usage: python benchmarks/bench_tiling.py [--workers 8] [--model-ms 200] [--overlap 128]
+"""
+import argparse
+import logging
+import os
+import sys
+from io import BytesIO
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import numpy as np
+from PIL import Image
+from stubs import StubOutpaintModel
+
+# (name, canvas width, canvas height, anchor)
+CANVASES = [
+    ("banner 4096x1024", 4096, 1024, "center"),
+    ("panorama 3072x1536", 3072, 1536, "left"),
+    ("poster 2048x3072", 2048, 3072, "top"),
+    ("square 4096x4096", 4096, 4096, "center"),
+]
+
+def source_png(width, height):
+    """A gradient source image, so any change to its pixels shows."""
+    xs = np.linspace(0, 255, width, dtype=np.uint8)[None, :].repeat(height, axis=0)
+    ys = np.linspace(0, 255, height, dtype=np.uint8)[:, None].repeat(width, axis=1)
+    buffer = BytesIO()
+    Image.fromarray(np.dstack([xs, ys, 255 - xs])).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent tiles in the parallel run")
+    parser.add_argument("--model-ms", type=float, default=200.0, help="simulated latency of one tile")
+    parser.add_argument("--overlap", type=int, default=128, help="pixels shared by neighbouring tiles")
+    args = parser.parse_args()
+
+    from utils.canvas import place_source
+    from utils.tiling import run_tiled
+
+    logging.disable(logging.INFO)
+    image_bytes = source_png(1024, 768)
+    source = Image.open(BytesIO(image_bytes)).convert("RGB")
+    print(f"{'canvas':<20} {'tiles':>5} {'waves':>5} {'1 worker s':>10} {f'{args.workers} workers s':>12} "
+          f"{'speedup':>7} {'peak':>4}  check")
+    for name, width, height, anchor in CANVASES:
+        seconds = []
+        for workers in (1, args.workers):
+            model = StubOutpaintModel(latency=args.model_ms / 1000)
+            result = run_tiled(image_bytes, width, height, "Extend the scene", 7, generate=model,
+                               anchor=anchor, fit=False, overlap=args.overlap, max_workers=workers)
+            seconds.append(result["seconds"])
+
+        output = np.asarray(Image.open(BytesIO(result["image_bytes"])).convert("RGB"))
+        left, top, right, bottom = place_source(source.width, source.height, width, height, anchor, fit=False)
+        placed = np.asarray(source.resize((right - left, bottom - top), Image.LANCZOS))
+        checks = [output.shape[:2] == (height, width), np.array_equal(output[top:bottom, left:right], placed)]
+        print(f"{name:<20} {result['tiles']:>5} {result['waves']:>5} {seconds[0]:>10.2f} {seconds[1]:>12.2f} "
+              f"{seconds[0] / seconds[1]:>6.1f}x {model.max_in_progress:>4}  {'ok' if all(checks) else 'FAILED'}")
+
+if __name__ == "__main__":
+    main()
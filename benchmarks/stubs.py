@@ -0,0 +1,371 @@
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+# A few KB of bytes standing in for a generated PNG
+DEFAULT_IMAGE_BYTES = b"\x89PNG\r\n\x1a\n" + bytes(4096)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+DEFAULT_COMPLETION = " A wide cinematic landscape at golden hour, expanded scene."
+
+# Key attributes of the tables in the SAM template; unknown tables fall back to a single hash key
+KEY_SCHEMAS = {
+    "LabelsTable": ("label_id",),
+    "PromptsTable": ("prompt_id",),
+    "PromptTagsTable": ("label_id", "tag_sort"),
+    "RatingEventsTable": ("prompt_id", "event_sort"),
+    "JobsTable": ("job_id",),
+    "PromptCacheTable": ("cache_key",),
+}
+
+def synthetic_png(width, height, bytes_per_pixel):
+    """Return stand-in PNG bytes of the size an encoded width x height image would have."""
+    size = max(int(width * height * bytes_per_pixel), len(PNG_SIGNATURE))
+    return PNG_SIGNATURE + bytes(size - len(PNG_SIGNATURE))
+
+class StubBody:
+    """Mimics the StreamingBody returned by invoke_model."""
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+class StubBedrockClient:
+    """
+    Local stand-in for the bedrock-runtime client with configurable latency and image size.
+    Responses follow the shape of the Titan, Stable Diffusion and Claude models used by the handlers.
+    With bytes_per_pixel set, each image is sized for the requested width and height (1024 x 1024 when
+    the request has none); otherwise every image is image_bytes. Response bodies are built once per shape
+    so the stub's own encoding does not show up in the handler timings.
+    Throttles can be injected: requests_per_second models the account quota (calls above it raise
+    ThrottlingException, as Bedrock does) and throttle_rate throttles that fraction of calls at random.
+    """
+    def __init__(self, latency=0.0, image_bytes=DEFAULT_IMAGE_BYTES, bytes_per_pixel=None,
+                 completion=DEFAULT_COMPLETION, requests_per_second=None, throttle_rate=0.0, seed=0):
+        self.latency = latency
+        self.image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+        self.bytes_per_pixel = bytes_per_pixel
+        self.completion = completion
+        self.requests_per_second = requests_per_second
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self.throttled = 0
+        self._bodies = {}
+        self._random = random.Random(seed)
+        self._quota_tokens = requests_per_second or 0
+        self._quota_updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _check_quota(self, operation):
+        with self._lock:
+            self.calls += 1
+            throttled = self._random.random() < self.throttle_rate
+            if self.requests_per_second and not throttled:
+                now = time.monotonic()
+                self._quota_tokens = min(self.requests_per_second,
+                                         self._quota_tokens + (now - self._quota_updated) * self.requests_per_second)
+                self._quota_updated = now
+                throttled = self._quota_tokens < 1
+                if not throttled:
+                    self._quota_tokens -= 1
+            if throttled:
+                self.throttled += 1
+        if throttled:
+            raise stub_client_error("ThrottlingException", operation)
+
+    def _image_base64(self, width, height):
+        if self.bytes_per_pixel is None:
+            return self.image_base64
+        return base64.b64encode(synthetic_png(width, height, self.bytes_per_pixel)).decode("utf-8")
+
+    def _response_body(self, modelId, request):
+        if modelId.startswith("amazon.titan-image"):
+            config = request.get("imageGenerationConfig", {})
+            shape = (modelId, config.get("width", 1024), config.get("height", 1024), config.get("numberOfImages", 1))
+        elif modelId.startswith("stability."):
+            shape = (modelId, request.get("width", 1024), request.get("height", 1024), 1)
+        else:
+            shape = (modelId,)
+        body = self._bodies.get(shape)
+        if body is None:
+            if modelId.startswith("amazon.titan-image"):
+                response = {"images": [self._image_base64(shape[1], shape[2])] * shape[3]}
+            elif modelId.startswith("stability."):
+                response = {"artifacts": [{"base64": self._image_base64(shape[1], shape[2])}]}
+            else:
+                response = {"completion": self.completion}
+            body = self._bodies[shape] = json.dumps(response).encode("utf-8")
+        return body
+
+    def invoke_model(self, modelId, body, accept="application/json", contentType="application/json"):
+        self._check_quota("InvokeModel")
+        time.sleep(self.latency)
+        return {"body": StubBody(self._response_body(modelId, json.loads(body)))}
+
+    def invoke_model_with_response_stream(self, modelId, body, accept="application/json",
+                                          contentType="application/json"):
+        self._check_quota("InvokeModelWithResponseStream")
+        words = self.completion.split(" ")
+        return {"body": StubEventStream(words, self.latency / max(len(words), 1))}
+
+class StubEventStream:
+    """Mimics the EventStream of invoke_model_with_response_stream, yielding one chunk per word."""
+    def __init__(self, words, chunk_latency):
+        self.words = words
+        self.chunk_latency = chunk_latency
+        self.closed = False
+
+    def __iter__(self):
+        for index, word in enumerate(self.words):
+            if self.closed:
+                return
+            time.sleep(self.chunk_latency)
+            completion = word if index == 0 else " " + word
+            yield {"chunk": {"bytes": json.dumps({"completion": completion}).encode("utf-8")}}
+
+    def close(self):
+        self.closed = True
+
+class StubOutpaintModel:
+    """
+    Local stand-in for a tile generator: generate(payload) takes an outpaint payload and returns a base64 PNG
+    of its width x height in which the pixels the mask marks for generation are filled with a colour that
+    varies per call, while kept pixels are returned unchanged, so callers can check what they blend.
+    Tracks calls and the highest number of calls in progress at once.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.in_progress = 0
+        self.max_in_progress = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, payload):
+        import numpy as np
+        from io import BytesIO
+        from PIL import Image
+
+        with self._lock:
+            self.calls += 1
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress, self.in_progress)
+            call = self.calls
+        try:
+            time.sleep(self.latency)
+            size = (payload["width"], payload["height"])
+            image = Image.open(BytesIO(base64.b64decode(payload["input_image_data"]))).convert("RGB").resize(size)
+            mask = Image.open(BytesIO(base64.b64decode(payload["mask_image_data"]))).convert("L").resize(size)
+            pixels = np.array(image)
+            pixels[np.asarray(mask) >= 128] = ((call * 67) % 256, (call * 131) % 256, (call * 29) % 256)
+            buffer = BytesIO()
+            Image.fromarray(pixels).save(buffer, format="PNG")
+            return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        finally:
+            with self._lock:
+                self.in_progress -= 1
+
+def stub_client_error(code, operation):
+    """Build the botocore ClientError a service raises for an error code."""
+    from botocore.exceptions import ClientError
+    return ClientError({"Error": {"Code": code, "Message": f"Stubbed {code}"}}, operation)
+
+_CONDITION_NOT_EXISTS = re.compile(r"^attribute_not_exists\((#?\w+)\)$")
+_CONDITION_EXISTS = re.compile(r"^attribute_exists\((#?\w+)\)$")
+_CONDITION_EQUALS = re.compile(r"^(#?\w+)\s*=\s*(:\w+)$")
+_IF_NOT_EXISTS = re.compile(r"^if_not_exists\((#?\w+),\s*(:\w+)\)$")
+
+def _split_top_level(text):
+    """Split an expression on commas that are not inside parentheses."""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:index].strip())
+            start = index + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+def condition_holds(item, expression, names, values):
+    """
+    Evaluate the condition forms the handlers use: attribute_not_exists(a), attribute_exists(a)
+    and a = :v, alone or joined with OR.
+    """
+    if not expression:
+        return True
+    if " OR " in expression:
+        return any(condition_holds(item, part, names, values) for part in expression.split(" OR "))
+    match = _CONDITION_EXISTS.match(expression.strip())
+    if match:
+        return item is not None and names.get(match.group(1), match.group(1)) in item
+    match = _CONDITION_NOT_EXISTS.match(expression.strip())
+    if match:
+        return item is None or names.get(match.group(1), match.group(1)) not in item
+    match = _CONDITION_EQUALS.match(expression.strip())
+    if match:
+        name = names.get(match.group(1), match.group(1))
+        return item is not None and item.get(name) == values[match.group(2)]
+    raise ValueError(f"Unsupported condition in stub: {expression}")
+
+def apply_update(item, expression, names, values):
+    """Apply an UpdateExpression made of a SET clause (plain values or if_not_exists) and an ADD clause."""
+    match = re.match(r"^\s*(?:SET\s+(?P<set>.*?))?\s*(?:ADD\s+(?P<add>.*))?$", expression, re.S)
+    for clause in _split_top_level(match.group("set") or ""):
+        target, value = (part.strip() for part in clause.split("=", 1))
+        name = names.get(target, target)
+        default = _IF_NOT_EXISTS.match(value)
+        if default:
+            item.setdefault(names.get(default.group(1), default.group(1)), values[default.group(2)])
+            item[name] = item[names.get(default.group(1), default.group(1))]
+        else:
+            item[name] = values[value]
+    for clause in _split_top_level(match.group("add") or ""):
+        target, value = clause.split()
+        name = names.get(target, target)
+        item[name] = item.get(name, 0) + values[value]
+    return item
+
+class StubTable:
+    """In-memory stand-in for a DynamoDB Table, keyed on the table's key schema."""
+    def __init__(self, name, latency=0.0, key_names=None):
+        self.name = name
+        self.latency = latency
+        self.key_names = key_names or KEY_SCHEMAS.get(name)
+        self.items = {}
+
+    def _key(self, key):
+        return tuple(sorted(key.items()))
+
+    def _item_key(self, item):
+        key_names = self.key_names or (("label_id",) if "label_id" in item else ("prompt_id",))
+        return self._key({name: item[name] for name in key_names})
+
+    def get_item(self, Key, **kwargs):
+        time.sleep(self.latency)
+        item = self.items.get(self._key(Key))
+        return {"Item": dict(item)} if item is not None else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **kwargs):
+        time.sleep(self.latency)
+        key = self._item_key(Item)
+        if not condition_holds(self.items.get(key), ConditionExpression,
+                               ExpressionAttributeNames or {}, ExpressionAttributeValues or {}):
+            raise stub_client_error("ConditionalCheckFailedException", "PutItem")
+        self.items[key] = dict(Item)
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ConditionExpression=None, ReturnValues="NONE", **kwargs):
+        time.sleep(self.latency)
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        previous = self.items.get(self._key(Key))
+        if not condition_holds(previous, ConditionExpression, names, values):
+            raise stub_client_error("ConditionalCheckFailedException", "UpdateItem")
+        item = apply_update(dict(previous or Key), UpdateExpression, names, values)
+        self.items[self._key(Key)] = item
+        if ReturnValues == "ALL_OLD":
+            return {"Attributes": dict(previous)} if previous else {}
+        if ReturnValues == "ALL_NEW":
+            return {"Attributes": dict(item)}
+        return {}
+
+    def delete_item(self, Key, **kwargs):
+        time.sleep(self.latency)
+        self.items.pop(self._key(Key), None)
+        return {}
+
+    def scan(self, **kwargs):
+        time.sleep(self.latency)
+        return {"Items": [dict(item) for item in self.items.values()]}
+
+class StubDynamoResource:
+    """Stand-in for boto3.resource("dynamodb") that hands out shared StubTables."""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {}
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = StubTable(name, latency=self.latency)
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        time.sleep(self.latency)
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            responses[name] = [dict(table.items[table._key(key)]) for key in request["Keys"]
+                               if table._key(key) in table.items]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            for request in requests:
+                if "PutRequest" in request:
+                    item = request["PutRequest"]["Item"]
+                    table.items[table._item_key(item)] = dict(item)
+                else:
+                    table.items.pop(table._key(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+class StubDynamoClient:
+    """
+    Stand-in for the low-level boto3.client("dynamodb"), backed by the resource's tables.
+    Only transact_write_items is provided; typed attribute values are converted with boto3's deserializer.
+    """
+    def __init__(self, resource):
+        self.resource = resource
+
+    def transact_write_items(self, TransactItems):
+        from boto3.dynamodb.types import TypeDeserializer
+        deserializer = TypeDeserializer()
+        plain = lambda values: {key: deserializer.deserialize(value) for key, value in (values or {}).items()}
+
+        time.sleep(self.resource.latency)
+        writes = []
+        for entry in TransactItems:
+            (action, request), = entry.items()
+            table = self.resource.Table(request["TableName"])
+            key = table._item_key(plain(request["Item"])) if action == "Put" else table._key(plain(request["Key"]))
+            names, values = request.get("ExpressionAttributeNames", {}), plain(request.get("ExpressionAttributeValues"))
+            if not condition_holds(table.items.get(key), request.get("ConditionExpression"), names, values):
+                raise stub_client_error("TransactionCanceledException", "TransactWriteItems")
+            writes.append((action, table, key, request, names, values))
+        for action, table, key, request, names, values in writes:
+            if action == "Put":
+                table.items[key] = plain(request["Item"])
+            elif action == "Delete":
+                table.items.pop(key, None)
+            else:
+                base = table.items.get(key) or plain(request["Key"])
+                table.items[key] = apply_update(dict(base), request["UpdateExpression"], names, values)
+        return {}
+
+def stub_client_factory(setup_latency=0.0, bedrock=None, dynamodb=None):
+    """
+    Build a factory for handlerRuntime.set_client_factory that returns stubs.
+    setup_latency models the per-client cost of credential resolution, endpoint setup and TLS.
+    """
+    bedrock = bedrock or StubBedrockClient()
+    dynamodb = dynamodb or StubDynamoResource()
+    dynamodb_client = StubDynamoClient(dynamodb)
+
+    def factory(kind, service_name):
+        time.sleep(setup_latency)
+        if service_name == "bedrock-runtime":
+            return bedrock
+        if service_name == "dynamodb":
+            return dynamodb if kind == "resource" else dynamodb_client
+        raise ValueError(f"No stub available for {kind} '{service_name}'")
+
+    return factory
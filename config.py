@@ -10,7 +10,83 @@ LAMBDA_ARNS = {
     "optimize_prompt": os.environ.get('OPTIMIZE_PROMPT_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-OptimizePromptFunction'),
     "save_prompt": os.environ.get('SAVE_PROMPT_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-SavePromptFunction'),
     "add_label": os.environ.get('ADD_LABEL_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-AddLabelFunction'),
+    "query_prompts_by_tag": os.environ.get('QUERY_PROMPTS_BY_TAG_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-QueryPromptsByTagFunction'),
+    "top_prompts": os.environ.get('TOP_PROMPTS_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-TopPromptsFunction'),
+    "batch_save_prompts": os.environ.get('BATCH_SAVE_PROMPTS_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-BatchSavePromptsFunction'),
+    "image_processing": os.environ.get('IMAGE_PROCESSING_LAMBDA_ARN', 'arn:aws:lambda:us-east-1:992382611204:function:image-generation-stack-11570251675-ImageProcessingFunction'),
 }
 
+# Invocation Backend ("lambda" invokes the deployed functions; "direct" calls the handlers in this process
+# without serialization; "http" posts to a local handler server such as lambda_server.py over pooled connections)
+INVOCATION_BACKEND = os.environ.get('INVOCATION_BACKEND', 'lambda')
+INVOCATION_HTTP_URL = os.environ.get('INVOCATION_HTTP_URL', 'http://127.0.0.1:3001')
+INVOCATION_HTTP_TIMEOUT_SECONDS = float(os.environ.get('INVOCATION_HTTP_TIMEOUT_SECONDS', 120))
+
 # DynamoDB Table Names
 LABELS_TABLE_NAME = os.environ.get('LABELS_TABLE_NAME', 'LabelsTable')
+PROMPTS_TABLE_NAME = os.environ.get('PROMPTS_TABLE_NAME', 'PromptsTable')
+
+# Outpaint Result Cache (in-process tier shared by all Streamlit sessions)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Parallel Outpaint Sweeps
+SWEEP_MAX_WORKERS = int(os.environ.get('SWEEP_MAX_WORKERS', 8))
+LAMBDA_MAX_POOL_CONNECTIONS = max(SWEEP_MAX_WORKERS, 10)
+
+# Asynchronous Outpaint Jobs (set the *_DIR variables to use local stand-ins instead of AWS)
+JOBS_TABLE_NAME = os.environ.get('JOBS_TABLE_NAME', 'JobsTable')
+JOB_STORE_DIR = os.environ.get('JOB_STORE_DIR')
+OBJECT_STORE_BUCKET = os.environ.get('OBJECT_STORE_BUCKET')
+OBJECT_STORE_DIR = os.environ.get('OBJECT_STORE_DIR')
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 2))
+
+# Payload Offloading (an uploaded image is not uploaded again for this long; keep it well under the
+# payloads/ lifecycle expiry in the SAM template so a remembered upload is never already gone)
+PAYLOAD_UPLOAD_MEMO_SECONDS = float(os.environ.get('PAYLOAD_UPLOAD_MEMO_SECONDS', 24 * 60 * 60))
+
+# Label Catalog (labels are rescanned at most once per TTL; tags added in the app apply immediately)
+LABEL_CATALOG_TTL_SECONDS = float(os.environ.get('LABEL_CATALOG_TTL_SECONDS', 300))
+
+# Tag Browser (prompts listed per page when browsing saved prompts by tag)
+TAG_BROWSER_PAGE_SIZE = int(os.environ.get('TAG_BROWSER_PAGE_SIZE', 10))
+
+# Top Prompts (best-rated prompts offered as starting points, overall or per tag)
+TOP_PROMPTS_COUNT = int(os.environ.get('TOP_PROMPTS_COUNT', 10))
+
+# Save Queue (saves are buffered per session and sent in one call once enough are waiting or the oldest is this old)
+SAVE_QUEUE_MAX_ITEMS = int(os.environ.get('SAVE_QUEUE_MAX_ITEMS', 10))
+SAVE_QUEUE_MAX_AGE_SECONDS = float(os.environ.get('SAVE_QUEUE_MAX_AGE_SECONDS', 5))
+
+# Similar-Prompt Index (memory-mapped on startup; built from PromptsTable if the directory is empty,
+# then refreshed with the prompts saved since its newest entry on load and at most this often)
+PROMPT_INDEX_DIR = os.environ.get('PROMPT_INDEX_DIR', '.prompt_index')
+PROMPT_INDEX_REFRESH_SECONDS = float(os.environ.get('PROMPT_INDEX_REFRESH_SECONDS', 60))
+SIMILAR_PROMPTS_COUNT = int(os.environ.get('SIMILAR_PROMPTS_COUNT', 5))
+
+# Canvas Expansion (the source is placed on the target canvas and the keep/fill mask is built locally;
+# results are shared by all sessions, per source image, dimension, anchor and feather)
+CANVAS_CACHE_MAX_BYTES = int(os.environ.get('CANVAS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Tiled Outpainting (canvases beyond the model's sizes are generated as overlapping tiles, wave by wave)
+TILE_OVERLAP = int(os.environ.get('TILE_OVERLAP', 128))
+TILE_MAX_WORKERS = int(os.environ.get('TILE_MAX_WORKERS', SWEEP_MAX_WORKERS))
+TILED_MAX_SIDE = int(os.environ.get('TILED_MAX_SIDE', 4096))
+
+# Progressive Preview (drafts render at the smallest 512-tier dimension of the same aspect ratio, and
+# image_processing drafts with fewer steps; the full render runs only once a draft is accepted)
+DRAFT_STEPS = int(os.environ.get('DRAFT_STEPS', 15))
+
+# Render Cache (decoded display images shared by all sessions)
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+
+# Tracing (request ids and per-stage spans for every Lambda call; rolling percentiles in the Diagnostics panel)
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'
+
+# Resilience (Lambda calls retry throttles with jittered backoff and fail fast behind a circuit breaker;
+# calls to model-calling functions queue on a token bucket sized to the Bedrock quota)
+LAMBDA_MAX_ATTEMPTS = int(os.environ.get('LAMBDA_MAX_ATTEMPTS', 4))
+MODEL_FUNCTIONS = ("outpaint", "optimize_prompt", "image_processing")
+BEDROCK_REQUESTS_PER_MINUTE = float(os.environ.get('BEDROCK_REQUESTS_PER_MINUTE', 60))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get('RATE_LIMIT_MAX_WAIT_SECONDS', 30))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get('CIRCUIT_RESET_SECONDS', 30))
@@ -25,4 +25,8 @@ DIMENSIONS_OPTIONS = [
     {"label": "704 x 320 (11:5) - Price: Equivalent to 512 x 512", "width": 704, "height": 320},
     {"label": "1152 x 640 (9:5) - Price: Equivalent to 1024 x 1024", "width": 1152, "height": 640},
     {"label": "1173 x 640 (16:9) - Price: Equivalent to 1024 x 1024", "width": 1173, "height": 640},
-]
\ No newline at end of file
+]
+
+# Lookups built once at import instead of scanning DIMENSIONS_OPTIONS on every rerun
+DIMENSION_LABELS = [option["label"] for option in DIMENSIONS_OPTIONS]
+DIMENSIONS_BY_LABEL = {option["label"]: option for option in DIMENSIONS_OPTIONS}
@@ -1,16 +1,109 @@
-import boto3
 import hashlib
 import logging
 import json
+import os
+from handlerRuntime import get_resource, get_table, client_error_code, batch_put_items, batch_backoff, MAX_BATCH_ATTEMPTS
+from tracing import span, traced_handler
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Table name (ensure this matches your actual table name)
+LABELS_TABLE_NAME = os.environ.get("LABELS_TABLE_NAME", "LabelsTable")
+
+# Keys per BatchGetItem call
+BATCH_GET_SIZE = 100
+
+# Largest taxonomy accepted in one bulk call
+MAX_BULK_LABELS = 5000
+
+def label_id_for(label_name):
+    """Generate the unique identifier for a label."""
+    return hashlib.sha256(label_name.encode('utf-8')).hexdigest()
+
+def existing_label_ids(label_ids):
+    """Return the subset of label ids already in the table, reading up to 100 keys per call."""
+    dynamodb = get_resource("dynamodb")
+    found = set()
+    for start in range(0, len(label_ids), BATCH_GET_SIZE):
+        request = {LABELS_TABLE_NAME: {
+            "Keys": [{"label_id": label_id} for label_id in label_ids[start:start + BATCH_GET_SIZE]],
+            "ProjectionExpression": "label_id"
+        }}
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            found.update(item["label_id"] for item in response.get("Responses", {}).get(LABELS_TABLE_NAME, []))
+            request = response.get("UnprocessedKeys")
+            if not request:
+                break
+            batch_backoff(attempt)
+        else:
+            raise RuntimeError("Labels table kept throttling lookups; try a smaller import.")
+    return found
+
+def add_labels(label_names):
+    """
+    Create many labels at once. Names are deduplicated by id; existing labels are found with
+    batched reads and only new ones are written. BatchWriteItem cannot carry conditions, but a
+    label item is fully determined by its name, so a concurrent import writing the same label is harmless.
+    """
+    labels = {}
+    for label_name in label_names:
+        labels.setdefault(label_id_for(label_name), label_name)
+    label_ids = list(labels)
+
+    existing = existing_label_ids(label_ids)
+    new_items = [{"label_id": label_id, "label_name": labels[label_id]} for label_id in label_ids
+                 if label_id not in existing]
+    failed = {item["label_id"] for item in batch_put_items(LABELS_TABLE_NAME, new_items)}
+
+    results = []
+    for label_id in label_ids:
+        if label_id in existing:
+            status = "existing"
+        elif label_id in failed:
+            status = "failed"
+        else:
+            status = "created"
+        results.append({"label_id": label_id, "label_name": labels[label_id], "status": status})
+    return results
+
+def bulk_handler(label_names):
+    if not isinstance(label_names, list) or not all(isinstance(name, str) and name for name in label_names):
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": "'label_names' must be a list of non-empty strings."})
+        }
+    if len(label_names) > MAX_BULK_LABELS:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": f"At most {MAX_BULK_LABELS} labels can be imported per request."})
+        }
+
+    try:
+        with span("addLabel.add_labels", labels=len(label_names)):
+            results = add_labels(label_names)
+    except Exception as e:
+        logger.error(f"Error importing labels: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": f"Error importing labels: {str(e)}"})
+        }
+
+    counts = {status: sum(1 for result in results if result["status"] == status)
+              for status in ("created", "existing", "failed")}
+    logger.info(f"Imported labels: {counts}")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"results": results, **counts})
+    }
+
+@traced_handler("addLabel")
 def lambda_handler(event, context):
-    # Initialize DynamoDB resource and table
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table("LabelsTable")  # Ensure this matches your actual table name
+    # Bulk mode: a list of names in one call
+    if "label_names" in event:
+        return bulk_handler(event["label_names"])
 
     # Get label data from the event
     label_name = event.get("label_name")
@@ -24,37 +117,15 @@ def lambda_handler(event, context):
         }
 
     # Generate a unique identifier for the label
-    label_id = hashlib.sha256(label_name.encode('utf-8')).hexdigest()
+    label_id = label_id_for(label_name)
 
-    # Check if label already exists in DynamoDB
+    # Create the label unless it exists, in one conditional write (no separate existence check)
     try:
-        response = table.get_item(Key={"label_id": label_id})
-        if "Item" in response:
-            return {
-                "statusCode": 409,  # Conflict status code
-                "body": json.dumps({
-                    "label_id": label_id,
-                    "label_name": label_name,
-                    "message": "Label already exists."
-                })
-            }
-    except Exception as e:
-        logger.error(f"Error checking for existing label: {str(e)}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": f"Error checking for label: {str(e)}"})
-        }
-
-    # Create the item to store in DynamoDB
-    item = {
-        "label_id": label_id,
-        "label_name": label_name
-    }
-
-    # Attempt to save the item to DynamoDB
-    try:
-        response = table.put_item(Item=item)
-        logger.info(f"DynamoDB response: {response}")
+        with span("addLabel.put_item"):
+            get_table(LABELS_TABLE_NAME).put_item(
+                Item={"label_id": label_id, "label_name": label_name},
+                ConditionExpression="attribute_not_exists(label_id)"
+            )
         return {
             "statusCode": 200,
             "body": json.dumps({
@@ -64,6 +135,15 @@ def lambda_handler(event, context):
             })
         }
     except Exception as e:
+        if client_error_code(e) == "ConditionalCheckFailedException":
+            return {
+                "statusCode": 409,  # Conflict status code
+                "body": json.dumps({
+                    "label_id": label_id,
+                    "label_name": label_name,
+                    "message": "Label already exists."
+                })
+            }
         logger.error(f"Error saving label to DynamoDB: {str(e)}")
         return {
             "statusCode": 500,
@@ -0,0 +1,59 @@
+import logging
+from savePrompt import parse_save_request, prompt_id_for, save_prompt, rating_event, log_rating_events
+from tracing import span, traced_handler
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Largest batch accepted in one call
+MAX_BATCH_ITEMS = 100
+
+@traced_handler("batchSavePrompts")
+def lambda_handler(event, context):
+    items = event.get("items")
+    if not isinstance(items, list) or not items:
+        logger.error("Missing 'items' in the event data")
+        return {
+            "statusCode": 400,
+            "message": "Missing 'items' in the request."
+        }
+    if len(items) > MAX_BATCH_ITEMS:
+        return {
+            "statusCode": 400,
+            "message": f"At most {MAX_BATCH_ITEMS} saves can be sent per request."
+        }
+
+    # Validate each save; group the valid ones by prompt so each prompt gets one update for all its ratings
+    results = [None] * len(items)
+    groups = {}
+    for index, item in enumerate(items):
+        try:
+            prompt, rating, seed, labels = parse_save_request(item)
+        except ValueError as e:
+            results[index] = {"statusCode": 400, "message": str(e)}
+            continue
+        group = groups.setdefault(prompt_id_for(prompt), {"prompt": prompt, "ratings": [], "indexes": []})
+        group["ratings"].append(rating)
+        group["indexes"].append(index)
+        # The latest save of a prompt decides its seed and labels, as it would with one call per save
+        group["seed"], group["labels"] = seed, labels
+
+    events = []
+    for prompt_id, group in groups.items():
+        response = save_prompt(group["prompt"], group["ratings"], group["seed"], group["labels"], log_events=False)
+        for index in group["indexes"]:
+            results[index] = response
+        if response["statusCode"] == 200:
+            events += [rating_event(prompt_id, rating, group["seed"]) for rating in group["ratings"]]
+    with span("batchSavePrompts.log_rating_events", events=len(events)):
+        log_rating_events(events)
+
+    saved = sum(1 for result in results if result["statusCode"] == 200)
+    logger.info(f"Batch saved {saved} of {len(items)} ratings across {len(groups)} prompts")
+    return {
+        "statusCode": 200,
+        "results": results,
+        "saved": saved,
+        "failed": len(items) - saved
+    }
@@ -0,0 +1,148 @@
+import logging
+import os
+import random
+import threading
+import time
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Connection pool tuning shared by every client created in this container
+MAX_POOL_CONNECTIONS = int(os.environ.get("CLIENT_MAX_POOL_CONNECTIONS", 10))
+CONNECT_TIMEOUT = int(os.environ.get("CLIENT_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = int(os.environ.get("CLIENT_READ_TIMEOUT", 120))
+
+# DynamoDB batch writes: items per call and how hard to retry items the service leaves unprocessed
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 0.05
+
+# Services whose retries are owned by resilience.py (throttle-aware backoff, circuit breaker), so botocore
+# makes a single attempt instead of multiplying the retries
+RETRIES_OWNED_BY_CALLER = {"bedrock-runtime"}
+
+# Module-scoped clients survive across warm invocations of the same container
+_clients = {}
+_resources = {}
+_tables = {}
+_lock = threading.Lock()
+_client_factory = None
+
+def _client_config(service_name):
+    """Build the botocore config used for every client: pooled, keep-alive connections."""
+    from botocore.config import Config
+    retries = {"mode": "standard"}
+    if service_name in RETRIES_OWNED_BY_CALLER:
+        retries["max_attempts"] = 1
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        retries=retries
+    )
+
+def _default_factory(kind, service_name):
+    # boto3 is imported on first use so handlers that never touch AWS do not pay for it
+    import boto3
+    if kind == "client":
+        return boto3.client(service_name, config=_client_config(service_name))
+    return boto3.resource(service_name, config=_client_config(service_name))
+
+def set_client_factory(factory):
+    """
+    Replace how clients and resources are built, e.g. with stubs for local runs or benchmarks.
+    The factory is called as factory(kind, service_name) with kind "client" or "resource".
+    Passing None restores the boto3 factory. Existing clients are discarded.
+    """
+    global _client_factory
+    _client_factory = factory
+    reset_clients()
+
+def reset_clients():
+    """Discard all cached clients, resources and tables, as on a cold start."""
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
+
+def _get_or_create(cache, kind, service_name):
+    instance = cache.get(service_name)
+    if instance is None:
+        with _lock:
+            instance = cache.get(service_name)
+            if instance is None:
+                factory = _client_factory or _default_factory
+                instance = cache[service_name] = factory(kind, service_name)
+    return instance
+
+def get_client(service_name):
+    """Return the shared low-level client for an AWS service, creating it on first use."""
+    return _get_or_create(_clients, "client", service_name)
+
+def get_resource(service_name):
+    """Return the shared resource for an AWS service, creating it on first use."""
+    return _get_or_create(_resources, "resource", service_name)
+
+def get_table(table_name):
+    """Return the shared DynamoDB Table object for a table name."""
+    table = _tables.get(table_name)
+    if table is None:
+        table = _tables[table_name] = get_resource("dynamodb").Table(table_name)
+    return table
+
+def client_error_message(err):
+    """
+    Return the service error message if err is a botocore ClientError, otherwise None.
+    botocore is only imported once an exception has actually occurred.
+    """
+    if not hasattr(err, "response"):
+        return None
+    from botocore.exceptions import ClientError
+    if isinstance(err, ClientError):
+        return err.response["Error"]["Message"]
+    return None
+
+def client_error_code(err):
+    """Return the service error code (e.g. "ConditionalCheckFailedException") of a ClientError, otherwise None."""
+    if not hasattr(err, "response"):
+        return None
+    from botocore.exceptions import ClientError
+    if isinstance(err, ClientError):
+        return err.response["Error"]["Code"]
+    return None
+
+def to_attribute_values(item):
+    """Convert a plain dict to the typed attribute-value format used by low-level DynamoDB client calls."""
+    from boto3.dynamodb.types import TypeSerializer
+    serializer = TypeSerializer()
+    return {key: serializer.serialize(value) for key, value in item.items()}
+
+def from_decimal(value):
+    """Convert a DynamoDB number (Decimal) to int or float so responses stay JSON-serializable."""
+    if value is None:
+        return None
+    return int(value) if value == int(value) else float(value)
+
+def batch_backoff(attempt):
+    """Sleep before retrying unprocessed batch items; full jitter keeps concurrent writers from lining up."""
+    time.sleep(random.uniform(0, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def batch_put_items(table_name, items):
+    """
+    Put items with BatchWriteItem in chunks of 25, retrying unprocessed items with jittered
+    exponential backoff. Returns the items that could still not be written.
+    """
+    dynamodb = get_resource("dynamodb")
+    failed = []
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        requests = [{"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_SIZE]]
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = dynamodb.batch_write_item(RequestItems={table_name: requests})
+            requests = response.get("UnprocessedItems", {}).get(table_name, [])
+            if not requests:
+                break
+            batch_backoff(attempt)
+        failed.extend(request["PutRequest"]["Item"] for request in requests)
+    return failed
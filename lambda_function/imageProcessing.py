@@ -1,6 +1,8 @@
-import boto3
 import json
 import logging
+from handlerRuntime import get_client
+from tracing import span, traced_handler
+from resilience import model_policy, error_status
 
 # Set up logging
 logger = logging.getLogger()
@@ -9,8 +11,15 @@ logger.setLevel(logging.INFO)
 # Model ID for image generation
 IMAGE_MODEL_ID = "stability.stable-diffusion-xl-v1"
 
+# Generation defaults and the ranges Stable Diffusion XL accepts; drafts ask for fewer steps
+DEFAULT_STEPS = 30
+DEFAULT_CFG_SCALE = 10
+MIN_STEPS, MAX_STEPS = 10, 50
+MIN_CFG_SCALE, MAX_CFG_SCALE = 0, 35
+
+@traced_handler("imageProcessing")
 def lambda_handler(event, context):
-    # Retrieve prompt, seed, and style from event
+    # Retrieve prompt, seed, style and sampling parameters from event
     prompt = event.get('prompt')
     seed = event.get('seed', 42)
     style = event.get('style', 'photographic')
@@ -21,24 +30,47 @@ def lambda_handler(event, context):
             "statusCode": 400,
             "message": "Missing 'prompt' in the request."
         }
+    try:
+        steps = int(event.get('steps', DEFAULT_STEPS))
+        cfg_scale = float(event.get('cfg_scale', DEFAULT_CFG_SCALE))
+    except (TypeError, ValueError):
+        logger.error("Invalid 'steps' or 'cfg_scale' in the event data")
+        return {
+            "statusCode": 400,
+            "message": "'steps' must be an integer and 'cfg_scale' a number."
+        }
+    if not (MIN_STEPS <= steps <= MAX_STEPS and MIN_CFG_SCALE <= cfg_scale <= MAX_CFG_SCALE):
+        logger.error(f"Out of range steps {steps} or cfg_scale {cfg_scale}")
+        return {
+            "statusCode": 400,
+            "message": f"'steps' must be between {MIN_STEPS} and {MAX_STEPS} and 'cfg_scale' between {MIN_CFG_SCALE} and {MAX_CFG_SCALE}."
+        }
 
     # Generate image using the prompt
     try:
-        image_data = generate_image(prompt, seed, style)
+        image_data = generate_image(prompt, seed, style, steps, cfg_scale)
         return {
             "statusCode": 200,
             "image_data": image_data,
             "seed": seed,
-            "style": style
+            "style": style,
+            "steps": steps,
+            "cfg_scale": cfg_scale
         }
     except Exception as e:
         logger.error(f"Error generating image: {str(e)}")
+        status = error_status(e)
+        if status is not None:
+            return {
+                "statusCode": status,
+                "message": f"Model busy or unavailable: {str(e)}"
+            }
         return {
             "statusCode": 500,
             "message": f"Error generating image: {str(e)}"
         }
 
-def generate_image(prompt, seed, style):
+def generate_image(prompt, seed, style, steps=DEFAULT_STEPS, cfg_scale=DEFAULT_CFG_SCALE):
     """
     Calls the image generation model and returns base64 encoded image data.
     """
@@ -46,23 +78,28 @@ def generate_image(prompt, seed, style):
         "text_prompts": [{"text": prompt}],
         "style_preset": style,
         "seed": seed,
-        "cfg_scale": 10,
-        "steps": 30
+        "cfg_scale": cfg_scale,
+        "steps": steps
     }
 
     body = json.dumps(payload)
 
     # Call image generation model
-    bedrock = boto3.client("bedrock-runtime")
-    response = bedrock.invoke_model(
-        modelId=IMAGE_MODEL_ID,
-        accept="application/json",
-        contentType="application/json",
-        body=body
-    )
+    bedrock = get_client("bedrock-runtime")
+    with span("imageProcessing.model", request_bytes=len(body)) as model_span:
+        response = model_policy(IMAGE_MODEL_ID).call(
+            bedrock.invoke_model,
+            modelId=IMAGE_MODEL_ID,
+            accept="application/json",
+            contentType="application/json",
+            body=body
+        )
+        raw_body = response['body'].read()
+        model_span.set(response_bytes=len(raw_body))
 
     # Parse response
-    response_body = json.loads(response['body'].read())
+    with span("imageProcessing.decode"):
+        response_body = json.loads(raw_body)
     artifact = response_body.get("artifacts")[0]
     base64_image = artifact.get("base64")
 
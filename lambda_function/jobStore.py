@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import threading
+import time
+from handlerRuntime import get_table
+from objectStore import get_object_store
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# DynamoDB table (or local directory for development) tracking asynchronous jobs
+JOBS_TABLE_NAME = os.environ.get("JOBS_TABLE_NAME")
+JOB_STORE_DIR = os.environ.get("JOB_STORE_DIR")
+
+# Job records expire a day after their last update
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 24 * 60 * 60))
+
+# Key prefix for job requests and outputs in the object store (both are too large for a DynamoDB item)
+RESULT_PREFIX = "jobs/"
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# Serializes read-modify-write updates of local job files made by threads of one process
+_local_lock = threading.Lock()
+
+class LocalJobStore:
+    """
+    Directory-backed stand-in for the jobs table: one JSON file per job.
+    """
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def get(self, job_id):
+        """Return the job record, or None if the job is unknown."""
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def update(self, job_id, **fields):
+        """Create or merge fields into a job record."""
+        with _local_lock:
+            record = self.get(job_id) or {"job_id": job_id}
+            record.update(fields)
+            tmp_path = f"{self._path(job_id)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self._path(job_id))
+
+class DynamoJobStore:
+    """
+    Job store backed by a DynamoDB table keyed on job_id, with TTL on expires_at.
+    """
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, job_id):
+        """Return the job record, or None if the job is unknown."""
+        response = self.table.get_item(Key={"job_id": job_id}, ConsistentRead=True)
+        return response.get("Item")
+
+    def update(self, job_id, **fields):
+        """Create or merge fields into a job record."""
+        names = {f"#f{i}": name for i, name in enumerate(fields)}
+        values = {f":v{i}": value for i, value in enumerate(fields.values())}
+        self.table.update_item(
+            Key={"job_id": job_id},
+            UpdateExpression="SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+
+_job_store = None
+
+def get_job_store():
+    """Return the configured job store, or None if jobs are not configured for this function."""
+    global _job_store
+    if _job_store is None:
+        if JOBS_TABLE_NAME:
+            _job_store = DynamoJobStore(get_table(JOBS_TABLE_NAME))
+        elif JOB_STORE_DIR:
+            _job_store = LocalJobStore(JOB_STORE_DIR)
+    return _job_store
+
+def update_job(store, job_id, status, **fields):
+    """Record a status change, refreshing the update time and expiry."""
+    now = int(time.time())
+    store.update(job_id, status=status, updated_at=now, expires_at=now + JOB_TTL_SECONDS, **fields)
+
+def store_job_request(job_id, payload, object_store=None):
+    """
+    Upload a job's request payload to the object store and return its key. Asynchronous
+    invocations have a small payload limit, so the event itself only carries this key.
+    """
+    object_store = object_store or get_object_store()
+    request_key = f"{RESULT_PREFIX}{job_id}.request.json"
+    object_store.put(request_key, json.dumps(payload).encode("utf-8"), content_type="application/json")
+    return request_key
+
+def load_job_request(request_key, object_store=None):
+    """Return the request payload uploaded by store_job_request."""
+    object_store = object_store or get_object_store()
+    return json.loads(object_store.get(request_key))
+
+def record_job_result(job_id, result, job_store=None, object_store=None):
+    """
+    Persist a handler result for a job: the output goes to the object store and the job record
+    is marked SUCCEEDED with a reference to it, or FAILED with the error message.
+    """
+    job_store = job_store or get_job_store()
+    object_store = object_store or get_object_store()
+    if result.get("statusCode") != 200:
+        update_job(job_store, job_id, FAILED, message=result.get("message", "Unknown error"))
+        return
+    result_key = f"{RESULT_PREFIX}{job_id}.json"
+    object_store.put(result_key, json.dumps(result).encode("utf-8"), content_type="application/json")
+    update_job(job_store, job_id, SUCCEEDED, result_key=result_key)
+
+def load_job_result(record, object_store=None):
+    """Return the handler result referenced by a SUCCEEDED job record."""
+    object_store = object_store or get_object_store()
+    data = object_store.get(record["result_key"])
+    return json.loads(data) if data is not None else None
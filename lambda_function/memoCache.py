@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def memo_key(*parts):
+    """Return a sha256 key for JSON-serializable parts (strings, numbers, dicts of those)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class MemoryTier:
+    """
+    In-process LRU tier bounded by entry count. Lives as long as the Lambda container.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class DynamoTier:
+    """
+    Persistent tier backed by a DynamoDB table keyed on cache_key, with TTL on expires_at.
+    DynamoDB deletes expired items lazily, so expiry is also checked on read.
+    """
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key):
+        item = self.table.get_item(Key={"cache_key": key}).get("Item")
+        if item is None or int(item["expires_at"]) <= time.time():
+            return None
+        return item["value"]
+
+    def put(self, key, value, expires_at):
+        self.table.put_item(Item={"cache_key": key, "value": value, "expires_at": int(expires_at)})
+
+class LocalTier:
+    """
+    Directory-backed stand-in for the persistent tier: one JSON file per key.
+    """
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(os.path.join(self.root, f"{key}.json")) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        return entry["value"] if entry["expires_at"] > time.time() else None
+
+    def put(self, key, value, expires_at):
+        path = os.path.join(self.root, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"value": value, "expires_at": expires_at}, f)
+        os.replace(tmp_path, path)
+
+class MemoCache:
+    """
+    Two-tier memo cache: an in-memory LRU in front of an optional persistent tier, both with a TTL.
+    Persistent hits are promoted to memory. Errors from the persistent tier are logged and
+    treated as misses so the cache never fails a request.
+    """
+    def __init__(self, memory, persistent, ttl_seconds):
+        self.memory = memory
+        self.persistent = persistent
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "bypasses": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self.stats[counter] += 1
+
+    def get(self, key):
+        """Return the cached value for a key, or None on a miss."""
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.persistent is not None:
+            try:
+                value = self.persistent.get(key)
+            except Exception as e:
+                logger.error(f"Error reading memo cache: {str(e)}")
+                value = None
+            if value is not None:
+                self.memory.put(key, value, time.time() + self.ttl_seconds)
+                self._count("persistent_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def bypass(self):
+        """Count a request that skipped the cache on purpose (e.g. a forced regeneration)."""
+        self._count("bypasses")
+
+    def put(self, key, value):
+        """Store a value in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.put(key, value, expires_at)
+        if self.persistent is not None:
+            try:
+                self.persistent.put(key, value, expires_at)
+            except Exception as e:
+                logger.error(f"Error writing memo cache: {str(e)}")
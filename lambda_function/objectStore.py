@@ -0,0 +1,75 @@
+import logging
+import os
+import threading
+from handlerRuntime import get_client
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Bucket (or local directory for development) holding cached results and large payloads
+OBJECT_STORE_BUCKET = os.environ.get("OBJECT_STORE_BUCKET")
+OBJECT_STORE_DIR = os.environ.get("OBJECT_STORE_DIR")
+
+class LocalObjectStore:
+    """
+    Directory-backed stand-in for an S3 bucket, used for local runs and development.
+    """
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def get(self, key):
+        """Return the stored bytes for a key, or None if it does not exist."""
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data, content_type="application/octet-stream"):
+        """Store bytes under a key. Writes are atomic so readers never see partial objects."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+class S3ObjectStore:
+    """
+    Object store backed by an S3 bucket.
+    """
+    def __init__(self, bucket, client=None):
+        self.bucket = bucket
+        self.client = client or get_client("s3")
+
+    def get(self, key):
+        """Return the stored bytes for a key, or None if it does not exist."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def put(self, key, data, content_type="application/octet-stream"):
+        """Store bytes under a key."""
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+_object_store = None
+
+def get_object_store():
+    """
+    Return the configured object store, or None if neither a bucket nor a local directory is set.
+    The store is created once per container and reused across warm invocations.
+    """
+    global _object_store
+    if _object_store is None:
+        if OBJECT_STORE_BUCKET:
+            _object_store = S3ObjectStore(OBJECT_STORE_BUCKET)
+        elif OBJECT_STORE_DIR:
+            _object_store = LocalObjectStore(OBJECT_STORE_DIR)
+    return _object_store
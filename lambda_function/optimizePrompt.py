@@ -1,6 +1,10 @@
-import boto3
 import json
 import logging
+import os
+from handlerRuntime import get_client, get_table
+from memoCache import MemoCache, MemoryTier, DynamoTier, LocalTier, memo_key
+from tracing import span, traced_handler
+from resilience import model_policy, error_status
 
 # Set up logging
 logger = logging.getLogger()
@@ -9,10 +13,50 @@ logger.setLevel(logging.INFO)
 # Model ID for prompt optimization (Claude)
 CLAUDE_MODEL_ID = "anthropic.claude-v2"
 
+# Sampling parameters sent with every request; part of the memo key, so changing them misses the cache
+CLAUDE_PARAMS = {
+    "max_tokens_to_sample": 300,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 250,
+    "stop_sequences": ["\n\nHuman:"]
+}
+
+# Memo cache for optimized prompts: an in-memory LRU per container in front of a DynamoDB table
+# (or a local directory for development). Without either persistent setting only memory is used.
+PROMPT_CACHE_TABLE_NAME = os.environ.get("PROMPT_CACHE_TABLE_NAME")
+PROMPT_CACHE_DIR = os.environ.get("PROMPT_CACHE_DIR")
+PROMPT_CACHE_MAX_ENTRIES = int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", 512))
+PROMPT_CACHE_TTL_SECONDS = int(os.environ.get("PROMPT_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+
+_prompt_cache = None
+
+def get_prompt_cache():
+    """Return the module-scoped prompt memo cache, creating it on first use."""
+    global _prompt_cache
+    if _prompt_cache is None:
+        persistent = None
+        if PROMPT_CACHE_TABLE_NAME:
+            persistent = DynamoTier(get_table(PROMPT_CACHE_TABLE_NAME))
+        elif PROMPT_CACHE_DIR:
+            persistent = LocalTier(PROMPT_CACHE_DIR)
+        _prompt_cache = MemoCache(MemoryTier(PROMPT_CACHE_MAX_ENTRIES), persistent, PROMPT_CACHE_TTL_SECONDS)
+    return _prompt_cache
+
+def normalize_text(text):
+    """Collapse whitespace so prompts differing only in spacing share a cache entry."""
+    return " ".join(text.split())
+
+def prompt_cache_key(prompt, suggestion):
+    """Return the memo key for a prompt/feedback pair under the current model and parameters."""
+    return memo_key(normalize_text(prompt), normalize_text(suggestion), CLAUDE_MODEL_ID, CLAUDE_PARAMS)
+
+@traced_handler("optimizePrompt")
 def lambda_handler(event, context):
     # Retrieve the original prompt and user feedback from the event
     prompt = event.get('prompt')
     suggestion = event.get('suggestion')
+    force_regenerate = bool(event.get('force_regenerate'))
 
     if not prompt or not suggestion:
         logger.error("Missing 'prompt' or 'suggestion' in the event data")
@@ -21,52 +65,128 @@ def lambda_handler(event, context):
             "message": "Missing 'prompt' or 'suggestion' in the request."
         }
 
+    cache = get_prompt_cache()
+    cache_key = prompt_cache_key(prompt, suggestion)
+    if force_regenerate:
+        cache.bypass()
+    else:
+        cached_prompt = cache.get(cache_key)
+        if cached_prompt is not None:
+            logger.info(f"Prompt cache hit: {cache.stats}")
+            return {
+                "statusCode": 200,
+                "optimized_prompt": cached_prompt,
+                "cached": True
+            }
+
     # Format the Claude-compatible prompt with user feedback
-    assistant_prompt = f"\n\nHuman: Original prompt was: \"{prompt}\". User provided the following feedback: {suggestion}\n\nAssistant:(IN ENGLISH, ONLY NEW PROMPT, number of words less than 512)"
+    assistant_prompt = build_assistant_prompt(prompt, suggestion)
 
     # Generate optimized prompt using Claude
     try:
         new_prompt = call_bedrock_claude(assistant_prompt)
         logger.info(f"Optimized prompt: {new_prompt}")
+        if new_prompt:
+            cache.put(cache_key, new_prompt)
+        logger.info(f"Prompt cache stats: {cache.stats}")
         return {
             "statusCode": 200,
-            "optimized_prompt": new_prompt
+            "optimized_prompt": new_prompt,
+            "cached": False
         }
     except Exception as e:
         logger.error(f"Error optimizing prompt: {str(e)}")
         return {
-            "statusCode": 500,
+            "statusCode": error_status(e) or 500,
             "message": f"Error optimizing prompt: {str(e)}"
         }
 
+def build_assistant_prompt(prompt, suggestion):
+    """
+    Formats the Claude-compatible prompt asking for an improved prompt based on user feedback.
+    """
+    return f"\n\nHuman: Original prompt was: \"{prompt}\". User provided the following feedback: {suggestion}\n\nAssistant:(IN ENGLISH, ONLY NEW PROMPT, number of words less than 512)"
+
+def build_claude_body(prompt):
+    """
+    Constructs the request body for Claude with the required parameters.
+    """
+    payload = {"prompt": prompt, **CLAUDE_PARAMS}
+    return json.dumps(payload)
+
 def call_bedrock_claude(prompt):
     """
     Calls the Claude model on AWS Bedrock to generate an optimized prompt.
     """
-    bedrock = boto3.client('bedrock-runtime')
+    bedrock = get_client('bedrock-runtime')
+    body = build_claude_body(prompt)
 
-    # Construct payload for Claude with required parameters
-    payload = {
-        "prompt": prompt,
-        "max_tokens_to_sample": 300,
-        "temperature": 0.7,
-        "top_p": 0.9,
-        "top_k": 250,
-        "stop_sequences": ["\n\nHuman:"]
-    }
+    # Invoke Claude model
+    with span("optimizePrompt.model", request_bytes=len(body)) as model_span:
+        response = model_policy(CLAUDE_MODEL_ID).call(
+            bedrock.invoke_model,
+            modelId=CLAUDE_MODEL_ID,
+            accept="application/json",
+            contentType="application/json",
+            body=body
+        )
+        raw_body = response['body'].read()
+        model_span.set(response_bytes=len(raw_body))
 
-    body = json.dumps(payload)
+    # Parse response
+    response_body = json.loads(raw_body)
+    new_prompt = response_body.get('completion', '').strip()
 
-    # Invoke Claude model
-    response = bedrock.invoke_model(
+    return new_prompt
+
+def stream_bedrock_claude(prompt, cancel_event=None):
+    """
+    Calls the Claude model with the response-stream API and yields completion text as it arrives.
+    Setting cancel_event (a threading.Event) or closing the generator stops reading and closes the stream.
+    """
+    bedrock = get_client('bedrock-runtime')
+    # Only opening the stream is retried; a stream that fails part-way has already yielded text
+    response = model_policy(CLAUDE_MODEL_ID).call(
+        bedrock.invoke_model_with_response_stream,
         modelId=CLAUDE_MODEL_ID,
         accept="application/json",
         contentType="application/json",
-        body=body
+        body=build_claude_body(prompt)
     )
+    stream = response['body']
+    try:
+        for event in stream:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Prompt optimization stream cancelled")
+                return
+            chunk = event.get('chunk')
+            if chunk:
+                completion = json.loads(chunk['bytes']).get('completion', '')
+                if completion:
+                    yield completion
+    finally:
+        stream.close()
 
-    # Parse response
-    response_body = json.loads(response['body'].read())
-    new_prompt = response_body.get('completion', '').strip()
+def stream_optimized_prompt(prompt, suggestion, cancel_event=None, force_regenerate=False):
+    """
+    Streams an optimized prompt for the given feedback. Used by callers that run the handler
+    code directly, because a buffered Lambda response cannot deliver partial output.
+    A cached prompt is yielded as a single chunk; a streamed one is cached only if it completes.
+    """
+    cache = get_prompt_cache()
+    cache_key = prompt_cache_key(prompt, suggestion)
+    if force_regenerate:
+        cache.bypass()
+    else:
+        cached_prompt = cache.get(cache_key)
+        if cached_prompt is not None:
+            yield cached_prompt
+            return
 
-    return new_prompt
+    chunks = []
+    for chunk in stream_bedrock_claude(build_assistant_prompt(prompt, suggestion), cancel_event=cancel_event):
+        chunks.append(chunk)
+        yield chunk
+    new_prompt = "".join(chunks).strip()
+    if new_prompt and not (cancel_event is not None and cancel_event.is_set()):
+        cache.put(cache_key, new_prompt)
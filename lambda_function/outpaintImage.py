@@ -1,43 +1,106 @@
-import base64
 import json
 import logging
-import boto3
-from botocore.exceptions import ClientError
+from handlerRuntime import get_client, client_error_message
+from resultCache import request_key, get_cached_result, put_cached_result
+from jobStore import get_job_store, update_job, load_job_request, record_job_result, RUNNING
+from payloadTransport import has_field, load_field, pack_images
+from tracing import span, traced_handler
+from resilience import model_policy, error_status, ShedError
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Titan Image Generator G1 returns at most this many images per request
+MAX_IMAGES_PER_REQUEST = 5
+
 # Custom Exception
 class ImageError(Exception):
     """Custom exception for errors returned by Amazon Titan Image Generator G1"""
     def __init__(self, message):
         self.message = message
 
-# Main function to generate an outpainted image
+# Lambda entry point
+@traced_handler("outpaintImage")
 def lambda_handler(event, context):
     """
     Lambda handler to process outpainting request with Amazon Titan Image Generator G1.
+    When the event carries a job_id (asynchronous "Event" invocation), progress and the result
+    are also written to the job store so the caller can pick them up later.
     Args:
         event (dict): Contains prompt, seed, image, mask_image, or mask_prompt and other outpainting parameters.
     Returns:
-        dict: Contains base64 encoded generated image or an error message.
+        dict: Contains base64 encoded generated images (the first also as image_data) or an error message.
+    """
+    job_id = event.get('job_id')
+    if not job_id:
+        return outpaint(event)
+    job_store = get_job_store()
+    if job_store is None:
+        logger.error("Job %s received but no job store is configured", job_id)
+        return outpaint(event)
+
+    update_job(job_store, job_id, RUNNING)
+    try:
+        # The request payload is uploaded separately; the asynchronous event only references it
+        if event.get('job_request_key'):
+            event = dict(load_job_request(event['job_request_key']), job_id=job_id)
+        result = outpaint(event)
+    except Exception as err:
+        logger.error("Error running job %s: %s", job_id, str(err))
+        result = {"statusCode": 500, "message": "An unexpected error occurred."}
+    try:
+        record_job_result(job_id, result, job_store=job_store)
+    except Exception as err:
+        logger.error("Error recording result for job %s: %s", job_id, str(err))
+    return result
+
+# Main function to generate an outpainted image
+def outpaint(event):
+    """
+    Generate outpainted images for an event, serving repeated deterministic requests from the result cache.
+    Large images may arrive as object store references (input_image_data_ref, mask_image_data_ref)
+    and large outputs are returned as image_refs instead of inline base64.
     """
     # Extract parameters from the event
     prompt = event.get('prompt', "Expand the scene")
     model_id = 'amazon.titan-image-generator-v1'
-    input_image_data = event.get('input_image_data')
-    mask_image_data = event.get('mask_image_data')
     mask_prompt = event.get('mask_prompt')
     seed = event.get('seed')
     height = event.get("height", 512)
     width = event.get("width", 512)
+    cfg_scale = float(event.get("cfgScale", 8.0))
+    number_of_images = int(event.get("numberOfImages", 1))
 
     # Check that input_image_data is provided and either mask_image_data or mask_prompt
-    if not input_image_data or not (mask_image_data or mask_prompt):
+    if not has_field(event, 'input_image_data') or not (has_field(event, 'mask_image_data') or mask_prompt):
         error_msg = "input_image_data and either mask_image_data or mask_prompt are required."
         logger.error(error_msg)
         return {"statusCode": 400, "message": error_msg}
+    if not 1 <= number_of_images <= MAX_IMAGES_PER_REQUEST:
+        error_msg = f"numberOfImages must be between 1 and {MAX_IMAGES_PER_REQUEST}."
+        logger.error(error_msg)
+        return {"statusCode": 400, "message": error_msg}
+
+    # Identical deterministic requests are served from the result cache instead of calling Titan again
+    cache_key = request_key(event)
+    cached_result = get_cached_result(cache_key)
+    # Entries hold the images themselves (entries from before that held refs are treated as misses)
+    if cached_result is not None and cached_result.get("images"):
+        logger.info("Serving outpainted image from result cache: %s", cache_key)
+        return {
+            "statusCode": 200,
+            **pack_images(cached_result["images"]),
+            "message": "Image served from cache."
+        }
+
+    # Fetch images sent by reference only now that the cache could not answer
+    try:
+        input_image_data = load_field(event, 'input_image_data')
+        mask_image_data = load_field(event, 'mask_image_data')
+    except ValueError as err:
+        logger.error(str(err))
+        return {"statusCode": 400, "message": str(err)}
 
     # Prepare the outPaintingParams based on the selected mask option
     outpainting_params = {
@@ -57,58 +120,72 @@ def lambda_handler(event, context):
         "taskType": "OUTPAINTING",
         "outPaintingParams": outpainting_params,
         "imageGenerationConfig": {
-            "numberOfImages": 1,
+            "numberOfImages": number_of_images,
             "height": height,
             "width": width,
-            "cfgScale": 8.0,
+            "cfgScale": cfg_scale,
             "seed": seed
         }
     })
 
     try:
-        # Generate the outpainted image using Titan Image Generator
-        image_bytes = generate_image(model_id=model_id, body=body)
-        # Encode image as base64 for return
-        image_base64 = base64.b64encode(image_bytes).decode("utf-8")
+        # Generate the outpainted images using Titan Image Generator
+        images_base64 = generate_images(model_id=model_id, body=body)
+        # Pass the model's base64 through untouched: inline if small, otherwise by reference
+        image_fields = pack_images(images_base64)
+        # Cached inline: refs into payloads/ would dangle once that prefix expires before the cache entry
+        put_cached_result(cache_key, {"images": images_base64})
         return {
             "statusCode": 200,
-            "image_data": image_base64,
+            **image_fields,
             "message": "Image generated successfully."
         }
-    except ClientError as err:
-        error_msg = err.response["Error"]["Message"]
-        logger.error("A client error occurred: %s", error_msg)
-        return {"statusCode": 500, "message": f"A client error occurred: {error_msg}"}
     except ImageError as err:
         logger.error("Image generation error: %s", err.message)
         return {"statusCode": 500, "message": err.message}
+    except ShedError as err:
+        logger.error(str(err))
+        return {"statusCode": error_status(err), "message": str(err)}
     except Exception as err:
+        status = error_status(err)
+        if status is not None:
+            # Still throttled or unavailable after the retries: tell the caller to back off
+            logger.error("Model unavailable: %s", client_error_message(err))
+            return {"statusCode": status, "message": f"Model busy or unavailable: {client_error_message(err)}"}
+        error_msg = client_error_message(err)
+        if error_msg is not None:
+            logger.error("A client error occurred: %s", error_msg)
+            return {"statusCode": 500, "message": f"A client error occurred: {error_msg}"}
         logger.error("Unexpected error: %s", str(err))
         return {"statusCode": 500, "message": "An unexpected error occurred."}
 
 # Helper function to call the Amazon Titan Image Generator
-def generate_image(model_id, body):
+def generate_images(model_id, body):
     """
-    Calls the Amazon Titan Image Generator G1 model to generate an image based on the provided body.
+    Calls the Amazon Titan Image Generator G1 model and returns the base64 images requested by the provided body.
     """
-    bedrock = boto3.client(service_name='bedrock-runtime')
+    bedrock = get_client('bedrock-runtime')
     try:
-        response = bedrock.invoke_model(
-            modelId=model_id,
-            body=body,
-            accept="application/json",
-            contentType="application/json"
-        )
-        response_body = json.loads(response.get("body").read())
+        with span("outpaintImage.model", request_bytes=len(body)) as model_span:
+            # Throttles and transient errors are retried with backoff; a failing model is shed fast
+            response = model_policy(model_id).call(
+                bedrock.invoke_model,
+                modelId=model_id,
+                body=body,
+                accept="application/json",
+                contentType="application/json"
+            )
+            raw_body = response.get("body").read()
+            model_span.set(response_bytes=len(raw_body))
+        with span("outpaintImage.decode"):
+            response_body = json.loads(raw_body)
 
         # Check for errors in the response
         if "error" in response_body:
             raise ImageError(f"Image generation error: {response_body['error']}")
 
-        # Extract the image data
-        base64_image = response_body["images"][0]
-        image_bytes = base64.b64decode(base64_image)
-        return image_bytes
+        # Extract the base64 image data
+        return response_body["images"]
 
     except KeyError:
         raise ImageError("Malformed response: 'images' field not found in response.")
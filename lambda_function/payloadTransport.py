@@ -0,0 +1,58 @@
+import hashlib
+import logging
+import os
+from objectStore import get_object_store
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Payloads larger than this travel through the object store instead of inline in the event/response
+INLINE_PAYLOAD_LIMIT = int(os.environ.get("INLINE_PAYLOAD_LIMIT", 1024 * 1024))
+
+# Key prefix for offloaded payloads; keys are content-addressed, so each payload is uploaded once
+PAYLOAD_PREFIX = "payloads/"
+
+# Suffix of event fields that carry an object store key instead of the inline value
+REF_SUFFIX = "_ref"
+
+def payload_key(data):
+    """Return the content-addressed object store key for a base64 payload."""
+    return PAYLOAD_PREFIX + hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def digest_from_key(key):
+    """Return the sha256 digest a content-addressed payload key was derived from."""
+    return key[len(PAYLOAD_PREFIX):]
+
+def has_field(event, field):
+    """True if the event carries the field either inline or as a reference."""
+    return bool(event.get(field) or event.get(field + REF_SUFFIX))
+
+def load_field(event, field, store=None):
+    """
+    Return a base64 field from the event, fetching it from the object store if it was sent by reference.
+    The stored text is returned as-is so it can be passed straight to the model.
+    """
+    if event.get(field) or not event.get(field + REF_SUFFIX):
+        return event.get(field)
+    store = store or get_object_store()
+    data = store.get(event[field + REF_SUFFIX])
+    if data is None:
+        raise ValueError(f"Referenced payload for '{field}' was not found.")
+    return data.decode("utf-8")
+
+def pack_images(images, store=None):
+    """
+    Return the response fields for generated base64 images: inline (images, and the first as
+    image_data) when they fit under INLINE_PAYLOAD_LIMIT, otherwise uploaded and sent as image_refs.
+    Uploads are repeated on every call so each ref is fresh for the payloads/ lifecycle rule.
+    """
+    store = store or get_object_store()
+    if store is None or sum(len(image) for image in images) <= INLINE_PAYLOAD_LIMIT:
+        return {"image_data": images[0], "images": images}
+    image_refs = []
+    for image in images:
+        key = payload_key(image)
+        store.put(key, image.encode("utf-8"), content_type="text/plain")
+        image_refs.append(key)
+    return {"image_refs": image_refs}
@@ -0,0 +1,124 @@
+import logging
+import os
+from handlerRuntime import get_resource, get_table, from_decimal, batch_backoff, MAX_BATCH_ATTEMPTS
+from tracing import traced_handler
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Table names (ensure these match the tables in the template)
+PROMPTS_TABLE_NAME = os.environ.get("PROMPTS_TABLE_NAME", "PromptsTable")
+PROMPT_TAGS_TABLE_NAME = os.environ.get("PROMPT_TAGS_TABLE_NAME", "PromptTagsTable")
+
+# Page size limits for one query
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def build_key_condition(label_id, since=None, until=None):
+    """
+    Build the key condition for one label, optionally restricted to prompts created at or after
+    since and before until (ISO timestamps or prefixes such as "2024-05").
+    """
+    values = {":label_id": label_id}
+    condition = "label_id = :label_id"
+    if since and until:
+        condition += " AND tag_sort BETWEEN :since AND :until"
+        values.update({":since": since, ":until": until})
+    elif since:
+        condition += " AND tag_sort >= :since"
+        values[":since"] = since
+    elif until:
+        condition += " AND tag_sort < :until"
+        values[":until"] = until
+    return condition, values
+
+def fetch_ratings(prompt_ids):
+    """
+    Return {prompt_id: (mean rating, rating count)} for the given prompts with batched reads of
+    up to 100 keys. The mean is the prompt's leaderboard score. Unprocessed keys are read again
+    with jittered backoff, and RuntimeError is raised if they remain after MAX_BATCH_ATTEMPTS reads.
+    """
+    dynamodb = get_resource("dynamodb")
+    ratings = {}
+    prompt_ids = list(dict.fromkeys(prompt_ids))
+    for start in range(0, len(prompt_ids), 100):
+        request = {PROMPTS_TABLE_NAME: {
+            "Keys": [{"prompt_id": prompt_id} for prompt_id in prompt_ids[start:start + 100]],
+            "ProjectionExpression": "prompt_id, score, rating_count, rating"
+        }}
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get("Responses", {}).get(PROMPTS_TABLE_NAME, []):
+                if "rating_count" in item:
+                    ratings[item["prompt_id"]] = (from_decimal(item.get("score")), from_decimal(item["rating_count"]))
+                elif item.get("rating") is not None:
+                    # Items saved before ratings were aggregated hold one rating, possibly as a string
+                    ratings[item["prompt_id"]] = (float(item["rating"]), 1)
+            request = response.get("UnprocessedKeys")
+            if not request:
+                break
+            batch_backoff(attempt)
+        else:
+            raise RuntimeError("Prompts table kept throttling rating lookups; try again shortly.")
+    return ratings
+
+@traced_handler("queryPromptsByTag")
+def lambda_handler(event, context):
+    # Reuse the container's DynamoDB table object across warm invocations
+    table = get_table(PROMPT_TAGS_TABLE_NAME)
+
+    label_id = event.get("label_id")
+    if not label_id:
+        logger.error("Missing 'label_id' in the event data")
+        return {
+            "statusCode": 400,
+            "message": "Missing 'label_id' in the request."
+        }
+
+    try:
+        limit = max(1, min(int(event.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return {
+            "statusCode": 400,
+            "message": "'limit' must be an integer."
+        }
+
+    condition, values = build_key_condition(label_id, event.get("since"), event.get("until"))
+    query_kwargs = {
+        "KeyConditionExpression": condition,
+        "ExpressionAttributeValues": values,
+        "ScanIndexForward": False,  # Newest first
+        "Limit": limit
+    }
+    if event.get("start_key"):
+        query_kwargs["ExclusiveStartKey"] = event["start_key"]
+
+    try:
+        response = table.query(**query_kwargs)
+        items = response.get("Items", [])
+        ratings = fetch_ratings([item["prompt_id"] for item in items])
+    except Exception as e:
+        logger.error(f"Error querying prompts by tag: {str(e)}")
+        return {
+            "statusCode": 500,
+            "message": f"Error querying prompts: {str(e)}"
+        }
+
+    prompts = [
+        {
+            "prompt_id": item["prompt_id"],
+            "prompt": item["prompt"],
+            "seed": from_decimal(item.get("seed")),
+            "rating": ratings.get(item["prompt_id"], (None, 0))[0],
+            "rating_count": ratings.get(item["prompt_id"], (None, 0))[1],
+            "created_at": item["created_at"]
+        }
+        for item in items
+    ]
+    return {
+        "statusCode": 200,
+        "prompts": prompts,
+        # Pass back as start_key to fetch the next page; None when there are no more results
+        "next_key": response.get("LastEvaluatedKey")
+    }
@@ -0,0 +1,74 @@
+import math
+from decimal import Decimal, InvalidOperation
+
+# Ratings are whole numbers on the app's 1-10 slider; each value has its own histogram bucket
+RATING_MIN = 1
+RATING_MAX = 10
+HISTOGRAM_PREFIX = "rating_hist_"
+
+def parse_rating(value):
+    """Return the rating as an int, or raise ValueError if it is not a whole number in range."""
+    try:
+        rating = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError("'rating' must be a number.")
+    if not rating.is_finite() or rating != rating.to_integral_value() or not RATING_MIN <= rating <= RATING_MAX:
+        raise ValueError(f"'rating' must be a whole number from {RATING_MIN} to {RATING_MAX}.")
+    return int(rating)
+
+def _increments(ratings):
+    """Amount each aggregate attribute grows by when the ratings are folded in."""
+    increments = {
+        "rating_count": len(ratings),
+        "rating_sum": sum(ratings),
+        "rating_sumsq": sum(rating * rating for rating in ratings)
+    }
+    for rating in ratings:
+        bucket = f"{HISTOGRAM_PREFIX}{rating}"
+        increments[bucket] = increments.get(bucket, 0) + 1
+    return increments
+
+def add_rating_expression(ratings):
+    """
+    Return the ADD clause and values that fold one or more ratings of a prompt into its aggregates:
+    count, sum, sum of squares and histogram buckets. Combine with a SET clause as needed.
+    """
+    increments = _increments(ratings)
+    clause = "ADD " + ", ".join(f"{name} :add{i}" for i, name in enumerate(increments))
+    values = {f":add{i}": amount for i, amount in enumerate(increments.values())}
+    return clause, values
+
+def apply_rating(item, ratings):
+    """Return a copy of an item's aggregates with the ratings added, as the ADD clause leaves them."""
+    updated = {key: value for key, value in item.items() if key.startswith("rating_")}
+    for key, amount in _increments(ratings).items():
+        updated[key] = updated.get(key, 0) + amount
+    return updated
+
+def summarize(item):
+    """
+    Derive rating statistics from an item's aggregates: count, mean, variance (population),
+    min/max (lowest and highest non-empty histogram bucket) and the histogram itself.
+    Returns None if the prompt has not been rated.
+    """
+    count = int(item.get("rating_count", 0))
+    if count == 0:
+        return None
+    total = float(item["rating_sum"])
+    mean = total / count
+    variance = max(float(item["rating_sumsq"]) / count - mean * mean, 0.0)
+    # Keyed by the rating as a string, as the histogram reads once it has been through JSON
+    histogram = {
+        str(value): int(item.get(f"{HISTOGRAM_PREFIX}{value}", 0))
+        for value in range(RATING_MIN, RATING_MAX + 1)
+    }
+    rated = [int(value) for value, bucket in histogram.items() if bucket]
+    return {
+        "count": count,
+        "mean": mean,
+        "variance": variance,
+        "stddev": math.sqrt(variance),
+        "min": min(rated),
+        "max": max(rated),
+        "histogram": histogram
+    }
@@ -0,0 +1,253 @@
+import logging
+import os
+import random
+import threading
+import time
+from handlerRuntime import client_error_code
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Error codes meaning "slow down": retried with a longer backoff
+THROTTLE_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded", "EC2ThrottledException"
+}
+
+# Error codes of transient service trouble: retried, and counted against the circuit breaker
+TRANSIENT_CODES = {
+    "ServiceUnavailableException", "ModelNotReadyException", "ModelTimeoutException",
+    "InternalServerException", "ServiceException"
+}
+
+# Throttles back off this many times longer than other transient errors
+THROTTLE_BACKOFF_MULTIPLIER = 4
+
+# Model calls from the handlers. The rate limit is per process (one Lambda container, or the app when it
+# runs handlers in-process), so it is off unless BEDROCK_REQUESTS_PER_MINUTE is set.
+BEDROCK_MAX_ATTEMPTS = int(os.environ.get("BEDROCK_MAX_ATTEMPTS", 4))
+BEDROCK_BASE_DELAY_SECONDS = float(os.environ.get("BEDROCK_BASE_DELAY_SECONDS", 0.25))
+BEDROCK_MAX_DELAY_SECONDS = float(os.environ.get("BEDROCK_MAX_DELAY_SECONDS", 8))
+BEDROCK_REQUESTS_PER_MINUTE = os.environ.get("BEDROCK_REQUESTS_PER_MINUTE")
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", 10))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", 30))
+
+# Reasons a call is shed without being attempted
+RATE_LIMITED = "rate_limited"
+CIRCUIT_OPEN = "circuit_open"
+
+class ShedError(Exception):
+    """Raised when a call is rejected locally, without reaching the service."""
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+        detail = "too many requests are queued" if reason == RATE_LIMITED else "the service is failing, retry shortly"
+        super().__init__(f"{name} request shed: {detail}.")
+
+class RetryableResponse(Exception):
+    """
+    Raised by callers to retry a response whose status reports throttling (429) or unavailability (503),
+    such as a handler that shed the request. The response is kept in result.
+    """
+    def __init__(self, result):
+        self.result = result
+        self.code = "ThrottlingException" if result.get("statusCode") == 429 else "ServiceUnavailableException"
+        super().__init__(result.get("message", "Service busy"))
+
+def error_code(err):
+    """Return the service error code of an exception, if it has one."""
+    return getattr(err, "code", None) or client_error_code(err)
+
+def error_status(err):
+    """Map an exception to the HTTP status a handler should answer with: 429, 503, or None for other errors."""
+    if isinstance(err, ShedError):
+        return 429 if err.reason == RATE_LIMITED else 503
+    code = error_code(err)
+    if code in THROTTLE_CODES:
+        return 429
+    if code in TRANSIENT_CODES:
+        return 503
+    return None
+
+def backoff_delay(attempt, base_delay, max_delay, throttled=False):
+    """Full-jitter exponential backoff; throttles start from a longer base."""
+    base = base_delay * (THROTTLE_BACKOFF_MULTIPLIER if throttled else 1)
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: rate tokens per second up to capacity. Callers wait for a token
+    in arrival order, so a burst turns into a steady queue instead of a wave of throttles.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Take a token, waiting up to timeout seconds (forever if None). Returns False, without taking
+        a token, if none would be available in time.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if timeout is not None and wait > timeout:
+                return False
+            # Reserve the token now; later callers queue behind it
+            self._tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive service failures and fails fast for reset_seconds.
+    Then one trial call is let through (half-open): success closes the circuit, failure reopens it.
+    clock returns the current time in seconds; tests pass a fake one.
+    """
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self.clock() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        """True if a call may go ahead."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self.clock() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+class Resilience:
+    """
+    Runs calls to one service with a rate limit, a circuit breaker and throttle-aware retries.
+    Only throttles and transient service errors are retried; anything else is raised at once.
+    Counters (calls, retries, throttles, shed, failures) are kept for diagnostics.
+    """
+    def __init__(self, name, max_attempts=BEDROCK_MAX_ATTEMPTS, base_delay=BEDROCK_BASE_DELAY_SECONDS,
+                 max_delay=BEDROCK_MAX_DELAY_SECONDS, limiter=None, breaker=None,
+                 max_wait=RATE_LIMIT_MAX_WAIT_SECONDS, sleep=time.sleep):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self.sleep = sleep
+        self.counters = {"calls": 0, "retries": 0, "throttles": 0, "shed": 0, "failures": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        if self.breaker is not None:
+            counters["circuit"] = self.breaker.state
+        return counters
+
+    def _shed(self, reason):
+        self._count("shed")
+        logger.warning(f"Shedding {self.name} request: {reason}")
+        return ShedError(self.name, reason)
+
+    def call(self, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), retrying throttles and transient errors. Raises ShedError when shed."""
+        self._count("calls")
+        last_error = None
+        for attempt in range(self.max_attempts):
+            if self.limiter is not None and not self.limiter.acquire(self.max_wait):
+                raise self._shed(RATE_LIMITED) from last_error
+            # Asked only once the token is taken, so a rate-limit shed never holds a half-open trial
+            if self.breaker is not None and not self.breaker.allow():
+                raise self._shed(CIRCUIT_OPEN) from last_error
+            recorded = False
+            try:
+                result = fn(*args, **kwargs)
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                recorded = True
+                return result
+            except Exception as err:
+                code = error_code(err)
+                throttled, transient = code in THROTTLE_CODES, code in TRANSIENT_CODES
+                if throttled:
+                    self._count("throttles")
+                if self.breaker is not None:
+                    # Only transient errors say the service is unhealthy; any other answer shows it is up
+                    if transient:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                recorded = True
+                if not (throttled or transient) or attempt == self.max_attempts - 1:
+                    self._count("failures")
+                    raise
+                last_error = err
+                self._count("retries")
+                self.sleep(backoff_delay(attempt, self.base_delay, self.max_delay, throttled))
+            finally:
+                # Anything else leaving the call (KeyboardInterrupt, SystemExit) must not strand a half-open trial
+                if self.breaker is not None and not recorded:
+                    self.breaker.record_failure()
+
+_model_policies = {}
+_model_policies_lock = threading.Lock()
+
+def model_policy(model_id):
+    """Return the process-wide policy for calls to one Bedrock model, configured from the environment."""
+    policy = _model_policies.get(model_id)
+    if policy is None:
+        with _model_policies_lock:
+            policy = _model_policies.get(model_id)
+            if policy is None:
+                limiter = None
+                if BEDROCK_REQUESTS_PER_MINUTE:
+                    limiter = TokenBucket(float(BEDROCK_REQUESTS_PER_MINUTE) / 60)
+                policy = _model_policies[model_id] = Resilience(model_id, limiter=limiter, breaker=CircuitBreaker())
+    return policy
+
+def set_model_policy(model_id, policy):
+    """Replace the policy for a model, e.g. to compare settings in a benchmark. None restores the default."""
+    with _model_policies_lock:
+        if policy is None:
+            _model_policies.pop(model_id, None)
+        else:
+            _model_policies[model_id] = policy
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+from objectStore import get_object_store
+from payloadTransport import digest_from_key, REF_SUFFIX
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Key prefix for cached outpainting results in the object store
+CACHE_PREFIX = "outpaint-cache/"
+
+# Event fields that determine the generated image; anything else does not affect the output
+IMAGE_FIELDS = ("input_image_data", "mask_image_data")
+
+# Values outpaintImage assumes when a field is omitted, so omitted and explicit defaults share a key
+DEFAULT_PROMPT = "Expand the scene"
+PARAM_DEFAULTS = {"height": 512, "width": 512, "seed": None}
+
+def _digest(data):
+    """Return the sha256 hex digest of a str or bytes value."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def normalize_request(event):
+    """
+    Reduce an outpainting event to the fields that determine its output, read with the same
+    defaults, casts and precedence as outpaintImage. Images are replaced by their digests (taken
+    from the key when sent by reference). The prompt is kept verbatim, as Titan receives it, and
+    mask_prompt counts only when there is no mask image, since the handler ignores it otherwise.
+    """
+    normalized = {"prompt": event.get("prompt", DEFAULT_PROMPT)}
+    for field in IMAGE_FIELDS:
+        if event.get(field):
+            normalized[field] = _digest(event[field])
+        elif event.get(field + REF_SUFFIX):
+            normalized[field] = digest_from_key(event[field + REF_SUFFIX])
+    if "mask_image_data" not in normalized and event.get("mask_prompt"):
+        normalized["mask_prompt"] = event["mask_prompt"]
+    for field, default in PARAM_DEFAULTS.items():
+        normalized[field] = event.get(field, default)
+    normalized["cfgScale"] = float(event.get("cfgScale", 8.0))
+    normalized["numberOfImages"] = int(event.get("numberOfImages", 1))
+    return normalized
+
+def request_key(event):
+    """
+    Return the content-addressed cache key for an outpainting event, or None if the
+    request is not deterministic (no seed) and therefore must not be cached.
+    """
+    if event.get("seed") is None:
+        return None
+    normalized = normalize_request(event)
+    return _digest(json.dumps(normalized, sort_keys=True, separators=(",", ":")))
+
+def get_cached_result(key):
+    """Return the cached result dict for a key, or None on a miss or if no store is configured."""
+    store = get_object_store()
+    if store is None or key is None:
+        return None
+    try:
+        data = store.get(CACHE_PREFIX + key)
+    except Exception as e:
+        logger.error(f"Error reading cached result {key}: {str(e)}")
+        return None
+    return json.loads(data) if data is not None else None
+
+def put_cached_result(key, result):
+    """Persist a result dict under a key. Failures are logged and otherwise ignored."""
+    store = get_object_store()
+    if store is None or key is None:
+        return
+    try:
+        store.put(CACHE_PREFIX + key, json.dumps(result).encode("utf-8"), content_type="application/json")
+    except Exception as e:
+        logger.error(f"Error writing cached result {key}: {str(e)}")
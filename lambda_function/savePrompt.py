@@ -1,63 +1,235 @@
-import boto3
 import hashlib
 import logging
+import os
+import uuid
 from datetime import datetime
+from decimal import Decimal
+from handlerRuntime import (
+    get_client, get_table, client_error_code, to_attribute_values, from_decimal, batch_put_items
+)
+from ratingStats import parse_rating, add_rating_expression, apply_rating, summarize
+from tracing import span, traced_handler
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def lambda_handler(event, context):
-    # Initialize DynamoDB resource and table
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table("PromptsTable")  # Ensure this matches your table name in the template
+# Table names (ensure these match the tables in the template)
+PROMPTS_TABLE_NAME = os.environ.get("PROMPTS_TABLE_NAME", "PromptsTable")
+PROMPT_TAGS_TABLE_NAME = os.environ.get("PROMPT_TAGS_TABLE_NAME", "PromptTagsTable")
+
+# Optional append-only log of raw ratings; aggregates are kept either way
+RATING_EVENTS_TABLE_NAME = os.environ.get("RATING_EVENTS_TABLE_NAME")
+
+# A transaction holds at most 100 items: the prompt, one put per label and one delete per removed label
+MAX_LABELS = 49
+
+# Partition key value of the overall leaderboard in the prompts table's ScoreIndex
+LEADERBOARD = "all"
+
+def tag_sort_key(created_at, prompt_id):
+    """Sort key of a tag index item: ordered by creation time, unique per prompt."""
+    return f"{created_at}#{prompt_id}"
+
+def build_tag_item(label_id, prompt_id, prompt, seed, created_at, score):
+    """
+    Build the tag index item linking a label to a prompt. The prompt text and seed are copied in
+    so listing a tag needs no follow-up read per prompt, and the score feeds the per-label leaderboard.
+    """
+    return {
+        "label_id": label_id,
+        "tag_sort": tag_sort_key(created_at, prompt_id),
+        "prompt_id": prompt_id,
+        "prompt": prompt,
+        "seed": seed,
+        "created_at": created_at,
+        "score": score
+    }
+
+def write_prompt_and_tags(prompt_id, prompt, ratings, seed, labels, previous, now):
+    """
+    Fold ratings into the prompt's aggregates with an unconditional ADD, update its metadata and
+    labels, and bring the tag index in line with the labels, all in one TransactWriteItems: either
+    the rating is counted and the tags match, or nothing is written. The ADD commutes, so concurrent
+    ratings never conflict. previous is the item as read before (empty for a new prompt) and only
+    supplies created_at, which keys the tag rows, and the labels to remove; the one condition keeps
+    created_at from changing. Returns False if another save created the prompt first, else True.
+    """
+    created_at = previous.get("created_at") or previous.get("timestamp") or now
+    previous_labels = previous.get("label_ids", [])
+    # Tag rows start with the score this save expects; update_score replaces it with the committed mean
+    score = Decimal(str(round(summarize(apply_rating(previous, ratings))["mean"], 4)))
+
+    add_clause, values = add_rating_expression(ratings)
+    values.update({
+        ":prompt": prompt, ":seed": seed, ":labels": labels, ":board": LEADERBOARD, ":now": now,
+        ":created_at": created_at
+    })
+    transact_items = [{"Update": {
+        "TableName": PROMPTS_TABLE_NAME,
+        "Key": to_attribute_values({"prompt_id": prompt_id}),
+        "UpdateExpression": (
+            "SET prompt = :prompt, seed = :seed, label_ids = :labels, board = :board, updated_at = :now, "
+            "created_at = :created_at " + add_clause
+        ),
+        "ConditionExpression": "attribute_not_exists(created_at) OR created_at = :created_at",
+        "ExpressionAttributeValues": to_attribute_values(values)
+    }}]
+    transact_items += [
+        {"Put": {
+            "TableName": PROMPT_TAGS_TABLE_NAME,
+            "Item": to_attribute_values(build_tag_item(label_id, prompt_id, prompt, seed, created_at, score))
+        }}
+        for label_id in labels
+    ]
+    transact_items += [
+        {"Delete": {
+            "TableName": PROMPT_TAGS_TABLE_NAME,
+            "Key": to_attribute_values({"label_id": label_id, "tag_sort": tag_sort_key(created_at, prompt_id)})
+        }}
+        for label_id in previous_labels if label_id not in labels
+    ]
+    try:
+        get_client("dynamodb").transact_write_items(TransactItems=transact_items)
+        return True
+    except Exception as e:
+        if client_error_code(e) == "TransactionCanceledException":
+            logger.info(f"Prompt {prompt_id} was created by another save: {str(e)}")
+            return False
+        raise
+
+def update_score(prompt_id):
+    """
+    Read the prompt's committed aggregates and write their mean as the leaderboard score of the prompt
+    and its tag rows. The write is conditional on the rating count read, so a score computed before a
+    later rating never overwrites the later save's score; that save writes its own. Returns the aggregates.
+    """
+    item = get_table(PROMPTS_TABLE_NAME).get_item(Key={"prompt_id": prompt_id}, ConsistentRead=True)["Item"]
+    aggregates = {key: value for key, value in item.items() if key.startswith("rating_")}
+    score = Decimal(str(round(summarize(aggregates)["mean"], 4)))
+    transact_items = [{"Update": {
+        "TableName": PROMPTS_TABLE_NAME,
+        "Key": to_attribute_values({"prompt_id": prompt_id}),
+        "UpdateExpression": "SET score = :score",
+        "ConditionExpression": "rating_count = :count",
+        "ExpressionAttributeValues": to_attribute_values({":score": score, ":count": item["rating_count"]})
+    }}]
+    transact_items += [
+        {"Update": {
+            "TableName": PROMPT_TAGS_TABLE_NAME,
+            "Key": to_attribute_values({"label_id": label_id, "tag_sort": tag_sort_key(item["created_at"], prompt_id)}),
+            "UpdateExpression": "SET score = :score",
+            # Never recreate a tag row a concurrent save has just removed
+            "ConditionExpression": "attribute_exists(prompt_id)",
+            "ExpressionAttributeValues": to_attribute_values({":score": score})
+        }}
+        for label_id in item.get("label_ids", [])
+    ]
+    try:
+        get_client("dynamodb").transact_write_items(TransactItems=transact_items)
+    except Exception as e:
+        if client_error_code(e) != "TransactionCanceledException":
+            raise
+        logger.info(f"Prompt {prompt_id} was rated again, leaving its score to that save: {str(e)}")
+    return aggregates
+
+def prompt_id_for(prompt):
+    """Generate a hash of the prompt to use as the primary key."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def rating_event(prompt_id, rating, seed):
+    """Build a raw rating item for the events table."""
+    rated_at = datetime.utcnow().isoformat()
+    return {
+        "prompt_id": prompt_id,
+        "event_sort": f"{rated_at}#{uuid.uuid4().hex}",
+        "rating": rating,
+        "seed": seed,
+        "rated_at": rated_at
+    }
 
-    # Get data from the event
-    prompt = event.get("prompt")
-    rating = event.get("rating")
-    seed = event.get("seed")
-    labels = event.get("labels", [])  # Get labels, default to an empty list if not provided
+def log_rating_events(events):
+    """Append raw ratings to the events table, if configured. Failures never fail the save."""
+    if not RATING_EVENTS_TABLE_NAME or not events:
+        return
+    try:
+        unprocessed = batch_put_items(RATING_EVENTS_TABLE_NAME, events)
+        if unprocessed:
+            logger.error(f"{len(unprocessed)} rating events could not be logged")
+    except Exception as e:
+        logger.error(f"Error logging rating events: {str(e)}")
 
-    # Validate required fields
+def parse_save_request(request):
+    """
+    Validate a save request and return (prompt, rating, seed, labels) with the rating as an int
+    and the label ids deduplicated in order. Raises ValueError with a message for the caller.
+    """
+    prompt = request.get("prompt")
+    rating = request.get("rating")
     if not prompt or not rating:
-        logger.error("Missing 'prompt' or 'rating' in the event data")
-        return {
-            "statusCode": 400,
-            "message": "Missing 'prompt' or 'rating' in the request."
-        }
+        raise ValueError("Missing 'prompt' or 'rating' in the request.")
+    labels = list(dict.fromkeys(request.get("labels", [])))
+    if len(labels) > MAX_LABELS:
+        raise ValueError(f"A prompt can have at most {MAX_LABELS} labels.")
+    return prompt, parse_rating(rating), request.get("seed"), labels
 
-    # Generate a hash of the prompt to use as the primary key
-    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
-    labels_string = ", ".join(labels)
+def save_prompt(prompt, ratings, seed, labels, log_events=True):
+    """
+    Save one prompt with one or more new ratings and return the handler response.
+    Callers that batch many saves pass log_events=False and log the events together.
+    """
+    prompt_hash = prompt_id_for(prompt)
 
     # Log the prompt and hash for debugging
     logger.info(f"Generated hash for prompt: {prompt_hash}")
     logger.info(f"Prompt: {prompt}")
-    logger.info(f"Rating: {rating}")
+    logger.info(f"Ratings: {ratings}")
     logger.info(f"Seed: {seed}")
-    logger.info(f"Labels: {labels_string}")
+    logger.info(f"Labels: {labels}")
 
-    # Create the item to store in DynamoDB
-    item = {
-        "prompt_id": prompt_hash,  # Use prompt_id to match the table's primary key definition
-        "prompt": prompt,
-        "seed": seed,
-        "rating": str(rating),
-        "labels": labels_string or "N/A",  # Add labels here
-        "timestamp": datetime.utcnow().isoformat()
-    }
-
-    # Attempt to save the item to DynamoDB
+    now = datetime.utcnow().isoformat()
     try:
-        response = table.put_item(Item=item)
-        logger.info(f"DynamoDB response: {response}")  # Log DynamoDB response for verification
-        return {
-            "statusCode": 200,
-            "message": "Prompt saved successfully."
-        }
+        with span("savePrompt.read"):
+            previous = get_table(PROMPTS_TABLE_NAME).get_item(
+                Key={"prompt_id": prompt_hash}, ConsistentRead=True
+            ).get("Item", {})
+        with span("savePrompt.write", labels=len(labels)):
+            written = write_prompt_and_tags(prompt_hash, prompt, ratings, seed, labels, previous, now)
+        if not written:
+            # Nothing was written, so the caller can send the same save again
+            return {
+                "statusCode": 409,
+                "message": "The prompt was first saved by another request at the same time; try again."
+            }
+        with span("savePrompt.score", labels=len(labels)):
+            aggregates = update_score(prompt_hash)
     except Exception as e:
         logger.error(f"Error saving prompt to DynamoDB: {str(e)}")
         return {
             "statusCode": 500,
             "message": f"Error saving prompt: {str(e)}"
         }
+    if log_events:
+        log_rating_events([rating_event(prompt_hash, rating, seed) for rating in ratings])
+
+    stats = summarize({key: from_decimal(value) for key, value in aggregates.items()})
+    logger.info(f"Rating stats: {stats}")
+    return {
+        "statusCode": 200,
+        "message": "Prompt saved successfully.",
+        "stats": stats
+    }
+
+@traced_handler("savePrompt")
+def lambda_handler(event, context):
+    # Validate the event data
+    try:
+        prompt, rating, seed, labels = parse_save_request(event)
+    except ValueError as e:
+        logger.error(f"Invalid save request: {str(e)}")
+        return {
+            "statusCode": 400,
+            "message": str(e)
+        }
+
+    return save_prompt(prompt, [rating], seed, labels)
@@ -0,0 +1,71 @@
+import logging
+import os
+from handlerRuntime import get_table, from_decimal
+from tracing import traced_handler
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Table names (ensure these match the tables in the template)
+PROMPTS_TABLE_NAME = os.environ.get("PROMPTS_TABLE_NAME", "PromptsTable")
+PROMPT_TAGS_TABLE_NAME = os.environ.get("PROMPT_TAGS_TABLE_NAME", "PromptTagsTable")
+
+# Both tables have a ScoreIndex sorted by score: keyed on board in PromptsTable, on label_id in PromptTagsTable
+SCORE_INDEX_NAME = "ScoreIndex"
+LEADERBOARD = "all"
+
+# Number of prompts returned by default and at most
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+def query_top(table, key_name, key_value, limit):
+    """Return the highest-scored items under one index partition with a single bounded Query."""
+    response = table.query(
+        IndexName=SCORE_INDEX_NAME,
+        KeyConditionExpression="#key = :key",
+        ExpressionAttributeNames={"#key": key_name},
+        ExpressionAttributeValues={":key": key_value},
+        ScanIndexForward=False,  # Highest score first
+        Limit=limit
+    )
+    return response.get("Items", [])
+
+@traced_handler("topPrompts")
+def lambda_handler(event, context):
+    label_id = event.get("label_id")
+
+    try:
+        limit = max(1, min(int(event.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return {
+            "statusCode": 400,
+            "message": "'limit' must be an integer."
+        }
+
+    try:
+        if label_id:
+            items = query_top(get_table(PROMPT_TAGS_TABLE_NAME), "label_id", label_id, limit)
+        else:
+            items = query_top(get_table(PROMPTS_TABLE_NAME), "board", LEADERBOARD, limit)
+    except Exception as e:
+        logger.error(f"Error querying top prompts: {str(e)}")
+        return {
+            "statusCode": 500,
+            "message": f"Error querying top prompts: {str(e)}"
+        }
+
+    prompts = [
+        {
+            "prompt_id": item["prompt_id"],
+            "prompt": item["prompt"],
+            "seed": from_decimal(item.get("seed")),
+            "score": from_decimal(item["score"]),
+            "created_at": item.get("created_at")
+        }
+        for item in items
+    ]
+    return {
+        "statusCode": 200,
+        "prompts": prompts
+    }
@@ -0,0 +1,197 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set up logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Trace every invocation; otherwise only events that carry a trace_id from the caller are traced
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "false").lower() == "true"
+
+# Durations kept per operation for the rolling percentiles
+TRACE_WINDOW = int(os.environ.get("TRACE_WINDOW", 500))
+
+# Event field carrying the caller's request id, and response field carrying the handler's spans back
+TRACE_ID_FIELD = "trace_id"
+TRACE_RESPONSE_FIELD = "trace"
+
+_enabled = TRACING_ENABLED
+_current = ContextVar("current_trace", default=None)
+
+def new_request_id():
+    """Return a fresh id to correlate one request's spans and log lines across the app and handlers."""
+    return uuid.uuid4().hex
+
+def set_enabled(enabled):
+    """Turn tracing on or off for this process."""
+    global _enabled
+    _enabled = bool(enabled)
+
+def is_enabled():
+    return _enabled
+
+class RollingStats:
+    """
+    Thread-safe per-operation window of the most recent durations, for p50/p95/p99 in process.
+    """
+    def __init__(self, window=TRACE_WINDOW):
+        self.window = window
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, duration_ms):
+        with self._lock:
+            durations = self._durations.get(operation)
+            if durations is None:
+                durations = self._durations[operation] = deque(maxlen=self.window)
+            durations.append(duration_ms)
+
+    def summary(self):
+        """Return {operation: {count, p50, p95, p99}} over each operation's window, in milliseconds."""
+        with self._lock:
+            snapshot = {operation: sorted(durations) for operation, durations in self._durations.items()}
+        pick = lambda values, fraction: values[min(int(fraction * len(values)), len(values) - 1)]
+        return {
+            operation: {
+                "count": len(values),
+                "p50": pick(values, 0.50),
+                "p95": pick(values, 0.95),
+                "p99": pick(values, 0.99)
+            }
+            for operation, values in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+
+# Process-wide rolling percentiles; in the app they cover every session served by the process
+stats = RollingStats()
+
+class Trace:
+    """The spans recorded for one request, in the order they finished."""
+    def __init__(self, request_id=None):
+        self.request_id = request_id or new_request_id()
+        self.spans = []
+
+    def add(self, name, duration_ms, **fields):
+        self.spans.append({"name": name, "ms": round(duration_ms, 3), **fields})
+
+class Span:
+    """
+    Times a block; extra fields such as byte counts can be attached with set().
+    duration_ms is available once the block has finished.
+    """
+    __slots__ = ("name", "trace", "fields", "start", "duration_ms")
+
+    def __init__(self, name, trace, fields):
+        self.name = name
+        self.trace = trace
+        self.fields = fields
+        self.duration_ms = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        record(self.name, self.duration_ms, trace=self.trace, **self.fields)
+        return False
+
+class _NullSpan:
+    """Returned while tracing is off so instrumented code pays for one check and nothing else."""
+    duration_ms = None
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def current_trace():
+    """Return the trace of the request being handled in this context, or None."""
+    return _current.get()
+
+def span(name, **fields):
+    """Time a block as the named operation. A no-op unless tracing is on or a trace is active."""
+    trace = _current.get()
+    if trace is None and not _enabled:
+        return _NULL_SPAN
+    return Span(name, trace, fields)
+
+def record(name, duration_ms, trace=None, **fields):
+    """Record a duration measured elsewhere (e.g. reported by a handler) as a span."""
+    stats.record(name, duration_ms)
+    trace = trace or _current.get()
+    if trace is not None:
+        trace.add(name, duration_ms, **fields)
+
+@contextmanager
+def traced(request_id=None, force=False):
+    """
+    Make a new trace current for the block and yield it. Yields None, and traces nothing,
+    while tracing is off unless force is set.
+    """
+    if not (_enabled or force):
+        yield None
+        return
+    trace = Trace(request_id)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+def traced_handler(handler_name):
+    """
+    Decorate a lambda_handler so invocations carrying a trace_id (or all, with TRACING_ENABLED)
+    are traced: one structured metric line is logged per call and the spans are returned to
+    the caller under "trace". Untraced invocations call the handler directly.
+    """
+    def decorate(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not (_enabled or TRACE_ID_FIELD in event):
+                return handler(event, context)
+            with traced(event.get(TRACE_ID_FIELD), force=True) as trace:
+                start = time.perf_counter()
+                response = handler(event, context)
+                duration_ms = (time.perf_counter() - start) * 1000
+            stats.record(handler_name, duration_ms)
+            status_code = response.get("statusCode") if isinstance(response, dict) else None
+            logger.info(json.dumps({
+                "metric": "handler_trace",
+                "handler": handler_name,
+                "request_id": trace.request_id,
+                "status_code": status_code,
+                "duration_ms": round(duration_ms, 3),
+                "spans": trace.spans
+            }))
+            if isinstance(response, dict):
+                response = dict(response, **{TRACE_RESPONSE_FIELD: {
+                    "request_id": trace.request_id,
+                    "handler_ms": round(duration_ms, 3),
+                    "spans": trace.spans
+                }})
+            return response
+        return wrapper
+    return decorate
@@ -0,0 +1,87 @@
+"""
+Serve the Lambda handlers over HTTP for the "http" invocation backend.
+
+The server speaks the subset of the Lambda Invoke API the app uses:
+POST /2015-03-31/functions/<function>/invocations with the event as the JSON body, where <function>
+is a key of LAMBDA_ARNS such as "outpaint". "RequestResponse" invocations answer with the handler's
+result, reporting handler exceptions in the X-Amz-Function-Error header as Lambda does; "Event"
+invocations are accepted with 202 and run on a background thread.
+
+Run it on the host that should run the handlers (with AWS credentials for Bedrock and DynamoDB),
+then start the app with INVOCATION_BACKEND=http and INVOCATION_HTTP_URL pointing at it.
+
+Usage: python lambda_server.py [--host 127.0.0.1] [--port 3001]
+"""
+import argparse
+import json
+import logging
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.backends import HANDLER_MODULES, get_backend
+from utils.lambda_modules import load_handler_module
+
+INVOKE_PATH_PATTERN = re.compile(r"^/2015-03-31/functions/([^/]+)/invocations$")
+
+class InvokeHandler(BaseHTTPRequestHandler):
+    # Keep connections alive so the app's connection pool can reuse them, and send small replies
+    # at once instead of waiting on delayed ACKs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        match = INVOKE_PATH_PATTERN.match(self.path)
+        function_name = match.group(1) if match else None
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if function_name not in HANDLER_MODULES:
+            self._reply(404, {"message": f"Function not found: {function_name}"})
+            return
+        try:
+            event = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._reply(400, {"message": "Could not parse request body into json."})
+            return
+
+        if self.headers.get("X-Amz-Invocation-Type") == "Event":
+            get_backend("direct").invoke_async(function_name, event)
+            self._reply(202)
+            return
+        try:
+            result = load_handler_module(HANDLER_MODULES[function_name]).lambda_handler(event, None)
+        except Exception as e:
+            logging.exception("Unhandled error in %s", function_name)
+            self._reply(200, {"errorMessage": str(e), "errorType": type(e).__name__},
+                        headers={"X-Amz-Function-Error": "Unhandled"})
+            return
+        self._reply(200, result)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format, *args)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ThreadingHTTPServer((args.host, args.port), InvokeHandler)
+    print(f"Serving {', '.join(HANDLER_MODULES)} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 # PowerShell 部署腳本
 
 # 壓縮 Lambda 函數為 .zip 文件
-Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\imageProcessing.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\imageProcessing.zip" -Force
-Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\OptimizePrompt.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\optimizePrompt.zip" -Force
-Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\savePrompt.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\savePrompt.zip" -Force
-Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\addLabel.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\addLabel.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\imageProcessing.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\resilience.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\imageProcessing.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\OptimizePrompt.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\resilience.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\memoCache.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\optimizePrompt.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\savePrompt.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\ratingStats.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\savePrompt.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\batchSavePrompts.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\savePrompt.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\ratingStats.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\batchSavePrompts.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\queryPromptsByTag.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\queryPromptsByTag.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\topPrompts.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\topPrompts.zip" -Force
+Compress-Archive -Path "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\addLabel.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\handlerRuntime.py", "C:\Users\USER\Desktop\Develop\prompt_engineer\lambda_function\tracing.py" -DestinationPath "C:\Users\USER\Desktop\Develop\prompt_engineer\addLabel.zip" -Force
 
 # 上傳代碼和層到 S3
 $bucketName = "image-generator-optimization"
@@ -12,6 +15,9 @@ $prefix = "prompt-engineer-manul"
 aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\imageProcessing.zip" "s3://$bucketName/$prefix/lambda/imageProcessing.zip"
 aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\OptimizePrompt.zip" "s3://$bucketName/$prefix/lambda/optimizePrompt.zip"
 aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\savePrompt.zip" "s3://$bucketName/$prefix/lambda/savePrompt.zip"
+aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\batchSavePrompts.zip" "s3://$bucketName/$prefix/lambda/batchSavePrompts.zip"
+aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\queryPromptsByTag.zip" "s3://$bucketName/$prefix/lambda/queryPromptsByTag.zip"
+aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\topPrompts.zip" "s3://$bucketName/$prefix/lambda/topPrompts.zip"
 aws s3 cp "C:\Users\USER\Desktop\Develop\prompt_engineer\addLabel.zip" "s3://$bucketName/$prefix/lambda/addLabel.zip"
 
 # 部署 CloudFormation 模板
@@ -11,15 +11,21 @@ STACK_NAME="image-generation-stack-$TIMESTAMP"
 echo "Zipping and uploading Lambda functions to S3..."
 
 # 壓縮 Lambda 函數為 .zip 文件
-zip -j "imageProcessing.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/imageProcessing.py"
-zip -j "optimizePrompt.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/OptimizePrompt.py"
-zip -j "savePrompt.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/savePrompt.py"
-zip -j "addLabel.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/addLabel.py"
+zip -j "imageProcessing.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/imageProcessing.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/resilience.py"
+zip -j "optimizePrompt.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/OptimizePrompt.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/resilience.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/memoCache.py"
+zip -j "savePrompt.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/savePrompt.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/ratingStats.py"
+zip -j "batchSavePrompts.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/batchSavePrompts.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/savePrompt.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/ratingStats.py"
+zip -j "queryPromptsByTag.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/queryPromptsByTag.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py"
+zip -j "topPrompts.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/topPrompts.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py"
+zip -j "addLabel.zip" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/addLabel.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/handlerRuntime.py" "C:/Users/USER/Desktop/Develop/prompt_engineer/lambda_function/tracing.py"
 
 # 上傳至 S3
 aws s3 cp "imageProcessing.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/imageProcessing.zip"
 aws s3 cp "optimizePrompt.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/optimizePrompt.zip"
 aws s3 cp "savePrompt.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/savePrompt.zip"
+aws s3 cp "batchSavePrompts.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/batchSavePrompts.zip"
+aws s3 cp "queryPromptsByTag.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/queryPromptsByTag.zip"
+aws s3 cp "topPrompts.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/topPrompts.zip"
 aws s3 cp "addLabel.zip" "s3://$BUCKET_NAME/$PREFIX/lambda/addLabel.zip"
 
 # 部署 CloudFormation 模板
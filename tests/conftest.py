@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the app's packages from the repository root, as app.py does when run from there
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,70 @@
+"""The direct and http backends return the same handler results for the same event."""
+import base64
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import lambda_server
+from stubs import StubBedrockClient, stub_client_factory, synthetic_png
+from utils.backends import DirectBackend, HttpBackend, LambdaInvocationError
+from utils.lambda_modules import load_handler_module
+
+IMAGE = base64.b64encode(synthetic_png(512, 512, 1.5)).decode("utf-8")
+
+# (function name, event) pairs covering successes and the handlers' own error responses
+EVENTS = [
+    ("outpaint", {"prompt": "Expand the scene", "input_image_data": IMAGE, "mask_prompt": "the house",
+                  "width": 512, "height": 512, "seed": 7, "numberOfImages": 2}),
+    ("outpaint", {"prompt": "Expand the scene", "mask_prompt": "the house"}),
+    ("image_processing", {"prompt": "a lighthouse at dusk", "seed": 3}),
+    ("optimize_prompt", {"prompt": "Expand the scene", "suggestion": "Lighting: warmer", "force_regenerate": True}),
+    ("add_label", {"label_name": "harbor"}),
+    ("add_label", {}),
+    ("save_prompt", {"prompt": "a harbor at dawn", "rating": 7, "seed": 3, "labels": []}),
+    ("save_prompt", {"prompt": "a harbor at dawn", "rating": 11}),
+    ("batch_save_prompts", {"items": [{"prompt": "a", "rating": 5, "seed": 1}, {"prompt": "a", "rating": 9, "seed": 1},
+                                      {"prompt": "b", "rating": 0}]}),
+]
+
+@pytest.fixture(scope="module")
+def backends():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), lambda_server.InvokeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield {"direct": DirectBackend(), "http": HttpBackend(base_url=f"http://127.0.0.1:{server.server_port}")}
+    finally:
+        server.shutdown()
+        server.server_close()
+        load_handler_module("handlerRuntime").set_client_factory(None)
+
+def fresh_stubs():
+    """Give every call the same starting state, so a result cannot depend on an earlier call."""
+    load_handler_module("handlerRuntime").set_client_factory(stub_client_factory(bedrock=StubBedrockClient()))
+
+@pytest.mark.parametrize("function_name,event", EVENTS)
+def test_direct_and_http_results_match(backends, function_name, event):
+    results = {}
+    for name, backend in backends.items():
+        fresh_stubs()
+        results[name], _ = backend.invoke(function_name, event)
+    assert results["direct"] == results["http"]
+    assert "statusCode" in results["direct"]
+
+def test_handler_exceptions_raise_the_same_error(backends, monkeypatch):
+    addLabel = load_handler_module("addLabel")
+
+    def fail(event, context):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(addLabel, "lambda_handler", fail)
+    messages = {}
+    for name, backend in backends.items():
+        with pytest.raises(LambdaInvocationError) as error:
+            backend.invoke("add_label", {"label_name": "harbor"})
+        messages[name] = str(error.value)
+    assert messages["direct"] == messages["http"]
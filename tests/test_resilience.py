@@ -0,0 +1,141 @@
+"""Retry and circuit-breaker behaviour of resilience.Resilience, driven by a fake clock."""
+import pytest
+from botocore.exceptions import ClientError
+from utils.lambda_modules import load_handler_module
+
+resilience = load_handler_module("resilience")
+
+class FakeClock:
+    """Time that only moves when the test advances it; sleeps advance it too."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "InvokeModel")
+
+class Service:
+    """A callable that raises the queued errors in order, then returns "ok"."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def make_policy(clock, max_attempts=4, failure_threshold=3, reset_seconds=30, limiter=None):
+    breaker = resilience.CircuitBreaker(failure_threshold, reset_seconds, clock=clock)
+    return resilience.Resilience("model", max_attempts=max_attempts, base_delay=0.25, max_delay=8,
+                                 limiter=limiter, breaker=breaker, sleep=clock.sleep)
+
+def test_retries_stop_at_max_attempts(clock):
+    policy = make_policy(clock, failure_threshold=100)
+    service = Service(*[client_error("ThrottlingException")] * 10)
+    with pytest.raises(ClientError):
+        policy.call(service)
+    assert service.calls == 4
+    assert len(clock.sleeps) == 3
+    assert policy.counters == {"calls": 1, "retries": 3, "throttles": 4, "shed": 0, "failures": 1}
+
+def test_retry_succeeds_after_transient_errors(clock):
+    policy = make_policy(clock)
+    service = Service(client_error("ServiceUnavailableException"), client_error("ThrottlingException"))
+    assert policy.call(service) == "ok"
+    assert service.calls == 3
+    assert policy.breaker.state == "closed"
+
+def test_other_errors_are_not_retried(clock):
+    policy = make_policy(clock)
+    service = Service(client_error("ValidationException"))
+    with pytest.raises(ClientError):
+        policy.call(service)
+    assert service.calls == 1
+    assert clock.sleeps == []
+    assert policy.breaker.state == "closed"
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    policy = make_policy(clock, max_attempts=1, failure_threshold=3)
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            policy.call(Service(client_error("ServiceUnavailableException")))
+    assert policy.breaker.state == "open"
+
+    service = Service()
+    with pytest.raises(resilience.ShedError) as shed:
+        policy.call(service)
+    assert shed.value.reason == resilience.CIRCUIT_OPEN
+    assert service.calls == 0
+
+def test_throttles_do_not_open_the_breaker(clock):
+    policy = make_policy(clock, max_attempts=1, failure_threshold=2)
+    for _ in range(5):
+        with pytest.raises(ClientError):
+            policy.call(Service(client_error("ThrottlingException")))
+    assert policy.breaker.state == "closed"
+
+def test_half_open_trial_success_closes(clock):
+    breaker = resilience.CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = resilience.CircuitBreaker(failure_threshold=3, reset_seconds=30, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+def test_rate_limit_shed_keeps_the_half_open_trial(clock):
+    class EmptyBucket:
+        def acquire(self, timeout=None):
+            return False
+
+    policy = make_policy(clock, failure_threshold=1, limiter=EmptyBucket())
+    policy.breaker.record_failure()
+    clock.now += 30
+    with pytest.raises(resilience.ShedError) as shed:
+        policy.call(Service())
+    assert shed.value.reason == resilience.RATE_LIMITED
+    # The trial was not taken, so the next call that gets a token may still run it
+    assert policy.breaker.allow()
+
+def test_interrupted_trial_reopens_the_breaker(clock):
+    policy = make_policy(clock, failure_threshold=1)
+    policy.breaker.record_failure()
+    clock.now += 30
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(Service(KeyboardInterrupt()))
+    assert policy.breaker.state == "open"
+    clock.now += 30
+    assert policy.call(Service()) == "ok"
+    assert policy.breaker.state == "closed"
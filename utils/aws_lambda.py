@@ -1,24 +1,107 @@
-import boto3
-import json
+import threading
 import streamlit as st
-from config import AWS_REGION, LAMBDA_ARNS
+from config import (
+    LAMBDA_MAX_ATTEMPTS, MODEL_FUNCTIONS, BEDROCK_REQUESTS_PER_MINUTE, RATE_LIMIT_MAX_WAIT_SECONDS,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+)
+from utils.backends import get_backend, LambdaInvocationError
+from utils.lambda_modules import load_handler_module
+from utils.tracing import tracing, record_handler_trace
 
-# Initialize AWS Lambda client
-lambda_client = boto3.client('lambda', region_name=AWS_REGION)
+resilience = load_handler_module("resilience")
+
+# Handler statuses meaning the request was not served and may be sent again after a backoff
+RETRYABLE_STATUS_CODES = (429, 503)
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+def policy_for(function_name):
+    """
+    Return the process-wide resilience policy of a Lambda function, shared by every session and worker
+    thread: throttle-aware retries, a circuit breaker, and for model-calling functions a token bucket
+    sized to the Bedrock quota so bursts (e.g. sweeps) queue here instead of being throttled.
+    """
+    policy = _policies.get(function_name)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(function_name)
+            if policy is None:
+                limiter = None
+                if function_name in MODEL_FUNCTIONS:
+                    limiter = resilience.TokenBucket(BEDROCK_REQUESTS_PER_MINUTE / 60)
+                policy = _policies[function_name] = resilience.Resilience(
+                    function_name,
+                    max_attempts=LAMBDA_MAX_ATTEMPTS,
+                    limiter=limiter,
+                    breaker=resilience.CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS),
+                    max_wait=RATE_LIMIT_MAX_WAIT_SECONDS
+                )
+    return policy
+
+def resilience_counters():
+    """Return the retry, throttle and shed counters of every function called so far."""
+    return {function_name: policy.snapshot() for function_name, policy in sorted(_policies.items())}
+
+def with_trace_id(payload):
+    """Return a copy of the payload tagged with the current request id (a fresh one outside a trace)."""
+    trace = tracing.current_trace()
+    return dict(payload, **{tracing.TRACE_ID_FIELD: trace.request_id if trace else tracing.new_request_id()})
+
+def call_lambda(function_name, payload):
+    """
+    Invoke a specified Lambda function through the configured backend (INVOCATION_BACKEND) and return
+    its result, raising LambdaInvocationError on failure. Every backend honours the same contract.
+    Safe to call from worker threads because it never touches the Streamlit UI.
+    With tracing on, the request id travels in the event and the handler's spans come back in the result.
+    Throttled invocations are retried with jittered backoff, as are 429/503 responses of handlers that do
+    not call a model (model handlers retry Bedrock themselves, so their 429/503 is returned at once);
+    once the retries are used up the last such response is returned. Shed requests raise LambdaInvocationError.
+    """
+    if tracing.is_enabled():
+        payload = with_trace_id(payload)
+    backend = get_backend()
+    try:
+        result, invoke_ms = policy_for(function_name).call(_invoke, backend, function_name, payload)
+    except resilience.RetryableResponse as e:
+        result, invoke_ms = e.result, None
+    except LambdaInvocationError:
+        raise
+    except Exception as e:
+        raise LambdaInvocationError(f"Error calling {function_name} Lambda function: {str(e)}") from e
+    handler_trace = result.pop(tracing.TRACE_RESPONSE_FIELD, None) if isinstance(result, dict) else None
+    if handler_trace:
+        record_handler_trace(function_name, handler_trace, invoke_ms, in_process=backend.in_process)
+    return result
+
+def _invoke(backend, function_name, payload):
+    """Make one synchronous invocation and return (result, invoke milliseconds)."""
+    result, invoke_ms = backend.invoke(function_name, payload)
+    # Model-calling handlers already retried Bedrock with backoff before answering 429/503; retrying
+    # here as well would multiply the model calls of one request
+    if (function_name not in MODEL_FUNCTIONS and isinstance(result, dict)
+            and result.get("statusCode") in RETRYABLE_STATUS_CODES):
+        raise resilience.RetryableResponse(result)
+    return result, invoke_ms
+
+def call_lambda_async(function_name, payload, backend=None):
+    """
+    Queue an asynchronous ("Event") invocation of a Lambda function. Returns as soon as the backend
+    has accepted the event and raises LambdaInvocationError if it was rejected.
+    """
+    if tracing.is_enabled():
+        payload = with_trace_id(payload)
+    try:
+        (backend or get_backend()).invoke_async(function_name, payload)
+    except LambdaInvocationError:
+        raise
+    except Exception as e:
+        raise LambdaInvocationError(f"Error queueing {function_name} Lambda function: {str(e)}") from e
 
 def invoke_lambda(function_name, payload):
     """Invoke a specified Lambda function with the provided payload."""
     try:
-        response = lambda_client.invoke(
-            FunctionName=LAMBDA_ARNS[function_name],
-            InvocationType="RequestResponse",
-            Payload=json.dumps(payload)
-        )
-        result = json.loads(response["Payload"].read())
-        if 'FunctionError' in response:
-            st.error(f"Error calling {function_name} Lambda function: {result.get('errorMessage', 'Unknown error')}")
-            return None
-        return result
-    except Exception as e:
-        st.error(f"Error calling {function_name} Lambda function: {str(e)}")
+        return call_lambda(function_name, payload)
+    except LambdaInvocationError as e:
+        st.error(str(e))
         return None
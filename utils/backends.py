@@ -0,0 +1,190 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import urllib3
+from botocore.config import Config
+from config import (
+    AWS_REGION, LAMBDA_ARNS, LAMBDA_MAX_POOL_CONNECTIONS, SWEEP_MAX_WORKERS, INVOCATION_BACKEND,
+    INVOCATION_HTTP_URL, INVOCATION_HTTP_TIMEOUT_SECONDS
+)
+from utils.lambda_modules import load_handler_module
+from utils.tracing import tracing
+
+# Handler module behind each Lambda function, for running them in-process or behind the local HTTP server
+HANDLER_MODULES = {
+    "outpaint": "outpaintImage",
+    "optimize_prompt": "optimizePrompt",
+    "save_prompt": "savePrompt",
+    "add_label": "addLabel",
+    "query_prompts_by_tag": "queryPromptsByTag",
+    "top_prompts": "topPrompts",
+    "batch_save_prompts": "batchSavePrompts",
+    "image_processing": "imageProcessing",
+}
+
+# Path of the Lambda Invoke API, which the local HTTP server mirrors
+INVOKE_PATH = "/2015-03-31/functions/{function_name}/invocations"
+
+class LambdaInvocationError(Exception):
+    """
+    Raised when a Lambda function cannot be invoked or reports a function error.
+    code carries a service error code when the failure is a throttle or outage worth retrying.
+    """
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+def _function_error(function_name, message):
+    return LambdaInvocationError(f"Error calling {function_name} Lambda function: {message}")
+
+class LambdaBackend:
+    """Invokes the deployed Lambda functions through the AWS API."""
+    name = "lambda"
+    in_process = False
+
+    def __init__(self):
+        # Pooled so parallel invocations from worker threads do not queue.
+        # Retries are made by the resilience policies, so botocore makes a single attempt.
+        self.client = boto3.client(
+            'lambda',
+            region_name=AWS_REGION,
+            config=Config(max_pool_connections=LAMBDA_MAX_POOL_CONNECTIONS, retries={"mode": "standard", "max_attempts": 1})
+        )
+
+    def invoke(self, function_name, payload):
+        """Make one synchronous invocation and return (result, invoke milliseconds)."""
+        with tracing.span(f"{function_name}.encode") as encode_span:
+            body = json.dumps(payload)
+            encode_span.set(bytes=len(body))
+        with tracing.span(f"{function_name}.invoke", backend=self.name) as invoke_span:
+            response = self.client.invoke(
+                FunctionName=LAMBDA_ARNS[function_name],
+                InvocationType="RequestResponse",
+                Payload=body
+            )
+            raw_result = response["Payload"].read()
+            invoke_span.set(bytes=len(raw_result))
+        with tracing.span(f"{function_name}.decode"):
+            result = json.loads(raw_result)
+        if 'FunctionError' in response:
+            raise _function_error(function_name, result.get('errorMessage', 'Unknown error'))
+        return result, invoke_span.duration_ms
+
+    def invoke_async(self, function_name, payload):
+        """Queue an "Event" invocation; returns once Lambda has accepted it."""
+        self.client.invoke(
+            FunctionName=LAMBDA_ARNS[function_name],
+            InvocationType="Event",
+            Payload=json.dumps(payload)
+        )
+
+class DirectBackend:
+    """
+    Calls the handlers in this process: no serialization and no network hop. The handlers use this
+    process's AWS credentials to reach Bedrock and DynamoDB.
+    """
+    name = "direct"
+    in_process = True
+
+    def __init__(self, max_workers=SWEEP_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def invoke(self, function_name, payload):
+        handler = load_handler_module(HANDLER_MODULES[function_name]).lambda_handler
+        with tracing.span(f"{function_name}.invoke", backend=self.name) as invoke_span:
+            try:
+                # Shallow copies keep the handler and the caller from sharing dicts they may modify
+                result = handler(dict(payload), None)
+            except Exception as e:
+                raise _function_error(function_name, str(e)) from e
+        return dict(result) if isinstance(result, dict) else result, invoke_span.duration_ms
+
+    def invoke_async(self, function_name, payload):
+        """Stand-in for an "Event" invocation: run the handler on a background thread of this process."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        handler = load_handler_module(HANDLER_MODULES[function_name]).lambda_handler
+        self._executor.submit(handler, payload, None)
+
+class HttpBackend:
+    """
+    Posts to a local server speaking the Lambda Invoke API (e.g. lambda_server.py) over a pool of
+    kept-alive connections, for handlers hosted next to the app rather than in Lambda.
+    """
+    name = "http"
+    in_process = False
+
+    def __init__(self, base_url=INVOCATION_HTTP_URL, timeout=INVOCATION_HTTP_TIMEOUT_SECONDS,
+                 max_connections=LAMBDA_MAX_POOL_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.pool = urllib3.PoolManager(
+            maxsize=max_connections,
+            timeout=urllib3.Timeout(connect=5, read=timeout),
+            retries=False
+        )
+
+    def _post(self, function_name, body, invocation_type):
+        try:
+            response = self.pool.request(
+                "POST",
+                self.base_url + INVOKE_PATH.format(function_name=function_name),
+                body=body,
+                headers={"Content-Type": "application/json", "X-Amz-Invocation-Type": invocation_type}
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise LambdaInvocationError(f"Error calling {function_name} Lambda function: {str(e)}",
+                                        code="ServiceUnavailableException") from e
+        if response.status == 429:
+            raise LambdaInvocationError(f"{function_name} is throttled by the local server.", code="TooManyRequestsException")
+        if response.status >= 500:
+            raise LambdaInvocationError(f"Error calling {function_name} Lambda function: HTTP {response.status}",
+                                        code="ServiceException")
+        if response.status >= 400:
+            raise _function_error(function_name, f"HTTP {response.status}")
+        return response
+
+    def invoke(self, function_name, payload):
+        with tracing.span(f"{function_name}.encode") as encode_span:
+            body = json.dumps(payload)
+            encode_span.set(bytes=len(body))
+        with tracing.span(f"{function_name}.invoke", backend=self.name) as invoke_span:
+            response = self._post(function_name, body, "RequestResponse")
+            invoke_span.set(bytes=len(response.data))
+        with tracing.span(f"{function_name}.decode"):
+            result = json.loads(response.data)
+        if response.headers.get("X-Amz-Function-Error"):
+            raise _function_error(function_name, result.get('errorMessage', 'Unknown error'))
+        return result, invoke_span.duration_ms
+
+    def invoke_async(self, function_name, payload):
+        self._post(function_name, json.dumps(payload), "Event")
+
+BACKENDS = {"lambda": LambdaBackend, "direct": DirectBackend, "http": HttpBackend}
+
+_backends = {}
+_default_name = INVOCATION_BACKEND
+_backends_lock = threading.Lock()
+
+def get_backend(name=None):
+    """Return the shared backend with the given name, or the configured one (INVOCATION_BACKEND)."""
+    name = name or _default_name
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown invocation backend '{name}'; choose from {', '.join(BACKENDS)}")
+                backend = _backends[name] = BACKENDS[name]()
+    return backend
+
+def set_default_backend(name):
+    """Select the backend used when none is named, e.g. from a command-line option."""
+    global _default_name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown invocation backend '{name}'; choose from {', '.join(BACKENDS)}")
+    _default_name = name
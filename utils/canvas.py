@@ -0,0 +1,129 @@
+import base64
+import hashlib
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+from config import CANVAS_CACHE_MAX_BYTES
+from utils.image_processing import encode_compact
+from utils.result_cache import LRUByteCache
+from utils.tracing import tracing
+
+# Where the source sits on the canvas, as (horizontal, vertical) fractions of the free space
+ANCHORS = {
+    "center": (0.5, 0.5),
+    "top": (0.5, 0.0),
+    "bottom": (0.5, 1.0),
+    "left": (0.0, 0.5),
+    "right": (1.0, 0.5),
+    "top-left": (0.0, 0.0),
+    "top-right": (1.0, 0.0),
+    "bottom-left": (0.0, 1.0),
+    "bottom-right": (1.0, 1.0),
+}
+
+# Mask values Titan reads for outpainting: black is kept, white is generated
+KEEP, FILL = 0, 255
+
+def _result_size(canvas):
+    return len(canvas["image_data"]) + len(canvas["mask_image_data"])
+
+# Process-wide cache of built canvases, shared by every session
+_canvases = LRUByteCache(CANVAS_CACHE_MAX_BYTES, sizeof=_result_size)
+
+def place_source(source_width, source_height, width, height, anchor="center", fit=True):
+    """
+    Return the (left, top, right, bottom) box the source occupies on a width x height canvas.
+    With fit the source is scaled to touch the canvas on one axis, so outpainting extends the other;
+    otherwise it keeps its size and is only shrunk if it does not fit.
+    """
+    if anchor not in ANCHORS:
+        raise ValueError(f"Unknown anchor '{anchor}'; choose from {', '.join(ANCHORS)}")
+    scale = min(width / source_width, height / source_height)
+    if not fit:
+        scale = min(scale, 1.0)
+    placed_width = min(width, max(1, round(source_width * scale)))
+    placed_height = min(height, max(1, round(source_height * scale)))
+    horizontal, vertical = ANCHORS[anchor]
+    left = round((width - placed_width) * horizontal)
+    top = round((height - placed_height) * vertical)
+    return left, top, left + placed_width, top + placed_height
+
+def build_mask(width, height, box, feather=0):
+    """
+    Return the keep/fill mask as a height x width uint8 array: KEEP over the source box, FILL elsewhere.
+    With feather > 0 the kept area fades to FILL over that many pixels along the edges that border
+    the generated area (edges on the canvas border stay sharp), so the model blends the seam.
+    """
+    left, top, right, bottom = box
+    xs = np.arange(width, dtype=np.float32)[None, :]
+    ys = np.arange(height, dtype=np.float32)[:, None]
+    inside = (xs >= left) & (xs < right) & (ys >= top) & (ys < bottom)
+    if feather <= 0:
+        return np.where(inside, KEEP, FILL).astype(np.uint8)
+
+    # Distance (in pixels, 1 at the edge) to the nearest box edge that has generated area beyond it
+    distance = np.full((height, width), np.inf, dtype=np.float32)
+    if left > 0:
+        distance = np.minimum(distance, xs - left + 1)
+    if right < width:
+        distance = np.minimum(distance, right - xs)
+    if top > 0:
+        distance = np.minimum(distance, ys - top + 1)
+    if bottom < height:
+        distance = np.minimum(distance, bottom - ys)
+    ramp = np.clip(1 - distance / (feather + 1), 0, 1)
+    return np.where(inside, KEEP + ramp * (FILL - KEEP), FILL).round().astype(np.uint8)
+
+def _encode_mask(mask, feathered):
+    # A hard mask packs as 1-bit; a feathered one needs its grey levels
+    image = Image.fromarray(mask)
+    if not feathered:
+        image = image.convert("1")
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def build_canvas(image_bytes, width, height, anchor="center", feather=0, fit=True):
+    """
+    Place a source image on a width x height canvas and build the matching outpainting mask locally,
+    so Titan does not have to segment the image from a mask prompt on every call.
+    The area to generate is pre-filled by repeating the source's edge pixels, which gives the model
+    the neighbouring colours to continue. Results are cached per (image, size, anchor, feather, fit).
+    Returns a dict with the base64 image_data and mask_image_data, width, height and the source box.
+    """
+    key = (hashlib.sha256(image_bytes).hexdigest(), width, height, anchor, feather, fit)
+    canvas = _canvases.get(key)
+    if canvas is not None:
+        return canvas
+
+    with tracing.span("canvas.build", width=width, height=height):
+        source = ImageOps.exif_transpose(Image.open(BytesIO(image_bytes))).convert("RGB")
+        box = place_source(source.width, source.height, width, height, anchor, fit)
+        left, top, right, bottom = box
+        if (right - left, bottom - top) != source.size:
+            source = source.resize((right - left, bottom - top), Image.LANCZOS)
+        pixels = np.pad(
+            np.asarray(source),
+            ((top, height - bottom), (left, width - right), (0, 0)),
+            mode="edge"
+        )
+        mask = build_mask(width, height, box, feather)
+        canvas = {
+            "image_data": base64.b64encode(encode_compact(Image.fromarray(pixels))).decode("utf-8"),
+            "mask_image_data": base64.b64encode(_encode_mask(mask, feather > 0)).decode("utf-8"),
+            "width": width,
+            "height": height,
+            "box": box
+        }
+    _canvases.put(key, canvas)
+    return canvas
+
+def apply_canvas(payload, image_bytes, anchor="center", feather=0):
+    """
+    Return a copy of an outpaint payload whose input image and mask are the canvas built for its
+    width and height, e.g. for sweep cells that each ask for a different dimension.
+    """
+    canvas = build_canvas(image_bytes, payload["width"], payload["height"], anchor, feather)
+    packed = {key: value for key, value in payload.items() if key != "mask_prompt"}
+    packed.update(input_image_data=canvas["image_data"], mask_image_data=canvas["mask_image_data"])
+    return packed
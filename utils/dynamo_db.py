@@ -1,16 +1,78 @@
+import threading
+import time
 import boto3
 import streamlit as st
-from config import AWS_REGION, LABELS_TABLE_NAME
+from config import AWS_REGION, LABELS_TABLE_NAME, PROMPTS_TABLE_NAME, LABEL_CATALOG_TTL_SECONDS
 
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
 labels_table = dynamodb.Table(LABELS_TABLE_NAME)
+prompts_table = dynamodb.Table(PROMPTS_TABLE_NAME)
+
+class LabelCatalog:
+    """
+    Process-wide cache of the labels table shared by all Streamlit sessions.
+    The table is read with a paginated scan at most once per TTL; labels added through the app
+    are applied in place. Lookups go through dicts, so mapping names to ids is O(1) per name.
+    """
+    def __init__(self, table, ttl_seconds):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._labels = {}
+        self._ids_by_name = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _scan_all(self):
+        """Scan the whole table, following LastEvaluatedKey past the 1 MB page limit."""
+        labels = {}
+        scan_kwargs = {"ProjectionExpression": "label_id, label_name", "ConsistentRead": False}
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            labels.update({item['label_id']: item['label_name'] for item in response.get('Items', [])})
+            if 'LastEvaluatedKey' not in response:
+                return labels
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _refresh_if_stale(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            labels = self._scan_all()
+            self._labels = labels
+            self._ids_by_name = {name: label_id for label_id, name in labels.items()}
+            self._loaded_at = time.monotonic()
+
+    def labels(self):
+        """Return the {label_id: label_name} mapping. Treat it as read-only."""
+        self._refresh_if_stale()
+        return self._labels
+
+    def ids_for(self, names):
+        """Map label names to their ids, skipping unknown names."""
+        self._refresh_if_stale()
+        ids_by_name = self._ids_by_name
+        return [ids_by_name[name] for name in names if name in ids_by_name]
+
+    def add(self, label_id, label_name):
+        """Record a label created through the app without rescanning the table."""
+        with self._lock:
+            # Copy on write so readers on other sessions never see a dict change mid-iteration
+            self._labels = {**self._labels, label_id: label_name}
+            self._ids_by_name = {**self._ids_by_name, label_name: label_id}
+
+    def invalidate(self):
+        """Force the next read to rescan the table."""
+        self._loaded_at = None
+
+label_catalog = LabelCatalog(labels_table, LABEL_CATALOG_TTL_SECONDS)
 
 def get_labels():
-    """Retrieve existing labels from DynamoDB."""
+    """Retrieve existing labels from the cached label catalog."""
     try:
-        response = labels_table.scan(ConsistentRead=False)
-        return {item['label_id']: item['label_name'] for item in response.get('Items', [])}
+        return label_catalog.labels()
     except Exception as e:
         st.error(f"Error retrieving labels: {str(e)}")
         return {}
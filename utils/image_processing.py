@@ -1,4 +1,10 @@
 import base64
+from io import BytesIO
+from PIL import Image, ImageOps
+from utils.tracing import tracing
+
+# JPEG quality used when it is the smaller encoding; visually lossless for model input
+NEAR_LOSSLESS_JPEG_QUALITY = 95
 
 def encode_image(file):
     """Encode an uploaded image file as base64."""
@@ -7,3 +13,67 @@ def encode_image(file):
 def decode_image(image_data):
     """Decode base64 image data to bytes."""
     return base64.b64decode(image_data)
+
+def _encode_png(image):
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def _encode_jpeg(image):
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=NEAR_LOSSLESS_JPEG_QUALITY, optimize=True, subsampling=0)
+    return buffer.getvalue()
+
+def encode_compact(image):
+    """Encode an RGB image as optimized PNG or near-lossless JPEG, whichever is smaller."""
+    return min(_encode_png(image), _encode_jpeg(image), key=len)
+
+def preprocess_image(file, max_width, max_height):
+    """
+    Shrink an uploaded source image to the payload the outpaint model actually needs.
+    The image is oriented, downscaled to fit within max_width x max_height (never upscaled),
+    stripped of metadata and re-encoded as optimized PNG or near-lossless JPEG, whichever is smaller.
+    Returns a dict with the base64 image_data, its width/height and the original/processed byte sizes.
+    """
+    file.seek(0)
+    raw = file.read()
+    with tracing.span("image.encode", bytes=len(raw)) as encode_span:
+        image = Image.open(BytesIO(raw))
+        # Apply the EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((max_width, max_height), Image.LANCZOS)
+        encoded = encode_compact(image)
+        image_data = base64.b64encode(encoded).decode("utf-8")
+        encode_span.set(encoded_bytes=len(image_data))
+    return {
+        "image_data": image_data,
+        "width": image.width,
+        "height": image.height,
+        "original_bytes": len(raw),
+        "processed_bytes": len(encoded)
+    }
+
+def preprocess_mask(file, width, height):
+    """
+    Pack an uploaded mask image as a 1-bit PNG matching the preprocessed source image size.
+    Returns the same dict shape as preprocess_image.
+    """
+    file.seek(0)
+    raw = file.read()
+    mask = ImageOps.exif_transpose(Image.open(BytesIO(raw))).convert("L")
+    # Nearest-neighbour keeps the mask strictly black and white at the new size
+    mask = mask.resize((width, height), Image.NEAREST).point(lambda value: 255 if value >= 128 else 0).convert("1")
+    encoded = _encode_png(mask)
+    return {
+        "image_data": base64.b64encode(encoded).decode("utf-8"),
+        "width": width,
+        "height": height,
+        "original_bytes": len(raw),
+        "processed_bytes": len(encoded)
+    }
+
+def format_bytes_saved(result):
+    """Describe how much a preprocessing step shrank an upload, for display in the app."""
+    original, processed = result["original_bytes"], result["processed_bytes"]
+    saved = 100 * (1 - processed / original) if original else 0
+    return f"{original / 1024:,.0f} KB → {processed / 1024:,.0f} KB ({saved:.0f}% smaller)"
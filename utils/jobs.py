@@ -0,0 +1,72 @@
+import threading
+import time
+import uuid
+import boto3
+from config import AWS_REGION, JOBS_TABLE_NAME, JOB_STORE_DIR
+from utils.aws_lambda import call_lambda_async, LambdaInvocationError
+from utils.backends import get_backend
+from utils.lambda_modules import load_handler_module
+from utils.object_store import get_object_store
+from utils.payload_transport import resolve_result_images
+
+jobStore = load_handler_module("jobStore")
+
+# Job statuses, as written by the handlers
+PENDING = jobStore.PENDING
+SUCCEEDED = jobStore.SUCCEEDED
+FAILED = jobStore.FAILED
+FINISHED_STATUSES = jobStore.FINISHED_STATUSES
+
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def _get_stores():
+    """Create the job store on first use (a local directory if configured, otherwise DynamoDB)."""
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            if JOB_STORE_DIR:
+                _job_store = jobStore.LocalJobStore(JOB_STORE_DIR)
+            else:
+                dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+                _job_store = jobStore.DynamoJobStore(dynamodb.Table(JOBS_TABLE_NAME))
+    return _job_store, get_object_store()
+
+def _job_backend():
+    """The configured backend, except that deployed functions cannot see a local job store, so those jobs run here."""
+    backend = get_backend()
+    if JOB_STORE_DIR and backend.name == "lambda":
+        return get_backend("direct")
+    return backend
+
+def submit_job(function_name, payload):
+    """
+    Submit a payload for asynchronous processing and return its job id immediately.
+    Raises LambdaInvocationError if the job could not be queued.
+    """
+    job_id = uuid.uuid4().hex
+    job_store, object_store = _get_stores()
+    if object_store is None:
+        raise LambdaInvocationError("Background jobs need OBJECT_STORE_BUCKET or OBJECT_STORE_DIR to be configured.")
+    request_key = jobStore.store_job_request(job_id, payload, object_store=object_store)
+    jobStore.update_job(job_store, job_id, PENDING, submitted_at=int(time.time()))
+    event = {"job_id": job_id, "job_request_key": request_key}
+    try:
+        call_lambda_async(function_name, event, backend=_job_backend())
+    except Exception as e:
+        jobStore.update_job(job_store, job_id, FAILED, message=str(e))
+        raise LambdaInvocationError(str(e)) from e
+    return job_id
+
+def get_job(job_id):
+    """
+    Return (status, result, message) for a job. result is the handler result once the job has
+    SUCCEEDED; message explains a FAILED job. Unknown jobs report FAILED.
+    """
+    job_store, object_store = _get_stores()
+    record = job_store.get(job_id)
+    if record is None:
+        return FAILED, None, "Job not found or expired."
+    status = record["status"]
+    result = jobStore.load_job_result(record, object_store=object_store) if status == SUCCEEDED else None
+    return status, resolve_result_images(result), record.get("message")
@@ -0,0 +1,15 @@
+import importlib
+import os
+import sys
+from config import AWS_REGION
+
+# Lambda handlers are deployed as flat modules, so they import each other by bare name
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda_function")
+
+def load_handler_module(name):
+    """Import a module from lambda_function/ so the app can share code with the handlers."""
+    if LAMBDA_DIR not in sys.path:
+        sys.path.append(LAMBDA_DIR)
+        # Handlers build clients without an explicit region, as they would inside Lambda
+        os.environ.setdefault("AWS_DEFAULT_REGION", AWS_REGION)
+    return importlib.import_module(name)
@@ -0,0 +1,25 @@
+import threading
+import boto3
+from config import AWS_REGION, OBJECT_STORE_BUCKET, OBJECT_STORE_DIR
+from utils.lambda_modules import load_handler_module
+
+objectStore = load_handler_module("objectStore")
+
+_object_store = None
+_lock = threading.Lock()
+
+def get_object_store():
+    """
+    Return the object store shared with the Lambda functions: a local directory if
+    OBJECT_STORE_DIR is set, the OBJECT_STORE_BUCKET S3 bucket if that is set, otherwise None.
+    """
+    global _object_store
+    with _lock:
+        if _object_store is None:
+            if OBJECT_STORE_DIR:
+                _object_store = objectStore.LocalObjectStore(OBJECT_STORE_DIR)
+            elif OBJECT_STORE_BUCKET:
+                _object_store = objectStore.S3ObjectStore(
+                    OBJECT_STORE_BUCKET, client=boto3.client('s3', region_name=AWS_REGION)
+                )
+        return _object_store
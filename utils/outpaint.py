@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import SWEEP_MAX_WORKERS
+from utils.aws_lambda import call_lambda, LambdaInvocationError
+from utils.result_cache import invoke_outpaint
+
+# Titan Image Generator G1 returns at most this many images per request
+MAX_IMAGES_PER_CALL = 5
+
+def build_outpaint_payload(prompt, input_image_data, width, height, seed, mask_image_data=None, mask_prompt=None):
+    """Build the outpaint Lambda payload, including only the chosen mask option."""
+    payload = {
+        "prompt": prompt,
+        "input_image_data": input_image_data,
+        "height": int(height),
+        "width": int(width),
+        "outPaintingMode": "DEFAULT",
+        "seed": seed
+    }
+    if mask_image_data:
+        payload["mask_image_data"] = mask_image_data
+    elif mask_prompt:
+        payload["mask_prompt"] = mask_prompt
+    return payload
+
+def parse_number_list(text, cast=int):
+    """Parse a comma-separated list of numbers, dropping blanks and duplicates but keeping order."""
+    values = []
+    for part in text.split(","):
+        part = part.strip()
+        if part and cast(part) not in values:
+            values.append(cast(part))
+    return values
+
+def build_sweep_cells(base_payload, seeds, cfg_scales, dimensions, images_per_call=1):
+    """
+    Expand a base outpaint payload into one cell per (dimension, cfgScale, seed) combination.
+    Each cell is a single Lambda call that asks Titan for images_per_call images at once.
+    """
+    cells = []
+    for dimension in dimensions:
+        for cfg_scale in cfg_scales:
+            for seed in seeds:
+                payload = dict(
+                    base_payload,
+                    seed=seed,
+                    cfgScale=cfg_scale,
+                    width=dimension["width"],
+                    height=dimension["height"],
+                    numberOfImages=images_per_call
+                )
+                cells.append({
+                    "seed": seed,
+                    "cfg_scale": cfg_scale,
+                    "dimension_label": dimension["label"],
+                    "payload": payload
+                })
+    return cells
+
+def _run_cell(cell):
+    start = time.perf_counter()
+    try:
+        result = invoke_outpaint(cell["payload"], invoke=call_lambda)
+        error = None if result.get("statusCode") == 200 else result.get("message", "Unknown error")
+    except LambdaInvocationError as e:
+        result, error = {}, str(e)
+    return {
+        "images": [] if error else result.get("images", [result.get("image_data")]),
+        "elapsed": time.perf_counter() - start,
+        "error": error
+    }
+
+def run_sweep(cells, max_workers=SWEEP_MAX_WORKERS):
+    """
+    Fan the cells out across a bounded thread pool and yield (index, outcome) as each one completes.
+    Each outcome holds the base64 images, the wall-clock seconds of its call and an error message or None.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cells))))
+    try:
+        futures = {executor.submit(_run_cell, cell): index for index, cell in enumerate(cells)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # A Streamlit rerun abandons the generator; do not start calls nobody will look at
+        executor.shutdown(wait=False, cancel_futures=True)
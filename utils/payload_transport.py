@@ -0,0 +1,73 @@
+import threading
+import time
+from config import PAYLOAD_UPLOAD_MEMO_SECONDS
+from utils.backends import get_backend, LambdaInvocationError
+from utils.lambda_modules import load_handler_module
+from utils.object_store import get_object_store
+from utils.tracing import tracing
+
+payloadTransport = load_handler_module("payloadTransport")
+
+# Fields of the outpaint payload that may be sent by reference
+OFFLOADABLE_FIELDS = ("input_image_data", "mask_image_data")
+
+# Payload keys uploaded by this process and when; keys are content-addressed, so an upload is reused
+# until it is PAYLOAD_UPLOAD_MEMO_SECONDS old, after which the lifecycle rule may soon expire it
+_uploaded_keys = {}
+_uploaded_lock = threading.Lock()
+
+def offload_large_fields(payload):
+    """
+    Return a copy of the payload in which images above INLINE_PAYLOAD_LIMIT are uploaded to the
+    object store once and replaced by <field>_ref keys, keeping the Lambda event small.
+    Without a configured object store, or when the handlers run in-process, the payload is passed unchanged.
+    Raises LambdaInvocationError if an upload fails.
+    """
+    store = get_object_store()
+    if store is None or get_backend().in_process:
+        return payload
+    packed = dict(payload)
+    for field in OFFLOADABLE_FIELDS:
+        data = packed.get(field)
+        if not data or len(data) <= payloadTransport.INLINE_PAYLOAD_LIMIT:
+            continue
+        key = payloadTransport.payload_key(data)
+        now = time.monotonic()
+        with _uploaded_lock:
+            uploaded_at = _uploaded_keys.get(key)
+        if uploaded_at is None or now - uploaded_at > PAYLOAD_UPLOAD_MEMO_SECONDS:
+            try:
+                with tracing.span("payload.upload", bytes=len(data)):
+                    store.put(key, data.encode("utf-8"), content_type="text/plain")
+            except Exception as e:
+                raise LambdaInvocationError(f"Error uploading {field} to the object store: {str(e)}") from e
+            with _uploaded_lock:
+                # Forget stale entries too, so the memo does not grow for the life of the process
+                for stale in [k for k, at in _uploaded_keys.items() if now - at > PAYLOAD_UPLOAD_MEMO_SECONDS]:
+                    del _uploaded_keys[stale]
+                _uploaded_keys[key] = now
+        del packed[field]
+        packed[field + payloadTransport.REF_SUFFIX] = key
+    return packed
+
+def resolve_result_images(result):
+    """
+    Download images a handler returned by reference so the result carries images and image_data inline.
+    Raises LambdaInvocationError if a referenced image cannot be read or is no longer in the object store.
+    """
+    if not result or not result.get("image_refs"):
+        return result
+    store = get_object_store()
+    with tracing.span("payload.download", images=len(result["image_refs"])):
+        images = []
+        for key in result["image_refs"]:
+            try:
+                data = store.get(key)
+            except Exception as e:
+                raise LambdaInvocationError(f"Error downloading generated image {key}: {str(e)}") from e
+            if data is None:
+                raise LambdaInvocationError(f"Generated image {key} is no longer in the object store.")
+            images.append(data.decode("utf-8"))
+    resolved = {key: value for key, value in result.items() if key != "image_refs"}
+    resolved.update(image_data=images[0], images=images)
+    return resolved
@@ -0,0 +1,37 @@
+from io import BytesIO
+from config import DRAFT_STEPS
+from constants.dimensions import DIMENSIONS_OPTIONS
+from utils.image_processing import preprocess_image, preprocess_mask, decode_image
+
+# Dimensions billed as a 512 x 512 image, the cheapest tier
+DRAFT_TIER_OPTIONS = [option for option in DIMENSIONS_OPTIONS if "Equivalent to 512 x 512" in option["label"]]
+
+def draft_dimension(width, height):
+    """
+    Return the DIMENSIONS_OPTIONS entry a draft of a width x height render uses: the smallest 512-tier
+    dimension with the same aspect ratio, or the closest aspect ratio when the tier has none.
+    """
+    aspect = width / height
+    return min(DRAFT_TIER_OPTIONS, key=lambda option: (
+        round(abs(option["width"] / option["height"] - aspect), 2),
+        option["width"] * option["height"]
+    ))
+
+def draft_outpaint_payload(payload):
+    """
+    Return a copy of an outpaint payload rendered at its draft dimension, with the input image and
+    mask image scaled down to match. Seed, prompts, cfgScale and the other parameters are unchanged,
+    so accepting the draft renders the original payload.
+    """
+    draft = draft_dimension(payload["width"], payload["height"])
+    image = preprocess_image(BytesIO(decode_image(payload["input_image_data"])), draft["width"], draft["height"])
+    packed = dict(payload, width=draft["width"], height=draft["height"], input_image_data=image["image_data"])
+    if payload.get("mask_image_data"):
+        packed["mask_image_data"] = preprocess_mask(
+            BytesIO(decode_image(payload["mask_image_data"])), image["width"], image["height"]
+        )["image_data"]
+    return packed
+
+def draft_image_payload(payload, steps=DRAFT_STEPS):
+    """Return a copy of an image_processing payload that renders with fewer diffusion steps."""
+    return dict(payload, steps=min(steps, payload.get("steps", steps)))
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+# Width of the hashed feature vectors. 256 float32 columns keep 100k prompts at ~100 MB
+DEFAULT_DIM = 256
+
+# Files of a saved index: raw float32 rows (memory-mapped on load) and one JSON metadata line per write
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "prompts.jsonl"
+
+# PromptsTable index listing every prompt by when it was last saved
+UPDATED_INDEX_NAME = "UpdatedIndex"
+LEADERBOARD = "all"
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def prompt_id_for(prompt):
+    """Return the id savePrompt uses for a prompt."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def _features(text):
+    """Word unigrams plus character trigrams of the normalized text."""
+    text = " ".join(text.lower().split())
+    words = _WORD_PATTERN.findall(text)
+    padded = f" {text} "
+    return [f"w:{word}" for word in words] + [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+def vectorize(texts, dim=DEFAULT_DIM):
+    """
+    Embed texts as L2-normalized hashed n-gram vectors, one row per text.
+    Features are hashed with crc32 (stable across processes) and signed to reduce collision bias.
+    """
+    rows, columns, signs = [], [], []
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            rows.append(row)
+            columns.append(hashed % dim)
+            signs.append(1.0 if hashed & 0x80000000 else -1.0)
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)), signs)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+class PromptIndex:
+    """
+    Cosine-similarity index over saved prompts. Rows are only ever appended, so a saved index
+    grows by appending to its files and is memory-mapped again rather than rewritten.
+    Without a directory the index lives in memory only. updated_at is the watermark: the newest
+    updated_at of any entry added, so a refresh only needs the rows saved after it.
+    """
+    def __init__(self, directory=None, dim=DEFAULT_DIM):
+        self.directory = directory
+        self.dim = dim
+        self._ids = []
+        self._rows = {}
+        self._metadata = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._buffer = self._vectors
+        self.updated_at = None
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, METADATA_FILE), encoding="utf-8") as f:
+                for line in f:
+                    self._apply_metadata(json.loads(line))
+        except FileNotFoundError:
+            return
+        self._remap()
+
+    def _apply_metadata(self, entry):
+        """Record metadata for a prompt; returns True if the prompt is new and needs a vector row."""
+        if entry.get("updated_at") and (self.updated_at is None or entry["updated_at"] > self.updated_at):
+            self.updated_at = entry["updated_at"]
+        row = self._rows.get(entry["prompt_id"])
+        if row is not None:
+            self._metadata[row] = entry
+            return False
+        self._rows[entry["prompt_id"]] = len(self._ids)
+        self._ids.append(entry["prompt_id"])
+        self._metadata.append(entry)
+        return True
+
+    def _remap(self):
+        if self._ids:
+            self._vectors = np.memmap(
+                os.path.join(self.directory, VECTORS_FILE), dtype=np.float32, mode="r",
+                shape=(len(self._ids), self.dim)
+            )
+
+    def add_many(self, entries):
+        """
+        Add or update prompts. Each entry is a dict with prompt_id, prompt and any metadata to show
+        with matches (e.g. rating, rating_count, seed). Known prompts only get their metadata updated.
+        """
+        with self._lock:
+            new_entries = [entry for entry in entries if self._apply_metadata(entry)]
+            vectors = vectorize([entry["prompt"] for entry in new_entries], self.dim)
+            if self.directory:
+                # Vector rows go first and the file is cut back to the rows the metadata references,
+                # so rows left behind by a crash between the two writes are dropped
+                with open(os.path.join(self.directory, VECTORS_FILE), "a+b") as f:
+                    f.truncate(len(self._vectors) * self.dim * vectors.itemsize)
+                    f.write(vectors.tobytes())
+                with open(os.path.join(self.directory, METADATA_FILE), "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(entry) + "\n" for entry in entries)
+                self._remap()
+            else:
+                self._append_in_memory(vectors)
+
+    def _append_in_memory(self, vectors):
+        count = len(self._vectors)
+        if count + len(vectors) > len(self._buffer):
+            # Grow geometrically so repeated single adds stay amortized O(1) per row
+            buffer = np.zeros((max(2 * len(self._buffer), count + len(vectors), 64), self.dim), dtype=np.float32)
+            buffer[:count] = self._vectors
+            self._buffer = buffer
+        self._buffer[count:count + len(vectors)] = vectors
+        self._vectors = self._buffer[:count + len(vectors)]
+
+    def is_current(self, entry):
+        """True if the index already holds this entry with the same metadata."""
+        row = self._rows.get(entry["prompt_id"])
+        return row is not None and self._metadata[row] == entry
+
+    def add(self, prompt_id, prompt, **metadata):
+        """Add or update one prompt."""
+        self.add_many([{"prompt_id": prompt_id, "prompt": prompt, **metadata}])
+
+    def search_many(self, texts, k=5, min_score=0.0):
+        """
+        Return the top-k matches for each query text as lists of (score, metadata), best first.
+        All queries are scored against the index in one matrix product.
+        """
+        vectors, metadata = self._vectors, self._metadata
+        count = len(vectors)
+        if count == 0 or not texts:
+            return [[] for _ in texts]
+        scores = vectorize(texts, self.dim) @ np.asarray(vectors).T
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-query_scores[candidates])]
+            results.append([
+                (float(query_scores[row]), metadata[row]) for row in ordered if query_scores[row] > min_score
+            ])
+        return results
+
+    def search(self, text, k=5, min_score=0.0):
+        """Return the top-k matches for one query text."""
+        return self.search_many([text], k, min_score)[0]
+
+def entry_from_item(item):
+    """Build an index entry from a PromptsTable item."""
+    rating = item.get("score", item.get("rating"))
+    return {
+        "prompt_id": item["prompt_id"],
+        "prompt": item["prompt"],
+        "rating": float(rating) if rating is not None else None,
+        "rating_count": int(item.get("rating_count", 1 if rating is not None else 0)),
+        "seed": int(item["seed"]) if item.get("seed") is not None else None,
+        "updated_at": item.get("updated_at")
+    }
+
+def build_from_table(table, index, page_size=1000):
+    """Load every saved prompt into the index with a paginated scan, one batch per page."""
+    scan_kwargs = {
+        "ProjectionExpression": "prompt_id, prompt, seed, score, rating_count, rating, updated_at",
+        "Limit": page_size
+    }
+    while True:
+        response = table.scan(**scan_kwargs)
+        index.add_many([entry_from_item(item) for item in response.get("Items", []) if item.get("prompt")])
+        if "LastEvaluatedKey" not in response:
+            return index
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def refresh_from_table(table, index, page_size=1000):
+    """
+    Add the prompts saved since the index watermark, by any process, with a paginated query of the
+    UpdatedIndex. Rows at the watermark itself are read again and skipped if unchanged, so a save
+    sharing the watermark's timestamp is not missed. Returns the number of prompts added or updated.
+    """
+    if index.updated_at is None:
+        return 0
+    query_kwargs = {
+        "IndexName": UPDATED_INDEX_NAME,
+        "KeyConditionExpression": "board = :board AND updated_at >= :watermark",
+        "ExpressionAttributeValues": {":board": LEADERBOARD, ":watermark": index.updated_at},
+        "Limit": page_size
+    }
+    refreshed = 0
+    while True:
+        response = table.query(**query_kwargs)
+        entries = [
+            entry for entry in (entry_from_item(item) for item in response.get("Items", []) if item.get("prompt"))
+            if not index.is_current(entry)
+        ]
+        if entries:
+            index.add_many(entries)
+            refreshed += len(entries)
+        if "LastEvaluatedKey" not in response:
+            return refreshed
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+_prompt_index = None
+_prompt_index_lock = threading.Lock()
+_refreshed_at = 0.0
+
+def get_prompt_index():
+    """
+    Return the process-wide index shared by all sessions. It is loaded from PROMPT_INDEX_DIR, or
+    built from PromptsTable with one scan the first time the directory has no watermark. Prompts saved in
+    this process are added as they are saved; prompts saved elsewhere are picked up on load and then
+    at most every PROMPT_INDEX_REFRESH_SECONDS by refresh_from_table.
+    """
+    global _prompt_index, _refreshed_at
+    from config import PROMPT_INDEX_DIR, PROMPT_INDEX_REFRESH_SECONDS
+    from utils.dynamo_db import prompts_table
+    if _prompt_index is None:
+        with _prompt_index_lock:
+            if _prompt_index is None:
+                index = PromptIndex(PROMPT_INDEX_DIR)
+                # An index without a watermark (empty, or saved before entries carried updated_at) is
+                # filled by a full scan, which also sets the watermark
+                if index.updated_at is None:
+                    build_from_table(prompts_table, index)
+                    # The scan has just read every row
+                    _refreshed_at = time.monotonic()
+                _prompt_index = index
+    if time.monotonic() - _refreshed_at >= PROMPT_INDEX_REFRESH_SECONDS:
+        with _prompt_index_lock:
+            if time.monotonic() - _refreshed_at >= PROMPT_INDEX_REFRESH_SECONDS:
+                # Stamped first, so a failing table is retried once per interval rather than on every call
+                _refreshed_at = time.monotonic()
+                refresh_from_table(prompts_table, _prompt_index)
+    return _prompt_index
@@ -0,0 +1,33 @@
+from utils.aws_lambda import call_lambda, LambdaInvocationError
+from utils.backends import get_backend, DirectBackend
+from utils.lambda_modules import load_handler_module
+from utils.tracing import tracing
+
+def stream_optimized_prompt(prompt, suggestion, cancel_event=None, force_regenerate=False):
+    """
+    Yield the optimized prompt as it is generated. When the active invocation backend is "direct",
+    tokens arrive as Claude produces them; the "lambda" and "http" backends return a buffered
+    response, so the whole prompt arrives as one chunk.
+    Closing the generator (e.g. when a Streamlit rerun interrupts the script) or setting
+    cancel_event stops the request. Optimized prompts are memoized by the handler; set
+    force_regenerate to skip the cached prompt and store a fresh one. Raises LambdaInvocationError on failure.
+    """
+    if isinstance(get_backend(), DirectBackend):
+        optimizePrompt = load_handler_module("optimizePrompt")
+        try:
+            with tracing.span("optimize_prompt.stream"):
+                yield from optimizePrompt.stream_optimized_prompt(
+                    prompt, suggestion, cancel_event=cancel_event, force_regenerate=force_regenerate
+                )
+        except Exception as e:
+            raise LambdaInvocationError(f"Error optimizing prompt: {str(e)}") from e
+        return
+
+    result = call_lambda("optimize_prompt", {
+        "prompt": prompt,
+        "suggestion": suggestion,
+        "force_regenerate": force_regenerate
+    })
+    if result.get('statusCode') != 200:
+        raise LambdaInvocationError(result.get("message", "Unknown error"))
+    yield result.get('optimized_prompt', '')
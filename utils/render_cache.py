@@ -0,0 +1,44 @@
+import hashlib
+from io import BytesIO
+from PIL import Image
+from config import RENDER_CACHE_MAX_BYTES
+from utils.image_processing import decode_image
+from utils.result_cache import LRUByteCache
+from utils.tracing import tracing
+
+# Display widths used by the app
+DISPLAY_WIDTH = 1024
+THUMBNAIL_WIDTH = 256
+
+# Process-wide cache of display-sized renders keyed on (image digest, width)
+_renders = LRUByteCache(RENDER_CACHE_MAX_BYTES)
+
+def decode_output(image_data):
+    """
+    Decode a base64 model output once, returning (image_bytes, digest).
+    Keep the raw bytes (not the base64 string) in session state and pass the digest to render_image.
+    """
+    with tracing.span("image.decode", bytes=len(image_data)):
+        image_bytes = decode_image(image_data)
+        return image_bytes, hashlib.sha256(image_bytes).hexdigest()
+
+def render_image(image_bytes, digest, width=DISPLAY_WIDTH):
+    """
+    Return display-ready image bytes no wider than width, decoding and resizing only on a cache miss.
+    Images that already fit are returned as-is without a copy.
+    """
+    key = (digest, width)
+    rendered = _renders.get(key)
+    if rendered is not None:
+        return rendered
+    with tracing.span("image.render", width=width):
+        image = Image.open(BytesIO(image_bytes))
+        if image.width <= width:
+            rendered = image_bytes
+        else:
+            image.thumbnail((width, width * image.height // image.width), Image.LANCZOS)
+            buffer = BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=90)
+            rendered = buffer.getvalue()
+    _renders.put(key, rendered)
+    return rendered
@@ -0,0 +1,50 @@
+import functools
+import time
+import streamlit as st
+from utils.tracing import tracing
+
+def start_rerun():
+    """Read the clocks at the start of a script run; pass the result to finish_rerun."""
+    return time.thread_time(), time.perf_counter()
+
+def finish_rerun(section, started):
+    """
+    Count one run of a section of the app and the CPU and wall time it took, per session and in the
+    process-wide rolling percentiles (as "rerun.<section>"). CPU time is that of the script thread,
+    so it excludes waiting on Lambda and work done by worker threads.
+    """
+    cpu_ms = (time.thread_time() - started[0]) * 1000
+    wall_ms = (time.perf_counter() - started[1]) * 1000
+    costs = st.session_state.setdefault('rerun_costs', {})
+    entry = costs.setdefault(section, {"runs": 0, "cpu_ms": 0.0, "last_cpu_ms": 0.0, "last_wall_ms": 0.0})
+    entry["runs"] += 1
+    entry["cpu_ms"] += cpu_ms
+    entry["last_cpu_ms"] = cpu_ms
+    entry["last_wall_ms"] = wall_ms
+    tracing.stats.record(f"rerun.{section}", cpu_ms)
+
+def measured(section):
+    """Decorate a fragment body so each of its runs is counted by finish_rerun, including runs ended by st.rerun."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = start_rerun()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                finish_rerun(section, started)
+        return wrapper
+    return decorate
+
+def rerun_cost_rows():
+    """Return the session's rerun counts and costs per section, for display."""
+    return [
+        {
+            "section": section,
+            "runs": entry["runs"],
+            "mean_cpu_ms": round(entry["cpu_ms"] / entry["runs"], 1),
+            "last_cpu_ms": round(entry["last_cpu_ms"], 1),
+            "last_wall_ms": round(entry["last_wall_ms"], 1)
+        }
+        for section, entry in sorted(st.session_state.get('rerun_costs', {}).items())
+    ]
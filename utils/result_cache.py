@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from config import RESULT_CACHE_MAX_BYTES
+from utils.aws_lambda import invoke_lambda
+from utils.lambda_modules import load_handler_module
+from utils.payload_transport import offload_large_fields, resolve_result_images
+
+# Share the key derivation with the Lambda so both cache tiers agree on what "identical" means
+request_key = load_handler_module("resultCache").request_key
+
+class LRUByteCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values in bytes.
+    """
+    def __init__(self, max_bytes, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for a key and mark it as recently used, or None."""
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key][0]
+
+    def put(self, key, value):
+        """Insert a value, evicting least recently used entries until the budget is met."""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def __len__(self):
+        return len(self._items)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one call whose result is shared by all callers.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = self._calls[key] = _Call()
+            if is_leader:
+                break
+            call.done.wait()
+            # A leader interrupted by a Streamlit rerun did not finish; let a follower take over
+            if call.error is None or isinstance(call.error, Exception):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+def _result_size(result):
+    return sum(len(image) for image in result.get("images") or [result.get("image_data") or ""])
+
+# Process-wide tiers, shared by every Streamlit session served by this process
+_results = LRUByteCache(RESULT_CACHE_MAX_BYTES, sizeof=_result_size)
+_in_flight = SingleFlight()
+
+def invoke_outpaint(payload, invoke=invoke_lambda):
+    """
+    Invoke the outpaint Lambda, serving identical deterministic requests from the in-process
+    cache and collapsing concurrent identical requests into a single Lambda call.
+    Worker threads pass invoke=call_lambda so failures raise instead of rendering in the UI.
+    Large images travel through the object store rather than inline in the Lambda event and response.
+    """
+    key = request_key(payload)
+    if key is None:
+        return resolve_result_images(invoke("outpaint", offload_large_fields(payload)))
+
+    result = _results.get(key)
+    if result is not None:
+        return result
+
+    def generate():
+        # A previous leader may have finished between the cache check and acquiring the flight
+        result = _results.get(key)
+        if result is not None:
+            return result
+        result = resolve_result_images(invoke("outpaint", offload_large_fields(payload)))
+        if result and result.get("statusCode") == 200:
+            _results.put(key, result)
+        return result
+
+    return _in_flight.do(key, generate)
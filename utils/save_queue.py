@@ -0,0 +1,74 @@
+import time
+import uuid
+from utils.aws_lambda import call_lambda, LambdaInvocationError
+
+# Saves sent per batch-save call (the handler accepts at most 100)
+BATCH_SIZE = 100
+
+class SaveQueue:
+    """
+    Buffers prompt saves in the session and sends them to the batch-save Lambda together.
+    Kept in st.session_state so it survives reruns. A flush is due once max_items saves are
+    waiting or the oldest has waited max_age_seconds; saves that fail stay listed with their error.
+    """
+    def __init__(self, max_items, max_age_seconds, send=None):
+        self.max_items = max_items
+        self.max_age_seconds = max_age_seconds
+        self.send = send or (lambda items: call_lambda("batch_save_prompts", {"items": items}))
+        self.pending = []
+        self.failed = []
+        self.send_error = None
+
+    def enqueue(self, prompt, rating, seed, labels):
+        """Queue a save and return its entry."""
+        entry = {
+            "id": uuid.uuid4().hex,
+            "queued_at": time.monotonic(),
+            "request": {"prompt": prompt, "rating": rating, "seed": seed, "labels": labels}
+        }
+        self.pending.append(entry)
+        return entry
+
+    def is_due(self):
+        """True when enough saves are waiting or the oldest has waited long enough."""
+        if not self.pending:
+            return False
+        return (len(self.pending) >= self.max_items
+                or time.monotonic() - self.pending[0]["queued_at"] >= self.max_age_seconds)
+
+    def flush(self):
+        """
+        Send every pending save and return [(entry, result)] for those that were saved.
+        Saves the handler rejects move to failed with its message. A batch whose call fails outright
+        stays pending for the next flush, its error kept in send_error; the other batches are still
+        sent and their results returned.
+        """
+        saved = []
+        sent_ids = set()
+        self.send_error = None
+        pending = list(self.pending)
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch = pending[start:start + BATCH_SIZE]
+            try:
+                response = self.send([entry["request"] for entry in batch])
+                if response.get("statusCode") != 200:
+                    raise LambdaInvocationError(response.get("message", "Unknown error"))
+            except LambdaInvocationError as e:
+                self.send_error = str(e)
+                continue
+            sent_ids.update(entry["id"] for entry in batch)
+            for entry, result in zip(batch, response["results"]):
+                if result.get("statusCode") == 200:
+                    saved.append((entry, result))
+                else:
+                    self.failed.append({**entry, "message": result.get("message", "Unknown error")})
+        self.pending = [entry for entry in self.pending if entry["id"] not in sent_ids]
+        return saved
+
+    def retry_failed(self):
+        """Queue failed saves again."""
+        now = time.monotonic()
+        self.pending.extend(
+            {"id": entry["id"], "queued_at": now, "request": entry["request"]} for entry in self.failed
+        )
+        self.failed = []
@@ -1,15 +1,27 @@
 import streamlit as st
+from config import SAVE_QUEUE_MAX_ITEMS, SAVE_QUEUE_MAX_AGE_SECONDS
+from utils.save_queue import SaveQueue
 
 def initialize_session_state():
     """Initialize session state variables if they don't exist."""
     default_values = {
         'input_image_data': None,
+        'input_image_key': None,
+        'input_image_size': None,
+        'input_image_savings': None,
         'uploaded_image_name': None,
         'mask_image_data': None,
+        'mask_image_key': None,
+        'mask_image_savings': None,
         'uploaded_mask_name': None,
         'mask_prompt': None,
+        'canvas': None,
+        'canvas_key': None,
+        'canvas_anchor': "center",
+        'canvas_feather': 0,
         'outpaint_prompt': "Expand the scene",
-        'image_data': None,
+        'image_bytes': None,
+        'image_digest': None,
         'image_generated': False,
         'rating': 5,
         'selected_labels': [],
@@ -20,7 +32,20 @@ def initialize_session_state():
         'feedback_details': '',
         'feedback_adjustments': '',
         'selected_dimension_label': None,
+        'seed': 42,
+        'sweep_results': [],
+        'draft': None,
+        'source_draft': None,
+        'source_prompt': "",
+        'jobs': {},
+        'tag_browser': {"label_id": None, "prompts": [], "next_key": None},
+        'top_prompts': {},
+        'save_queue': None,
+        'similar_prompts': None,
+        'rerun_costs': {},
     }
     for key, value in default_values.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    if st.session_state['save_queue'] is None:
+        st.session_state['save_queue'] = SaveQueue(SAVE_QUEUE_MAX_ITEMS, SAVE_QUEUE_MAX_AGE_SECONDS)
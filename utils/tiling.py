@@ -0,0 +1,215 @@
+import base64
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+from config import TILE_OVERLAP, TILE_MAX_WORKERS
+from constants.dimensions import DIMENSIONS_OPTIONS
+from utils.aws_lambda import call_lambda, LambdaInvocationError
+from utils.canvas import place_source, KEEP, FILL
+from utils.image_processing import encode_compact
+from utils.outpaint import build_outpaint_payload
+from utils.result_cache import invoke_outpaint
+from utils.tracing import tracing
+
+def tile_starts(length, tile, overlap):
+    """Offsets of the fewest tiles covering length with at least overlap pixels shared by neighbours, evenly spaced."""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - overlap) / (tile - overlap))
+    return [round(index * (length - tile) / (count - 1)) for index in range(count)]
+
+def choose_tile_size(width, height, overlap=TILE_OVERLAP):
+    """
+    Return the (width, height) in DIMENSIONS_OPTIONS that fits the canvas and covers it with the fewest
+    tiles, preferring larger tiles and then the canvas's aspect ratio.
+    """
+    fitting = [option for option in DIMENSIONS_OPTIONS if option["width"] <= width and option["height"] <= height
+               and 2 * overlap < min(option["width"], option["height"])]
+    if not fitting:
+        raise ValueError(f"A {width} x {height} canvas is smaller than every supported tile size.")
+    aspect = width / height
+    best = min(fitting, key=lambda option: (
+        len(tile_starts(width, option["width"], overlap)) * len(tile_starts(height, option["height"], overlap)),
+        -option["width"] * option["height"],
+        abs(option["width"] / option["height"] - aspect)
+    ))
+    return best["width"], best["height"]
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+def plan_tiles(width, height, tile_width, tile_height, overlap, source_box):
+    """
+    Split the canvas into overlapping tiles and order them in waves outward from the source, so that
+    overlapping tiles never share a wave. Tiles are taken ring by ring (ring 0 overlaps the source,
+    ring n overlaps ring n - 1); each gets the lowest wave above those of the overlapping tiles of inner
+    rings that no overlapping tile of its own ring has taken (greedy colouring). A tile depends on every
+    overlapping tile of a lower wave, so it is generated once they are done and sees their pixels;
+    tiles of one wave do not overlap and run in parallel. Tiles entirely inside the source are dropped.
+    Returns a list of dicts with index, box (left, top, right, bottom), ring, wave and deps (indexes).
+    """
+    boxes = [
+        (left, top, left + tile_width, top + tile_height)
+        for top in tile_starts(height, tile_height, overlap)
+        for left in tile_starts(width, tile_width, overlap)
+    ]
+    tiles = [{"index": index, "box": box, "ring": None, "wave": None, "deps": []}
+             for index, box in enumerate(boxes) if not _contains(source_box, box)]
+    frontier = [tile for tile in tiles if _overlaps(tile["box"], source_box)]
+    ring = 0
+    while frontier:
+        for tile in frontier:
+            tile["ring"] = ring
+        ring += 1
+        frontier = [tile for tile in tiles if tile["ring"] is None
+                    and any(_overlaps(tile["box"], done["box"]) for done in frontier)]
+
+    # Row-major order within a ring colours a grid of tiles with four waves
+    for tile in sorted(tiles, key=lambda tile: (tile["ring"], tile["index"])):
+        neighbours = [other for other in tiles if other is not tile and other["wave"] is not None
+                      and _overlaps(tile["box"], other["box"])]
+        wave = max((other["wave"] + 1 for other in neighbours if other["ring"] < tile["ring"]), default=0)
+        taken = {other["wave"] for other in neighbours}
+        while wave in taken:
+            wave += 1
+        tile["wave"] = wave
+    for tile in tiles:
+        tile["deps"] = [other["index"] for other in tiles
+                        if other["wave"] < tile["wave"] and _overlaps(tile["box"], other["box"])]
+    return tiles
+
+def feather_weights(box, width, height, overlap):
+    """
+    Blend weights for a tile's pixels: 1 in the middle, ramping down over overlap pixels towards edges that
+    neighbouring tiles share (edges on the canvas border keep full weight), so a tile's output fades into
+    the pixels its neighbours generated before it.
+    """
+    left, top, right, bottom = box
+    xs = np.arange(left, right, dtype=np.float32)[None, :]
+    ys = np.arange(top, bottom, dtype=np.float32)[:, None]
+    distance = np.full((bottom - top, right - left), np.inf, dtype=np.float32)
+    if left > 0:
+        distance = np.minimum(distance, xs - left + 1)
+    if right < width:
+        distance = np.minimum(distance, right - xs)
+    if top > 0:
+        distance = np.minimum(distance, ys - top + 1)
+    if bottom < height:
+        distance = np.minimum(distance, bottom - ys)
+    return np.clip(distance / (overlap + 1), 0, 1)
+
+def _encode_mask(known):
+    buffer = BytesIO()
+    Image.fromarray(np.where(known, KEEP, FILL).astype(np.uint8)).convert("1").save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+def generate_with_lambda(payload):
+    """Generate one tile through the outpaint Lambda and return the base64 image."""
+    result = invoke_outpaint(payload, invoke=call_lambda)
+    if not result or result.get("statusCode") != 200:
+        raise LambdaInvocationError((result or {}).get("message", "Unknown error"))
+    return result["image_data"]
+
+def run_tiled(image_bytes, width, height, prompt, seed, generate=generate_with_lambda, anchor="center", fit=True,
+              tile_size=None, overlap=TILE_OVERLAP, max_workers=TILE_MAX_WORKERS, on_tile=None):
+    """
+    Outpaint a canvas larger than the model's sizes as overlapping tiles.
+    The source is placed on the canvas as for build_canvas (anchor, fit); each tile is sent with the pixels
+    known so far (source and finished tiles) kept by its mask, and is submitted as soon as the tiles it
+    depends on are done, with at most max_workers in flight. Where a tile covers pixels that earlier tiles
+    generated, its output is cross-faded into them with feather_weights; pixels not generated yet take its
+    output and source pixels are never changed. generate(payload) returns the base64 image for a tile
+    payload, so a stub model can stand in for the Lambda. on_tile(done, total) is called after each tile.
+    Returns a dict with the PNG image_bytes, width, height, tiles, waves and seconds.
+    """
+    if overlap < 1:
+        raise ValueError("Tiles must overlap by at least one pixel.")
+    tile_width, tile_height = tile_size or choose_tile_size(width, height, overlap)
+    if tile_width > width or tile_height > height or 2 * overlap >= min(tile_width, tile_height):
+        raise ValueError("Tiles must fit the canvas and overlap by less than half their size.")
+    start = time.perf_counter()
+
+    source = ImageOps.exif_transpose(Image.open(BytesIO(image_bytes))).convert("RGB")
+    source_box = place_source(source.width, source.height, width, height, anchor, fit)
+    left, top, right, bottom = source_box
+    if (right - left, bottom - top) != source.size:
+        source = source.resize((right - left, bottom - top), Image.LANCZOS)
+    # Unknown pixels start as the repeated source edge, which the model sees as a colour hint
+    canvas = np.pad(np.asarray(source), ((top, height - bottom), (left, width - right), (0, 0)), mode="edge")
+    known = np.zeros((height, width), dtype=bool)
+    known[top:bottom, left:right] = True
+    is_source = known.copy()
+
+    tiles = plan_tiles(width, height, tile_width, tile_height, overlap, source_box)
+    remaining = {tile["index"]: set(tile["deps"]) for tile in tiles}
+
+    def generate_tile(tile_pixels, tile_known):
+        # Encoding runs on the worker so the scheduler only copies arrays and blends
+        payload = build_outpaint_payload(
+            prompt, base64.b64encode(encode_compact(Image.fromarray(tile_pixels))).decode("utf-8"),
+            tile_width, tile_height, seed, mask_image_data=_encode_mask(tile_known)
+        )
+        return generate(payload)
+
+    def submit(executor, tile):
+        # Snapshot the tile now: what is known at submit time is kept, the rest is generated
+        t_left, t_top, t_right, t_bottom = tile["box"]
+        tile_known = known[t_top:t_bottom, t_left:t_right].copy()
+        tile_pixels = canvas[t_top:t_bottom, t_left:t_right].copy()
+        return executor.submit(generate_tile, tile_pixels, tile_known), tile_known
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    in_flight, done = {}, 0
+    try:
+        with tracing.span("tiling.run", tiles=len(tiles)):
+            for tile in tiles:
+                if not remaining[tile["index"]]:
+                    future, tile_known = submit(executor, tile)
+                    in_flight[future] = (tile, tile_known)
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    tile, tile_known = in_flight.pop(future)
+                    t_left, t_top, t_right, t_bottom = box = tile["box"]
+                    generated = Image.open(BytesIO(base64.b64decode(future.result()))).convert("RGB")
+                    if generated.size != (tile_width, tile_height):
+                        generated = generated.resize((tile_width, tile_height), Image.LANCZOS)
+                    # No overlapping tile runs meanwhile, so the region is as it was sent: unknown pixels take
+                    # the output, earlier tiles' pixels fade into it towards the middle, the source stays
+                    region = (slice(t_top, t_bottom), slice(t_left, t_right))
+                    tile_weights = np.where(tile_known, feather_weights(box, width, height, overlap), 1.0)
+                    tile_weights[is_source[region]] = 0.0
+                    current = canvas[region].astype(np.float32)
+                    mixed = current + (np.asarray(generated, dtype=np.float32) - current) * tile_weights[..., None]
+                    canvas[region] = mixed.round().astype(np.uint8)
+                    known[region] = True
+                    done += 1
+                    if on_tile is not None:
+                        on_tile(done, len(tiles))
+                    for other in tiles:
+                        deps = remaining[other["index"]]
+                        if tile["index"] in deps:
+                            deps.discard(tile["index"])
+                            if not deps:
+                                future, other_known = submit(executor, other)
+                                in_flight[future] = (other, other_known)
+    finally:
+        # A failed tile stops the run; do not start tiles nobody will use
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    buffer = BytesIO()
+    Image.fromarray(canvas).save(buffer, format="PNG", optimize=True)
+    return {
+        "image_bytes": buffer.getvalue(),
+        "width": width,
+        "height": height,
+        "tiles": len(tiles),
+        "waves": max((tile["wave"] for tile in tiles), default=-1) + 1,
+        "seconds": time.perf_counter() - start
+    }
@@ -0,0 +1,25 @@
+from config import TRACING_ENABLED
+from utils.lambda_modules import load_handler_module
+
+# The handlers' tracing module, so handlers run in-process record into the same traces and stats as the app
+tracing = load_handler_module("tracing")
+tracing.set_enabled(TRACING_ENABLED)
+
+def _add_to_trace(name, duration_ms, **fields):
+    trace = tracing.current_trace()
+    if trace is not None:
+        trace.add(name, duration_ms, **fields)
+
+def record_handler_trace(function_name, handler_trace, invoke_ms, in_process=False):
+    """
+    Fold the spans a handler returned into the current trace and the rolling stats, plus the
+    Lambda overhead: the part of the invoke not spent inside the handler (network, queueing, cold start).
+    A handler run in_process has already recorded its spans in the shared rolling stats.
+    """
+    record = _add_to_trace if in_process else tracing.record
+    for handler_span in handler_trace.get("spans", []):
+        handler_span = dict(handler_span)
+        record(handler_span.pop("name"), handler_span.pop("ms"), **handler_span)
+    tracing.record(f"{function_name}.handler", handler_trace["handler_ms"])
+    if invoke_ms is not None:
+        tracing.record(f"{function_name}.lambda_overhead", max(invoke_ms - handler_trace["handler_ms"], 0.0))